@@ -0,0 +1,33 @@
+"""Make reward names unique within a business
+
+Revision ID: 2b7f4c8e1d05
+Revises: 8d3e6f1a9c27
+Create Date: 2026-10-17 11:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b7f4c8e1d05'
+down_revision: Union[str, None] = '8d3e6f1a9c27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bulk imports upsert on (business_id, name); a later reward reusing a name gets its id appended
+    op.execute(sa.text(
+        "UPDATE redeemr_rewards SET name = name || ' #' || CAST(id AS VARCHAR) "
+        "WHERE id NOT IN (SELECT MIN(id) FROM redeemr_rewards GROUP BY business_id, name)"
+    ))
+    op.create_index('uq_redeemr_rewards_business_name', 'redeemr_rewards', ['business_id', 'name'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_redeemr_rewards_business_name', table_name='redeemr_rewards')
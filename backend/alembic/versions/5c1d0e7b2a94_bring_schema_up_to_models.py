@@ -0,0 +1,177 @@
+"""Bring the schema up to the models
+
+Revision ID: 5c1d0e7b2a94
+Revises: 96c8cb833a51
+Create Date: 2026-10-17 09:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1d0e7b2a94'
+down_revision: Union[str, None] = '96c8cb833a51'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columns and tables the models gained after 96c8cb833a51, which databases
+# built with create_all() and update_db.py already have. The indexes the query
+# plan audit needs are left to ebf1e8d184dc.
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Accounts
+    op.add_column('users', sa.Column('email', sa.String(), nullable=True))
+    op.add_column('users', sa.Column('hashed_password', sa.String(), nullable=True))
+    op.add_column('users', sa.Column('is_active', sa.Boolean(), server_default=sa.true(), nullable=True))
+    op.add_column('users', sa.Column('is_superuser', sa.Boolean(), server_default=sa.false(), nullable=True))
+    op.add_column('users', sa.Column('is_business_owner', sa.Boolean(), server_default=sa.false(), nullable=True))
+    op.add_column('users', sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True))
+    op.add_column('users', sa.Column('last_login', sa.DateTime(timezone=True), nullable=True))
+    op.alter_column('users', 'name', existing_type=sa.String(), nullable=True)
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+
+    # Businesses
+    op.add_column('businesses', sa.Column('owner_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('businesses_owner_id_fkey', 'businesses', 'users', ['owner_id'], ['id'])
+    op.add_column('businesses', sa.Column('is_approved', sa.Boolean(), server_default=sa.false(), nullable=True))
+    op.add_column('businesses', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('businesses', sa.Column('catalog_version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('businesses', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('businesses', sa.Column('longitude', sa.Float(), nullable=True))
+    op.add_column('businesses', sa.Column('geohash', sa.String(), nullable=True))
+    op.drop_index(op.f('ix_businesses_name'), table_name='businesses')
+    op.create_index(op.f('ix_businesses_name'), 'businesses', ['name'], unique=False)
+
+    # Rewards and transactions
+    op.alter_column('redeemr_rewards', 'business_id', existing_type=sa.Integer(), nullable=True)
+    op.alter_column('redeemr_rewards', 'name', existing_type=sa.String(), nullable=True)
+    op.alter_column('redeemr_rewards', 'points_required', existing_type=sa.Integer(), nullable=True)
+    op.create_index(op.f('ix_redeemr_rewards_name'), 'redeemr_rewards', ['name'], unique=False)
+    op.alter_column('transactions', 'timestamp', new_column_name='created_at',
+                    existing_type=sa.DateTime(), type_=sa.DateTime(timezone=True),
+                    existing_server_default=sa.text('now()'))
+    op.alter_column('transactions', 'user_id', existing_type=sa.Integer(), nullable=True)
+    op.alter_column('transactions', 'reward_id', existing_type=sa.Integer(), nullable=True)
+
+    op.create_table('transactions_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('reward_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['reward_id'], ['redeemr_rewards.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_transactions_archive_reward_created', 'transactions_archive', ['reward_id', 'created_at'], unique=False)
+    op.create_index('ix_transactions_archive_created', 'transactions_archive', ['created_at'], unique=False)
+
+    # Points
+    op.create_table('points_ledger',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('business_id', sa.Integer(), nullable=False),
+    sa.Column('delta', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('transaction_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_points_ledger_id'), 'points_ledger', ['id'], unique=False)
+    op.create_table('points_balances',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('business_id', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'business_id')
+    )
+
+    # Counters, purges and rollups
+    op.create_table('stats_counters',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('deletion_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('business_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('ledger_entries_deleted', sa.Integer(), nullable=False),
+    sa.Column('transactions_deleted', sa.Integer(), nullable=False),
+    sa.Column('rewards_deleted', sa.Integer(), nullable=False),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_deletion_jobs_id'), 'deletion_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_deletion_jobs_business_id'), 'deletion_jobs', ['business_id'], unique=False)
+    for table in ('redemption_rollups_hourly', 'redemption_rollups_daily'):
+        op.create_table(table,
+        sa.Column('business_id', sa.Integer(), nullable=False),
+        sa.Column('bucket_start', sa.Integer(), nullable=False),
+        sa.Column('reward_id', sa.Integer(), nullable=False),
+        sa.Column('redemptions', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ),
+        sa.ForeignKeyConstraint(['reward_id'], ['redeemr_rewards.id'], ),
+        sa.PrimaryKeyConstraint('business_id', 'bucket_start', 'reward_id')
+        )
+        op.create_index(op.f(f'ix_{table}_bucket_start'), table, ['bucket_start'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('redemption_rollups_daily', 'redemption_rollups_hourly'):
+        op.drop_index(op.f(f'ix_{table}_bucket_start'), table_name=table)
+        op.drop_table(table)
+    op.drop_index(op.f('ix_deletion_jobs_business_id'), table_name='deletion_jobs')
+    op.drop_index(op.f('ix_deletion_jobs_id'), table_name='deletion_jobs')
+    op.drop_table('deletion_jobs')
+    op.drop_table('stats_counters')
+    op.drop_table('points_balances')
+    op.drop_index(op.f('ix_points_ledger_id'), table_name='points_ledger')
+    op.drop_table('points_ledger')
+    op.drop_index('ix_transactions_archive_created', table_name='transactions_archive')
+    op.drop_index('ix_transactions_archive_reward_created', table_name='transactions_archive')
+    op.drop_table('transactions_archive')
+
+    op.alter_column('transactions', 'reward_id', existing_type=sa.Integer(), nullable=False)
+    op.alter_column('transactions', 'user_id', existing_type=sa.Integer(), nullable=False)
+    op.alter_column('transactions', 'created_at', new_column_name='timestamp',
+                    existing_type=sa.DateTime(timezone=True), type_=sa.DateTime(),
+                    existing_server_default=sa.text('now()'))
+    op.drop_index(op.f('ix_redeemr_rewards_name'), table_name='redeemr_rewards')
+    op.alter_column('redeemr_rewards', 'points_required', existing_type=sa.Integer(), nullable=False)
+    op.alter_column('redeemr_rewards', 'name', existing_type=sa.String(), nullable=False)
+    op.alter_column('redeemr_rewards', 'business_id', existing_type=sa.Integer(), nullable=False)
+
+    op.drop_index(op.f('ix_businesses_name'), table_name='businesses')
+    op.create_index(op.f('ix_businesses_name'), 'businesses', ['name'], unique=True)
+    op.drop_column('businesses', 'geohash')
+    op.drop_column('businesses', 'longitude')
+    op.drop_column('businesses', 'latitude')
+    op.drop_column('businesses', 'catalog_version')
+    op.drop_column('businesses', 'deleted_at')
+    op.drop_column('businesses', 'is_approved')
+    op.drop_constraint('businesses_owner_id_fkey', 'businesses', type_='foreignkey')
+    op.drop_column('businesses', 'owner_id')
+
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.alter_column('users', 'name', existing_type=sa.String(), nullable=False)
+    op.drop_column('users', 'last_login')
+    op.drop_column('users', 'created_at')
+    op.drop_column('users', 'is_business_owner')
+    op.drop_column('users', 'is_superuser')
+    op.drop_column('users', 'is_active')
+    op.drop_column('users', 'hashed_password')
+    op.drop_column('users', 'email')
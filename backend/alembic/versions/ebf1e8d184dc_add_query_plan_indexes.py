@@ -0,0 +1,41 @@
+"""Add the indexes the query plan audit needs
+
+Revision ID: ebf1e8d184dc
+Revises: 5c1d0e7b2a94
+Create Date: 2026-10-17 10:12:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ebf1e8d184dc'
+down_revision: Union[str, None] = '5c1d0e7b2a94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns). update_db.py and create_all() add these on databases
+# not managed by Alembic; IF NOT EXISTS keeps this safe to run after them.
+INDEXES = (
+    ('ix_businesses_location', 'businesses', ('geohash', 'latitude', 'longitude', 'is_approved', 'deleted_at')),
+    ('ix_redeemr_rewards_business_id', 'redeemr_rewards', ('business_id',)),
+    ('ix_transactions_reward_created', 'transactions', ('reward_id', 'created_at')),
+    ('ix_businesses_owner', 'businesses', ('owner_id', 'deleted_at')),
+    ('ix_points_ledger_business_id', 'points_ledger', ('business_id',)),
+    ('ix_points_balances_business_id', 'points_balances', ('business_id',)),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.execute(sa.text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, _, _ in reversed(INDEXES):
+        op.execute(sa.text(f"DROP INDEX IF EXISTS {name}"))
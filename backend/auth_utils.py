@@ -1,12 +1,18 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from urllib.parse import urlencode
+import job_queue
+import mail
 import models
 from database import get_db
+from logs import get_logger
+from password_hasher import password_hasher, pwd_context
+from principal_cache import Principal, principal_cache
 import secrets
 import string
 
@@ -15,11 +21,14 @@ SECRET_KEY = "your-secret-key-keep-it-secret"  # In production, use environment
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 PASSWORD_RESET_TOKEN_EXPIRE_HOURS = 24
+# Stream tokens only open a redemption feed and may travel in a URL, so they expire quickly
+STREAM_TOKEN_EXPIRE_SECONDS = 60
+PASSWORD_RESET_URL = "http://localhost:3000/reset-password"
 
-# Password hashing configuration
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+logger = get_logger("auth")
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
     return pwd_context.verify(plain_password, hashed_password)
@@ -72,38 +81,88 @@ def verify_password_reset_token(token: str, email: str) -> bool:
     except JWTError:
         return False
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Get current user from JWT token."""
+def create_stream_token(email: str, business_id: int) -> str:
+    """Create a short-lived token that opens one business's redemption stream."""
+    expires = datetime.utcnow() + timedelta(seconds=STREAM_TOKEN_EXPIRE_SECONDS)
+    return jwt.encode({"sub": email, "exp": expires, "type": "redemption_stream", "business_id": business_id},
+                      SECRET_KEY, algorithm=ALGORITHM)
+
+def verify_stream_token(token: str, business_id: int) -> Optional[str]:
+    """The email a stream token was issued to, or None unless it is valid for this business."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("type") != "redemption_stream" or payload.get("business_id") != business_id:
+        return None
+    return payload.get("sub")
+
+@job_queue.handler("password_reset_email")
+def send_password_reset_email(payload: dict) -> None:
+    """Job: mail a reset link. The token is minted here so it is never stored in the jobs table."""
+    email = payload["email"]
+    token = create_password_reset_token(email)
+    reset_url = f"{PASSWORD_RESET_URL}?{urlencode({'token': token, 'email': email})}"
+    mail.send(email, "Reset your Redeemr password", (
+        f"Someone asked to reset the password of your Redeemr account.\n\n"
+        f"Open this link within {PASSWORD_RESET_TOKEN_EXPIRE_HOURS} hours to choose a new one:\n{reset_url}\n\n"
+        f"If it was not you, ignore this email; your password stays the same.\n"
+    ))
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> Principal:
+    """Get a snapshot of the current user from JWT token."""
+    return await principal_for_token(token, db)
+
+async def principal_for_token(token: str, db: AsyncSession) -> Principal:
+    """Resolve a JWT to a principal, raising 401 when it is invalid."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        print(f"Decoding token: {token[:10]}...")
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            print("Token missing 'sub' claim")
+            logger.warning("token_missing_subject")
             raise credentials_exception
-        print(f"Token contains email: {email}")
     except JWTError as e:
-        print(f"JWT error: {e}")
+        logger.info("token_rejected", error=str(e), sampled=True)
         raise credentials_exception
-        
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if user is None:
-        print(f"No user found with email: {email}")
+    # Reset and stream tokens carry a type; only plain access tokens authenticate requests
+    if payload.get("type") is not None:
+        logger.warning("token_wrong_type", type=payload.get("type"))
         raise credentials_exception
+    principal = await principal_for_email(email, db)
+    if principal is None:
+        logger.warning("token_unknown_user", email=email)
+        raise credentials_exception
+    return principal
+
+async def principal_for_email(email: str, db: AsyncSession) -> Optional[Principal]:
+    """The principal for an authenticated email, or None when the user no longer exists."""
+    # Serve the principal from the cache when we can to skip the user lookup
+    principal = principal_cache.get(email)
+    if principal is not None:
+        return principal
+
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    user = result.scalars().first()
+    if user is None:
+        return None
     
-    print(f"User found: {user.email}, is_superuser: {user.is_superuser}")
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.put(email, principal)
+    return principal
 
-def authenticate_user(db: Session, email: str, password: str):
+async def authenticate_user(db: AsyncSession, email: str, password: str):
     """Authenticate user with email and password."""
-    user = db.query(models.User).filter(models.User.email == email).first()
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    user = result.scalars().first()
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    # bcrypt is CPU bound, run it in the hashing pool
+    if not await password_hasher.verify(password, user.hashed_password):
         return False
-    return user 
\ No newline at end of file
+    return user
+ 
\ No newline at end of file
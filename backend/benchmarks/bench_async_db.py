@@ -0,0 +1,129 @@
+"""Event-loop lag and latency under concurrent authenticated load.
+
+Drives GET /auth/me in-process with many concurrent clients and compares the
+old blocking user lookup on the event loop ("before") against the AsyncSession
+dependency ("after"). A probe task measures how late the loop wakes up.
+
+Run from the backend directory:
+    python -m benchmarks.bench_async_db --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import Depends, HTTPException
+from jose import jwt
+from sqlalchemy import select
+
+import main
+import models
+from auth_utils import ALGORITHM, SECRET_KEY, create_access_token, get_current_user, oauth2_scheme
+from database import SessionLocal
+from principal_cache import Principal, principal_cache
+
+BENCH_EMAIL = "bench-async@example.com"
+
+
+async def blocking_get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
+    """The pre-async lookup: a synchronous Session query run directly on the event loop."""
+    email = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    db = SessionLocal()
+    try:
+        user = db.execute(select(models.User).where(models.User.email == email)).scalars().first()
+        if user is None:
+            raise HTTPException(status_code=401)
+        return Principal.from_user(user)
+    finally:
+        db.close()
+
+
+def ensure_user():
+    db = SessionLocal()
+    try:
+        if not db.query(models.User).filter(models.User.email == BENCH_EMAIL).first():
+            db.add(models.User(email=BENCH_EMAIL, name="Bench", hashed_password="x", is_active=True))
+            db.commit()
+    finally:
+        db.close()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def probe_loop_lag(stop: asyncio.Event, lags: list, interval: float = 0.005):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def run_scenario(label: str, total: int, concurrency: int) -> dict:
+    token = create_access_token({"sub": BENCH_EMAIL})
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies, lags = [], []
+    stop = asyncio.Event()
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while True:
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.perf_counter()
+                response = await client.get("/auth/me", headers=headers)
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+        probe = asyncio.create_task(probe_loop_lag(stop, lags))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe
+
+    return {
+        "scenario": label,
+        "requests": total,
+        "rps": total / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "loop_lag_mean_ms": statistics.mean(lags) * 1000 if lags else 0.0,
+        "loop_lag_max_ms": max(lags) * 1000 if lags else 0.0,
+    }
+
+
+async def run(total: int, concurrency: int):
+    results = []
+    main.app.dependency_overrides[get_current_user] = blocking_get_current_user
+    try:
+        results.append(await run_scenario("before (blocking session)", total, concurrency))
+    finally:
+        main.app.dependency_overrides.clear()
+    results.append(await run_scenario("after (async session)", total, concurrency))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    ensure_user()
+    # Every request must reach the database for a fair comparison
+    principal_cache.max_entries = 0
+    for row in asyncio.run(run(args.requests, args.concurrency)):
+        print(
+            f"{row['scenario']:<28} {row['rps']:8.1f} req/s  p50 {row['p50_ms']:7.2f} ms  "
+            f"p99 {row['p99_ms']:7.2f} ms  loop lag mean {row['loop_lag_mean_ms']:6.2f} ms  "
+            f"max {row['loop_lag_max_ms']:6.2f} ms"
+        )
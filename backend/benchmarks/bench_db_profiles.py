@@ -0,0 +1,134 @@
+"""Mixed read/write concurrency under each database engine profile.
+
+Each profile runs in a fresh subprocess (the engine is configured at import
+time) against its own scratch SQLite file: 80% catalog reads
+(GET /businesses/{id}/rewards/) and 20% redemptions (POST /redeem/). If
+DATABASE_URL points at Postgres, that pooled profile is run as well.
+
+Run from the backend directory:
+    python -m benchmarks.bench_db_profiles --requests 3000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+PROFILES = {
+    "sqlite-default": {"SQLITE_PRAGMAS": "0"},
+    "sqlite-wal": {"SQLITE_PRAGMAS": "1"},
+}
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def workload(total: int, concurrency: int, write_ratio: float) -> dict:
+    import httpx
+    import main
+    import models
+    from auth_utils import create_access_token
+    from database import SessionLocal, engine, pool_stats
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        business = models.Business(name=f"Profile bench {time.time_ns()}", is_approved=True)
+        user = models.User(email=f"profile-{time.time_ns()}@example.com", name="Bench")
+        db.add_all([business, user])
+        db.flush()
+        rewards = [models.RedeemrReward(name=f"Reward {i}", points_required=0, business_id=business.id) for i in range(50)]
+        db.add_all(rewards)
+        db.commit()
+        business_id, reward_id = business.id, rewards[0].id
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': user.email})}"}
+    finally:
+        db.close()
+
+    reads, writes, errors = [], [], 0
+    remaining = total
+    rng = random.Random(42)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                is_write = rng.random() < write_ratio
+                started = time.perf_counter()
+                try:
+                    if is_write:
+                        response = await client.post("/redeem/", params={"reward_id": reward_id}, headers=headers)
+                    else:
+                        response = await client.get(f"/businesses/{business_id}/rewards/")
+                    ok = response.status_code == 200
+                except Exception:
+                    ok = False
+                (writes if is_write else reads).append(time.perf_counter() - started)
+                errors += 0 if ok else 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "rps": total / elapsed,
+        "read_p50_ms": percentile(reads, 50) * 1000,
+        "read_p99_ms": percentile(reads, 99) * 1000,
+        "write_p50_ms": percentile(writes, 50) * 1000,
+        "write_p99_ms": percentile(writes, 99) * 1000,
+        "errors": errors,
+        "pool": pool_stats()["async"]["class"],
+    }
+
+
+def run_profile(name: str, overrides: dict, args) -> dict:
+    env = dict(os.environ, **overrides)
+    cmd = [sys.executable, "-m", "benchmarks.bench_db_profiles", "--child",
+           "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+           "--write-ratio", str(args.write_ratio)]
+    output = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["profile"] = name
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = asyncio.run(workload(args.requests, args.concurrency, args.write_ratio))
+        print(json.dumps(result))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for name, overrides in PROFILES.items():
+            url = f"sqlite:///{os.path.join(scratch, name + '.db')}"
+            results.append(run_profile(name, dict(overrides, DATABASE_URL=url), args))
+    if os.getenv("DATABASE_URL", "").startswith("postgresql"):
+        results.append(run_profile("postgres-pool", {}, args))
+
+    for row in results:
+        print(
+            f"{row['profile']:<15} {row['rps']:8.1f} req/s  read p50 {row['read_p50_ms']:7.2f} ms  "
+            f"p99 {row['read_p99_ms']:7.2f} ms  write p50 {row['write_p50_ms']:7.2f} ms  "
+            f"p99 {row['write_p99_ms']:7.2f} ms  errors {row['errors']}  pool {row['pool']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
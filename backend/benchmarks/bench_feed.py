@@ -0,0 +1,124 @@
+"""Server CPU with many idle redemption feed subscribers.
+
+Starts uvicorn against a scratch SQLite database, opens SSE subscriptions in
+steps (spread over --businesses feeds) and, at each step, samples the
+server's CPU time over an idle window. A flat CPU line means idle streams
+cost nothing but memory. At the end one redemption per feed is published,
+and the time until every subscriber has seen its event is reported.
+
+Reads CPU time from /proc, so it runs on Linux only. Run from the backend directory:
+    python -m benchmarks.bench_feed --steps 0 1000 5000 --idle-seconds 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime and stime, in clock ticks
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class Subscriber:
+    """A raw SSE client: one socket, counting the events it receives."""
+
+    def __init__(self):
+        self.events = 0
+        self.seen = asyncio.Event()
+
+    async def open(self, port: int, business_id: int, token: str) -> None:
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        self.writer.write(f"GET /businesses/{business_id}/redemptions/stream HTTP/1.1\r\n"
+                          f"Host: bench\r\nAccept: text/event-stream\r\nAuthorization: Bearer {token}\r\n\r\n".encode())
+        status = await self.reader.readline()
+        if b" 200 " not in status:
+            raise RuntimeError(f"Subscription failed: {status!r}")
+        self.task = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        while chunk := await self.reader.read(65536):
+            if b"event: redemption" in chunk:
+                self.events += chunk.count(b"event: redemption")
+                self.seen.set()
+
+    def close(self) -> None:
+        self.task.cancel()
+        self.writer.close()
+
+
+async def run(port: int, pid: int, args) -> list:
+    import httpx
+    from auth_utils import create_access_token
+    from bulk_load import SYNTHETIC_ADMIN_EMAIL, home_business
+
+    token = create_access_token({"sub": SYNTHETIC_ADMIN_EMAIL}, timedelta(hours=1))
+    subscribers, rows = [], []
+    for target in sorted(args.steps):
+        started = time.perf_counter()
+        while len(subscribers) < target:
+            batch = [Subscriber() for _ in range(min(200, target - len(subscribers)))]
+            await asyncio.gather(*(subscriber.open(port, (len(subscribers) + i) % args.businesses + 1, token)
+                                   for i, subscriber in enumerate(batch)))
+            subscribers.extend(batch)
+        opened = time.perf_counter() - started
+        before = cpu_seconds(pid)
+        await asyncio.sleep(args.idle_seconds)
+        cpu = (cpu_seconds(pid) - before) / args.idle_seconds * 100
+        rows.append({"subscribers": len(subscribers), "idle_cpu_percent": cpu, "open_seconds": opened})
+        print(f"  {len(subscribers):>6} subscribers  idle CPU {cpu:5.2f}%  (opened in {opened:.1f}s)")
+
+    try:
+        if subscribers:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+                started = time.perf_counter()
+                for user_id in range(1, args.businesses + 1):
+                    # One generated reward per business, with the same id, funded for its home users
+                    reward_id = home_business(user_id, args.businesses)
+                    # The admin redeems on each customer's behalf
+                    (await client.post("/redeem/", params={"user_id": user_id, "reward_id": reward_id},
+                                       headers={"Authorization": f"Bearer {token}"})).raise_for_status()
+                await asyncio.wait_for(asyncio.gather(*(subscriber.seen.wait() for subscriber in subscribers)), 60)
+                print(f"  fan-out of {args.businesses} events to {len(subscribers)} subscribers: "
+                      f"{(time.perf_counter() - started) * 1000:.0f} ms")
+    finally:
+        # uvicorn waits for open streams before it exits
+        for subscriber in subscribers:
+            subscriber.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, nargs="+", default=[0, 1000, 2500, 5000], help="Subscriber counts to sample at")
+    parser.add_argument("--businesses", type=int, default=100, help="Feeds the subscribers are spread over")
+    parser.add_argument("--idle-seconds", type=float, default=20, help="CPU sampling window per step")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        # Engines are configured at import time, so nothing from the app is imported before this point
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'feed.db')}"
+        sys.path.insert(0, BACKEND_DIR)
+        import bulk_load
+        from benchmarks.suite import free_port, start_uvicorn
+
+        bulk_load.load_synthetic(args.businesses, args.businesses, 1, 0, log=lambda message: None)
+        port = free_port()
+        server = start_uvicorn(port, 1)
+        try:
+            print(f"uvicorn pid {server.pid}:")
+            asyncio.run(run(port, server.pid, args))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Latency of /businesses/nearby over a large located business table.
+
+Loads --businesses located businesses (1M by default, spread over
+bulk_load.SYNTHETIC_REGION) into a scratch SQLite file, then times radius
+and bounding-box queries from random points inside the region, in-process
+over the ASGI transport. Reports p50/p95/p99 and the mean result count per
+query shape; exits non-zero when a radius shape misses --target-ms at p95.
+
+Run from the backend directory:
+    python -m benchmarks.bench_nearby --businesses 1000000 --queries 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# (name, query parameters relative to a random point)
+SHAPES = (
+    ("radius_1km", lambda lat, lon: {"lat": lat, "lon": lon, "radius_km": 1}),
+    ("radius_2km", lambda lat, lon: {"lat": lat, "lon": lon, "radius_km": 2}),
+    ("radius_2km_rewards", lambda lat, lon: {"lat": lat, "lon": lon, "radius_km": 2, "include_rewards": "true"}),
+    ("radius_5km", lambda lat, lon: {"lat": lat, "lon": lon, "radius_km": 5}),
+    ("bbox_0.02deg", lambda lat, lon: {"min_lat": lat, "min_lon": lon, "max_lat": lat + 0.02, "max_lon": lon + 0.02}),
+)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(queries: int, seed_value: int) -> dict:
+    import httpx
+    import main
+    from bulk_load import SYNTHETIC_REGION
+
+    rng = random.Random(seed_value)
+    min_lat, min_lon, max_lat, max_lon = SYNTHETIC_REGION
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for name, params_for in SHAPES:
+            latencies, found = [], 0
+            for i in range(queries + 20):
+                params = params_for(rng.uniform(min_lat, max_lat - 0.05), rng.uniform(min_lon, max_lon - 0.05))
+                started = time.perf_counter()
+                response = await client.get("/businesses/nearby", params=params)
+                elapsed = time.perf_counter() - started
+                response.raise_for_status()
+                # The first few queries warm the page cache and are not measured
+                if i >= 20:
+                    latencies.append(elapsed)
+                    found += len(response.json())
+            results[name] = {
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "mean_results": found / queries,
+            }
+            row = results[name]
+            print(f"  {name:<20} p50 {row['p50_ms']:7.2f} ms  p95 {row['p95_ms']:7.2f} ms  "
+                  f"p99 {row['p99_ms']:7.2f} ms  results {row['mean_results']:.1f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--businesses", type=int, default=1_000_000)
+    parser.add_argument("--rewards-per-business", type=int, default=2)
+    parser.add_argument("--queries", type=int, default=500, help="Measured queries per shape")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--target-ms", type=float, default=20.0, help="p95 budget for radius queries")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        # Engines are configured at import time, so nothing from the app is imported before this point
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'nearby.db')}"
+        sys.path.insert(0, BACKEND_DIR)
+        import bulk_load
+
+        bulk_load.load_synthetic(args.businesses, args.businesses, args.rewards_per_business, 0,
+                                 seed=args.seed, log=lambda message: None)
+        print(f"{args.businesses} businesses:")
+        results = asyncio.run(run(args.queries, args.seed))
+
+    missed = [name for name, row in results.items() if name.startswith("radius") and row["p95_ms"] > args.target_ms]
+    if missed:
+        print(f"Over the {args.target_ms:.0f} ms p95 target: {', '.join(missed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Redemptions per second: per-request commit vs group commit.
+
+Seeds one business and a pool of funded customers, then fires concurrent
+POST /redeem/ calls in-process, first with the per-request commit path and
+then with the RedemptionBatcher enabled.
+
+Run from the backend directory:
+    python -m benchmarks.bench_redeem_batching --redemptions 2000 --concurrency 100 --window-ms 5 --max-rows 100
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+import main
+import models
+import points
+from auth_utils import create_access_token
+from database import AsyncSessionLocal, SessionLocal
+from redemptions import redemption_batcher
+
+
+def seed(customers: int):
+    db = SessionLocal()
+    try:
+        business = models.Business(name=f"Batch bench {time.time_ns()}", is_approved=True)
+        db.add(business)
+        db.flush()
+        reward = models.RedeemrReward(name="Bench reward", points_required=1, business_id=business.id)
+        users = [models.User(email=f"batch-{time.time_ns()}-{i}@example.com", name="Bench") for i in range(customers)]
+        db.add(reward)
+        db.add_all(users)
+        db.commit()
+        # Bearer headers per customer id
+        return business.id, reward.id, {u.id: {"Authorization": f"Bearer {create_access_token({'sub': u.email})}"}
+                                        for u in users}
+    finally:
+        db.close()
+
+
+async def fund(business_id: int, user_ids, amount: int):
+    async with AsyncSessionLocal() as db:
+        for user_id in user_ids:
+            await points.credit_points(db, user_id, business_id, amount)
+        await db.commit()
+
+
+async def drive(reward_id: int, customers: dict, total: int, concurrency: int):
+    errors = 0
+    queue = asyncio.Queue()
+    user_ids = list(customers)
+    for i in range(total):
+        queue.put_nowait(user_ids[i % len(user_ids)])
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                user_id = queue.get_nowait()
+                try:
+                    response = await client.post("/redeem/", params={"reward_id": reward_id}, headers=customers[user_id])
+                    if response.status_code != 200:
+                        errors += 1
+                except Exception:
+                    # e.g. "database is locked" escaping the per-request path
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - started, errors
+
+
+async def run(total: int, concurrency: int, window_ms: float, max_rows: int):
+    business_id, reward_id, customers = seed(concurrency)
+    await fund(business_id, customers, total * 2)
+
+    redemption_batcher.enabled = False
+    per_request, per_request_errors = await drive(reward_id, customers, total, concurrency)
+
+    redemption_batcher.enabled = True
+    redemption_batcher.window_ms = window_ms
+    redemption_batcher.max_rows = max_rows
+    batched, batched_errors = await drive(reward_id, customers, total, concurrency)
+    stats = redemption_batcher.stats()
+    await redemption_batcher.shutdown()
+
+    print(f"per-request commit  {total / per_request:9.1f} redemptions/s  errors {per_request_errors}")
+    print(f"group commit        {total / batched:9.1f} redemptions/s  errors {batched_errors}  "
+          f"(window {window_ms} ms, max {max_rows} rows, avg batch {stats['avg_batch_size']:.1f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--redemptions", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--window-ms", type=float, default=5)
+    parser.add_argument("--max-rows", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args.redemptions, args.concurrency, args.window_ms, args.max_rows))
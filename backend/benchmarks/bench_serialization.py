@@ -0,0 +1,102 @@
+"""Fetch and serialization cost of large business listings.
+
+Loads --rows businesses into a scratch SQLite file, then times the ways a
+listing can be produced, split into fetch (query + row construction) and
+serialize (Python objects to JSON bytes):
+
+  orm_jsonable       select(Business) ORM instances through jsonable_encoder
+                     and JSONResponse, what an untyped route does
+  projection_model   select() of the response columns, validated and dumped
+                     by Pydantic (FastAPI's path for routes with a
+                     response_model and the default response class)
+  projection_orjson  the same rows through the response_model and then
+                     ORJSONResponse (a typed route with orjson as its class)
+  projection_raw     column mappings straight into orjson, no schema at all
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialization --rows 10000 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(repeat: int) -> list:
+    from typing import List
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+    import models
+    import schemas
+    from database import AsyncSessionLocal
+    from serialization import ORJSONResponse, projection
+
+    adapter = TypeAdapter(List[schemas.BusinessResponse])
+    columns = projection(models.Business, schemas.BusinessResponse)
+
+    async def orm_rows(db):
+        return (await db.scalars(select(models.Business).order_by(models.Business.id))).all()
+
+    async def projected_rows(db):
+        return (await db.execute(columns.order_by(models.Business.id))).mappings().all()
+
+    variants = (
+        ("orm_jsonable", orm_rows, lambda rows: JSONResponse(jsonable_encoder(rows)).body),
+        # FastAPI validates the return value against the response_model before dumping it
+        ("projection_model", projected_rows, lambda rows: adapter.dump_json(adapter.validate_python(rows))),
+        ("projection_orjson", projected_rows,
+         lambda rows: ORJSONResponse(adapter.dump_python(adapter.validate_python(rows), mode="json")).body),
+        ("projection_raw", projected_rows, lambda rows: ORJSONResponse([dict(row) for row in rows]).body),
+    )
+    results = []
+    for name, fetch, serialize in variants:
+        fetch_ms, serialize_ms = [], []
+        for _ in range(repeat):
+            # A fresh session per run, as a request would have, so the identity map starts empty
+            async with AsyncSessionLocal() as db:
+                started = time.perf_counter()
+                rows = await fetch(db)
+                fetched = time.perf_counter()
+                body = serialize(rows)
+                fetch_ms.append((fetched - started) * 1000)
+                serialize_ms.append((time.perf_counter() - fetched) * 1000)
+        results.append({"variant": name, "rows": len(rows), "bytes": len(body),
+                         "fetch_p50_ms": percentile(fetch_ms, 50), "serialize_p50_ms": percentile(serialize_ms, 50),
+                         "total_p50_ms": percentile([f + s for f, s in zip(fetch_ms, serialize_ms)], 50)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000, help="Businesses in the listing")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per variant")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        # Engines are configured at import time, so nothing from the app is imported before this point
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'serialization.db')}"
+        sys.path.insert(0, BACKEND_DIR)
+        import bulk_load
+
+        bulk_load.load_synthetic(args.rows, args.rows, 0, 0, log=lambda message: None)
+        results = asyncio.run(run(args.repeat))
+
+    print(f"{'variant':<20}{'rows':>8}{'bytes':>10}{'fetch p50':>12}{'serialize p50':>15}{'total p50':>12}")
+    for row in results:
+        print(f"{row['variant']:<20}{row['rows']:>8}{row['bytes']:>10}{row['fetch_p50_ms']:>10.1f}ms"
+              f"{row['serialize_p50_ms']:>13.1f}ms{row['total_p50_ms']:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
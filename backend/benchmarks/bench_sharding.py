@@ -0,0 +1,105 @@
+"""Redemption write throughput against the number of shards.
+
+For each --shards value (0 = one database) this seeds a scratch dataset with
+that SHARD_COUNT, starts uvicorn with --workers processes and fires the
+suite's redemption_burst (POST /redeem/ against funded home businesses) at
+it. With one database every redemption commit queues on the same SQLite
+write lock; with N shards only redemptions at businesses on the same shard
+do. Commits use synchronous=FULL by default, so each one waits for its
+fsync like a durable deployment would. Each configuration runs in its own
+child process, since engines are configured at import time.
+
+Run from the backend directory:
+    python -m benchmarks.bench_sharding --shards 0 2 4 8 --workers 4 --requests 3000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.dataset import SCALES, scale_from_args
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULT_PREFIX = "RESULT "
+
+
+def run_one(args) -> dict:
+    """Seed, serve and measure one shard count. Runs in a child process."""
+    scale = scale_from_args(args)
+    with tempfile.TemporaryDirectory() as scratch:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+        os.environ["SHARD_COUNT"] = str(args.shard_count)
+        os.environ["SQLITE_SYNCHRONOUS"] = args.synchronous
+        sys.path.insert(0, BACKEND_DIR)
+        # Engines are configured at import time, so nothing from the app is imported before this point
+        import httpx
+        from benchmarks.dataset import seed
+        from benchmarks.suite import Context, free_port, run_scenario, start_uvicorn
+
+        seed(scale, args.seed, log=lambda message: None)
+        port = free_port()
+        server = start_uvicorn(port, args.workers)
+
+        async def drive():
+            ctx = Context(scale, args.seed)
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120, limits=limits) as client:
+                if args.warmup:
+                    await run_scenario(client, "redemption_burst", ctx, args.warmup, args.concurrency)
+                return await run_scenario(client, "redemption_burst", ctx, args.requests, args.concurrency)
+
+        try:
+            return asyncio.run(drive())
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", type=int, nargs="+", default=[0, 2, 4, 8], help="Shard counts to compare")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--businesses", type=int)
+    parser.add_argument("--rewards-per-business", type=int)
+    parser.add_argument("--transactions", type=int)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn worker processes")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--warmup", type=int, default=200, help="Unmeasured redemptions before each run")
+    parser.add_argument("--synchronous", default="FULL", help="SQLite synchronous setting for every database")
+    parser.add_argument("--shard-count", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.shard_count is not None:
+        print(RESULT_PREFIX + json.dumps(run_one(args)))
+        return
+
+    forwarded = sys.argv[1:]
+    results = {}
+    for shard_count in args.shards:
+        child = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_sharding", *forwarded, "--shard-count", str(shard_count)],
+            cwd=BACKEND_DIR, capture_output=True, text=True,
+        )
+        lines = [line for line in child.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+        if child.returncode != 0 or not lines:
+            sys.stderr.write(child.stderr[-2000:])
+            raise SystemExit(f"Run with {shard_count} shards failed")
+        results[shard_count] = json.loads(lines[-1][len(RESULT_PREFIX):])
+
+    print(f"{args.workers} workers, concurrency {args.concurrency}, synchronous={args.synchronous}, "
+          f"{args.requests} redemptions per run")
+    print(f"{'shards':>6}{'redemptions/s':>16}{'speedup':>10}{'p50':>11}{'p95':>11}{'p99':>11}{'errors':>9}")
+    base = results[args.shards[0]]["rps"]
+    for shard_count, row in results.items():
+        print(f"{shard_count:>6}{row['rps']:>16.1f}{row['rps'] / base:>9.2f}x{row['p50_ms']:>9.1f}ms"
+              f"{row['p95_ms']:>9.1f}ms{row['p99_ms']:>9.1f}ms{row['errors']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Check that archived transaction ids are never handed out again.
+
+Works on a throwaway SQLite file built from the models. Archives the first
+redemptions, adds more, and fails unless the new ids are above every
+archived one and transaction_archive.verify() finds no problems. It then
+plants an id in both tiers and fails unless archive() refuses the batch
+without moving anything.
+
+Run from the backend directory:
+    python -m benchmarks.check_archive_ids
+"""
+import argparse
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+import models
+import transaction_archive
+
+
+def run() -> bool:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'archive.db')}")
+        models.Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            old = datetime.now(timezone.utc) - timedelta(days=365)
+            db.add_all([models.Transaction(user_id=1, reward_id=1, created_at=old) for _ in range(3)])
+            db.commit()
+            moved = transaction_archive.archive(db, older_than_days=30, log=lambda _: None)["moved"]
+            db.add_all([models.Transaction(user_id=1, reward_id=1) for _ in range(2)])
+            db.commit()
+            new_ids = db.scalars(select(models.Transaction.id).order_by(models.Transaction.id)).all()
+            problems = transaction_archive.verify(db, older_than_days=30)["problems"]
+            print(f"archived {moved}, new ids {new_ids}, problems {problems}")
+            ids_ok = moved == 3 and new_ids == [4, 5] and not problems
+
+            # An id in both tiers (as reuse used to cause) must stop the run before the copy
+            db.add(models.TransactionArchive(id=6, user_id=1, reward_id=1, created_at=old))
+            db.add(models.Transaction(id=6, user_id=1, reward_id=1, created_at=old))
+            db.commit()
+            try:
+                transaction_archive.archive(db, older_than_days=30, log=lambda _: None)
+                refused = False
+            except RuntimeError as e:
+                print(f"refused: {e}")
+                refused = True
+            hot_rows = db.scalar(select(func.count()).select_from(models.Transaction))
+            print(f"hot rows after refused run: {hot_rows}")
+            return ids_ok and refused and hot_rows == 3
+        finally:
+            db.close()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+    ok = run()
+    print("PASS" if ok else "FAIL")
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,75 @@
+"""Check that a fresh redemption shows up in the transaction export.
+
+Creates an owner, their business and a reward, redeems the reward once
+through POST /redeem/ and exports the business's history as CSV, NDJSON and
+gzipped CSV. The check fails unless every export contains the redemption
+exactly once. Rows stamped by the database's server default hold whole
+seconds, which used to fall below the export's first window on SQLite.
+
+Run from the backend directory:
+    python -m benchmarks.check_export
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import time
+
+import httpx
+
+import main
+import models
+from auth_utils import create_access_token
+from database import SessionLocal
+
+
+def seed():
+    db = SessionLocal()
+    try:
+        owner = models.User(email=f"export-{time.time_ns()}@example.com", name="Export", hashed_password="x",
+                            is_business_owner=True)
+        db.add(owner)
+        db.flush()
+        business = models.Business(name=f"Export {time.time_ns()}", is_approved=True, owner_id=owner.id)
+        db.add(business)
+        db.commit()
+        return owner.email, business.id
+    finally:
+        db.close()
+
+
+async def run() -> bool:
+    email, business_id = seed()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check", timeout=60) as client:
+        me = (await client.get("/auth/me", headers=headers)).json()
+        reward = (await client.post("/rewards/", params={"name": "Export reward", "points_required": 1,
+                                                          "business_id": business_id})).json()
+        (await client.post(f"/businesses/{business_id}/points", json={"user_id": me["id"], "points": 5},
+                           headers=headers)).raise_for_status()
+        redeemed = await client.post("/redeem/", params={"reward_id": reward["id"]},
+                                     headers=headers)
+        redeemed.raise_for_status()
+        transaction_id = redeemed.json()["transaction"]["id"]
+
+        path = f"/businesses/{business_id}/transactions/export"
+        csv_body = (await client.get(path, params={"format": "csv"}, headers=headers)).text
+        ndjson_body = (await client.get(path, params={"format": "ndjson"}, headers=headers)).text
+        gzip_body = gzip.decompress((await client.get(path, params={"format": "csv", "gzip": "true"},
+                                                      headers=headers)).content).decode()
+
+    csv_ids = [line.split(",")[0] for line in csv_body.splitlines()[1:]]
+    ndjson_ids = [str(json.loads(line)["transaction_id"]) for line in ndjson_body.splitlines()]
+    gzip_ids = [line.split(",")[0] for line in gzip_body.splitlines()[1:]]
+    print(f"transaction {transaction_id}: csv={csv_ids} ndjson={ndjson_ids} gzip={gzip_ids}")
+    expected = [str(transaction_id)]
+    return csv_ids == expected and ndjson_ids == expected and gzip_ids == expected
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+    ok = asyncio.run(run())
+    print("PASS" if ok else "FAIL")
+    raise SystemExit(0 if ok else 1)
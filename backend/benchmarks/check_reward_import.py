@@ -0,0 +1,72 @@
+"""Check that concurrent bulk imports never store a reward name twice.
+
+Creates an owner and their business, then sends the same catalog to
+POST /businesses/{id}/rewards/bulk from several clients at once, and once
+more with changed points. The check fails unless the business ends up with
+exactly one reward per name, holding the last import's points, and the
+repeated import reports every row as updated.
+
+Run from the backend directory:
+    python -m benchmarks.check_reward_import --clients 8 --rewards 200
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import func, select
+
+import main
+import models
+from auth_utils import create_access_token
+from database import SHARDED, SessionLocal, business_sessionmakers, shard_for_business
+
+
+def seed():
+    db = SessionLocal()
+    try:
+        owner = models.User(email=f"import-{time.time_ns()}@example.com", name="Import", hashed_password="x",
+                            is_business_owner=True)
+        db.add(owner)
+        db.flush()
+        business = models.Business(name=f"Import {time.time_ns()}", is_approved=True, owner_id=owner.id)
+        db.add(business)
+        db.commit()
+        return owner.email, business.id
+    finally:
+        db.close()
+
+
+def stored(business_id: int):
+    with business_sessionmakers()[shard_for_business(business_id) if SHARDED else 0]() as db:
+        return db.execute(
+            select(func.count(), func.count(func.distinct(models.RedeemrReward.name)), func.min(models.RedeemrReward.points_required))
+            .where(models.RedeemrReward.business_id == business_id)
+        ).one()
+
+
+async def run(clients: int, rewards: int) -> bool:
+    email, business_id = seed()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+    path = f"/businesses/{business_id}/rewards/bulk"
+    catalog = [{"name": f"Reward {n}", "points_required": 10} for n in range(rewards)]
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check", timeout=60) as client:
+        responses = await asyncio.gather(*(client.post(path, json=catalog, headers=headers) for _ in range(clients)))
+        statuses = sorted(response.status_code for response in responses)
+        changed = await client.post(path, json=[{**row, "points_required": 20} for row in catalog], headers=headers)
+
+    count, names, points = stored(business_id)
+    updated = changed.json().get("updated")
+    print(f"statuses={statuses} rewards={count} names={names} points={points} updated={updated}")
+    return count == names == rewards and points == 20 and updated == rewards
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--rewards", type=int, default=200)
+    args = parser.parse_args()
+    ok = asyncio.run(run(args.clients, args.rewards))
+    print("PASS" if ok else "FAIL")
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,83 @@
+"""Deterministic synthetic dataset for the benchmark suite.
+
+Named scales on top of bulk_load.load_synthetic. Every row is derived from
+its index and a seeded RNG, so two runs at the same scale and seed produce
+identical databases.
+
+Seed on its own from the backend directory (DATABASE_URL picks the target):
+    python -m benchmarks.dataset --scale medium
+"""
+import argparse
+from dataclasses import asdict, dataclass
+
+ADMIN_EMAIL = "admin@bench.redeemr"
+PASSWORD = "bench-password"
+
+
+@dataclass(frozen=True)
+class Scale:
+    users: int
+    businesses: int
+    rewards_per_business: int
+    transactions: int
+
+
+SCALES = {
+    "tiny": Scale(users=200, businesses=20, rewards_per_business=5, transactions=5_000),
+    "small": Scale(users=2_000, businesses=100, rewards_per_business=10, transactions=100_000),
+    "medium": Scale(users=20_000, businesses=1_000, rewards_per_business=10, transactions=1_000_000),
+    "large": Scale(users=100_000, businesses=5_000, rewards_per_business=20, transactions=5_000_000),
+}
+
+
+def user_email(index: int) -> str:
+    return f"user{index}@bench.redeemr"
+
+
+def home_business(user_id: int, scale: Scale) -> int:
+    """Business id where a seeded user holds their points (mirrors bulk_load's layout)."""
+    return user_id % scale.businesses + 1
+
+
+def reward_ids_for(business_id: int, scale: Scale) -> range:
+    """Reward ids belonging to a business (bulk_load's layout, shard id ranges included)."""
+    import bulk_load
+
+    return bulk_load.reward_ids_for(business_id, scale.rewards_per_business)
+
+
+def seed(scale: Scale, seed_value: int = 1234, log=print) -> dict:
+    """Create the schema and load the dataset into the DATABASE_URL database."""
+    import bulk_load
+
+    result = bulk_load.load_synthetic(
+        scale.users, scale.businesses, scale.rewards_per_business, scale.transactions,
+        seed=seed_value, password=PASSWORD, admin_email=ADMIN_EMAIL, email=user_email, log=log,
+    )
+    return {"scale": asdict(scale), "seed": seed_value, "seconds": result["seconds"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--businesses", type=int)
+    parser.add_argument("--rewards-per-business", type=int)
+    parser.add_argument("--transactions", type=int)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+    seed(scale_from_args(args), args.seed)
+
+
+def scale_from_args(args) -> Scale:
+    """The named scale with any per-table overrides from the command line applied."""
+    base = asdict(SCALES[args.scale])
+    for field in base:
+        value = getattr(args, field, None)
+        if value is not None:
+            base[field] = value
+    return Scale(**base)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Query plan audit: EXPLAIN every statement the app issues under load.
+
+Seeds a scratch database, like the benchmark suite, and records every
+distinct SQL statement the app sends with one sample of its parameters,
+from both the async and the sync engine. Recording covers the suite's
+scenarios plus probes(), which reach the routes the scenarios skip. Each
+statement then goes through EXPLAIN QUERY PLAN (SQLite) or EXPLAIN
+(Postgres). The audit exits non-zero when a plan scans a whole table
+holding at least --min-rows rows: a SQLite SCAN, full index scans included,
+or a Postgres Seq Scan. Scans listed in ALLOWED_SCANS are reported but do
+not fail the audit.
+
+Run from the backend directory:
+    python -m benchmarks.plan_audit --scale medium
+    python -m benchmarks.plan_audit --database-url postgresql://... --no-seed
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.dataset import SCALES, scale_from_args
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Statements that are not queries
+SKIPPED_PREFIXES = ("PRAGMA", "EXPLAIN", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "SELECT pg_", "SHOW")
+# (table, statement fragment) pairs whose full scan is expected, with the reason
+ALLOWED_SCANS = {
+    ("transactions", "INSERT INTO redemption_rollups_"): "rollup rebuild job recounts all history",
+}
+SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+POSTGRES_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+def probes(owner_id: int, newcomer_id: int):
+    """(method, path, params or JSON body, who) for routes the suite scenarios do not call."""
+    from benchmarks.dataset import user_email
+
+    recent = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
+    return [
+        ("GET", "/businesses/me", None, "owner"),
+        ("GET", "/businesses/", {"name_prefix": "Business 1", "limit": 50}, "admin"),
+        ("GET", "/businesses/", {"is_approved": "false"}, "admin"),
+        ("GET", "/users/all", {"is_business_owner": "true", "limit": 50}, "admin"),
+        ("GET", "/businesses/nearby", {"lat": 51.0, "lon": 0.0, "radius_km": 5, "include_rewards": "true"}, None),
+        ("GET", "/businesses/nearby", {"min_lat": 51.0, "min_lon": 0.0, "max_lat": 51.05, "max_lon": 0.05}, None),
+        ("GET", "/search", {"q": "reward"}, None),
+        ("GET", f"/businesses/{owner_id}/analytics", {"granularity": "day"}, "owner"),
+        ("GET", "/admin/analytics", {"granularity": "day"}, "admin"),
+        ("GET", f"/businesses/{owner_id}/transactions/export", {"start": recent}, "owner"),
+        ("POST", f"/businesses/{owner_id}/points", {"json": {"user_id": newcomer_id, "points": 10}}, "owner"),
+        ("POST", f"/businesses/{owner_id}/rewards/bulk",
+         {"json": [{"name": "Audit reward", "points_required": 5}, {"name": "Reward 1", "points_required": 1}]}, "owner"),
+        ("PUT", f"/businesses/{owner_id}/location", {"json": {"latitude": 51.0, "longitude": 0.0}}, "owner"),
+        ("POST", "/rewards/", {"name": "Audit single", "points_required": 1, "business_id": owner_id}, None),
+        ("POST", "/businesses/register", {"json": {"name": "Audit business"}}, "newcomer"),
+        ("GET", "/admin/stats", None, "admin"),
+        ("POST", "/request-password-reset/", {"json": {"email": user_email(owner_id)}}, None),
+        ("POST", "/admin/rollups/rebuild", None, "admin"),
+        ("GET", "/admin/jobs", None, "admin"),
+    ]
+
+
+class StatementLog:
+    """First sample of every distinct statement, keyed by SQL text."""
+
+    def __init__(self):
+        self.statements = {}
+        self.recording = False
+
+    def attach(self, sync_engine, engine_name: str) -> None:
+        from sqlalchemy import event
+        import query_profiler
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if not self.recording or statement.lstrip().upper().startswith(SKIPPED_PREFIXES):
+                return
+            entry = self.statements.get(statement)
+            if entry is None:
+                sample = parameters[0] if executemany and parameters else parameters
+                entry = self.statements[statement] = {"engine": engine_name, "parameters": sample, "routes": set()}
+            queries = query_profiler.current()
+            entry["routes"].add(queries.route if queries is not None else "(background)")
+
+        event.listen(sync_engine, "before_cursor_execute", capture)
+
+
+async def exercise(scale, seed_value: int, requests: int) -> None:
+    import httpx
+    import job_queue
+    import main as app_module
+    from auth_utils import create_access_token
+    from benchmarks.dataset import user_email
+    from benchmarks.suite import SCENARIOS, Context, run_scenario
+
+    ctx = Context(scale, seed_value)
+    owner_id, newcomer_id = 1, scale.businesses + 1
+    headers = {
+        "admin": ctx.admin,
+        "owner": {"Authorization": f"Bearer {create_access_token({'sub': user_email(owner_id)})}"},
+        "newcomer": {"Authorization": f"Bearer {create_access_token({'sub': user_email(newcomer_id)})}"},
+    }
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://audit", timeout=120) as client:
+        for name in SCENARIOS:
+            await run_scenario(client, name, ctx, requests if name != "login_storm" else 5, 8)
+        for method, path, params, who in probes(owner_id, newcomer_id):
+            kwargs = {"headers": headers.get(who)}
+            if params and "json" in params:
+                kwargs["json"] = params["json"]
+            elif params:
+                kwargs["params"] = params
+            response = await client.request(method, path, **kwargs)
+            if response.status_code >= 400:
+                print(f"  probe {method} {path} -> {response.status_code} {response.text[:200]}")
+        # A purge runs as a background job; delete the business registered above
+        newest = (await client.get("/businesses/", params={"name_prefix": "Audit business"}, headers=ctx.admin)).json()
+        for business in newest:
+            await client.delete(f"/businesses/{business['id']}", headers=ctx.admin)
+        # The transport runs no startup hooks, so no workers: run the queued jobs here
+        await job_queue.run_until_idle()
+    app_module.password_hasher.shutdown()
+
+
+async def explain_all(log: StatementLog) -> list:
+    """(statement, entry, plan lines) for every recorded statement."""
+    from database import async_engine, engine
+
+    plans = []
+    dialect_name = engine.dialect.name
+    prefix = "EXPLAIN QUERY PLAN " if dialect_name == "sqlite" else "EXPLAIN "
+    async with async_engine.connect() as async_conn:
+        with engine.connect() as sync_conn:
+            for statement, entry in log.statements.items():
+                parameters = entry["parameters"] or ()
+                if entry["engine"] == "async":
+                    rows = (await async_conn.exec_driver_sql(prefix + statement, parameters)).all()
+                else:
+                    rows = sync_conn.exec_driver_sql(prefix + statement, parameters).all()
+                # SQLite rows are (id, parent, notused, detail); Postgres rows are one line of text
+                plans.append((statement, entry, [row[-1] for row in rows]))
+    return plans
+
+
+def table_sizes() -> dict:
+    from sqlalchemy import func, select
+    import models
+    from database import engine
+
+    with engine.connect() as conn:
+        return {name: conn.scalar(select(func.count()).select_from(table))
+                for name, table in models.Base.metadata.tables.items()}
+
+
+def full_scans(plan: list, dialect_name: str, sizes: dict) -> list:
+    """Tables (known to the models, aliases folded) that a plan reads end to end."""
+    pattern = SQLITE_SCAN if dialect_name == "sqlite" else POSTGRES_SCAN
+    scanned = []
+    for line in plan:
+        match = pattern.search(line)
+        if match is None:
+            continue
+        # SQLAlchemy aliases a table as <name>_<n>
+        table = re.sub(r"_\d+$", "", match.group(1))
+        if table in sizes and table not in scanned:
+            scanned.append(table)
+    return scanned
+
+
+def audit(plans: list, sizes: dict, dialect_name: str, min_rows: int) -> tuple:
+    failures, allowed = [], []
+    for statement, entry, plan in plans:
+        for table in full_scans(plan, dialect_name, sizes):
+            if sizes[table] < min_rows:
+                continue
+            finding = {"table": table, "rows": sizes[table], "routes": sorted(entry["routes"]),
+                       "statement": " ".join(statement.split()), "plan": plan}
+            reason = next((why for (name, fragment), why in ALLOWED_SCANS.items()
+                           if name == table and fragment in finding["statement"]), None)
+            (allowed if reason else failures).append({**finding, "allowed": reason})
+    return failures, allowed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--businesses", type=int)
+    parser.add_argument("--rewards-per-business", type=int)
+    parser.add_argument("--transactions", type=int)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--database-url", help="Audit an existing database instead of a scratch SQLite file")
+    parser.add_argument("--no-seed", action="store_true", help="The database is already seeded at this scale")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per suite scenario")
+    parser.add_argument("--min-rows", type=int, default=1000, help="Full scans of smaller tables are ignored")
+    parser.add_argument("--verbose", action="store_true", help="Print every statement with its plan")
+    args = parser.parse_args()
+    scale = scale_from_args(args)
+
+    scratch = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch.name, 'audit.db')}"
+    sys.path.insert(0, BACKEND_DIR)
+
+    try:
+        # Engines are configured at import time, so nothing from the app is imported before this point
+        from benchmarks.dataset import seed
+        if not args.no_seed:
+            seed(scale, args.seed, log=lambda message: None)
+        import main as app_module
+        from database import async_engine, engine
+
+        log = StatementLog()
+        log.attach(engine, "sync")
+        log.attach(async_engine.sync_engine, "async")
+        log.recording = True
+        asyncio.run(exercise(scale, args.seed, args.requests))
+        log.recording = False
+
+        sizes = table_sizes()
+        plans = asyncio.run(explain_all(log))
+        failures, allowed = audit(plans, sizes, engine.dialect.name, args.min_rows)
+    finally:
+        if scratch is not None:
+            scratch.cleanup()
+
+    print(f"Audited {len(plans)} distinct statements against {engine.dialect.name} "
+          f"(tables of {args.min_rows}+ rows: {', '.join(t for t, n in sizes.items() if n >= args.min_rows)})")
+    if args.verbose:
+        for statement, entry, plan in plans:
+            print(f"\n[{', '.join(sorted(entry['routes']))}] {' '.join(statement.split())}")
+            for line in plan:
+                print(f"    {line}")
+    for finding in allowed:
+        print(f"ALLOWED full scan of {finding['table']} ({finding['allowed']}): {finding['statement'][:160]}")
+    for finding in failures:
+        print(f"\nFULL SCAN of {finding['table']} ({finding['rows']} rows) from {', '.join(finding['routes'])}")
+        print(f"  {finding['statement'][:400]}")
+        for line in finding["plan"]:
+            print(f"    {line}")
+    if failures:
+        sys.exit(1)
+    print("No full scans of large tables")
+
+
+if __name__ == "__main__":
+    main()
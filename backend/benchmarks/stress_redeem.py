@@ -0,0 +1,92 @@
+"""Hammer one points account with concurrent redemptions.
+
+Credits a single customer with a known balance at one business, then fires
+many concurrent POST /redeem/ calls against it. The run fails unless exactly
+balance // cost redemptions succeed, the balance never goes negative and the
+ledger still sums to the materialized balance.
+
+Run from the backend directory:
+    python -m benchmarks.stress_redeem --clients 200 --balance 1000 --cost 7
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import func, select
+
+import main
+import models
+from auth_utils import create_access_token
+from database import AsyncSessionLocal, SessionLocal
+import points
+
+
+def seed(balance: int, cost: int):
+    db = SessionLocal()
+    try:
+        user = models.User(email=f"stress-{time.time_ns()}@example.com", name="Stress", hashed_password="x")
+        business = models.Business(name=f"Stress {time.time_ns()}", is_approved=True)
+        db.add_all([user, business])
+        db.flush()
+        reward = models.RedeemrReward(name="Stress reward", points_required=cost, business_id=business.id)
+        db.add(reward)
+        db.commit()
+        ids = user.id, user.email, business.id, reward.id
+    finally:
+        db.close()
+    return ids
+
+
+async def credit(user_id: int, business_id: int, balance: int):
+    async with AsyncSessionLocal() as db:
+        await points.credit_points(db, user_id, business_id, balance)
+        await db.commit()
+
+
+async def verify(user_id: int, business_id: int):
+    async with AsyncSessionLocal() as db:
+        balance = await points.get_balance(db, user_id, business_id)
+        ledger_total = await db.scalar(
+            select(func.coalesce(func.sum(models.PointsLedgerEntry.delta), 0)).where(
+                models.PointsLedgerEntry.user_id == user_id,
+                models.PointsLedgerEntry.business_id == business_id,
+            )
+        )
+    return balance, ledger_total
+
+
+async def run(clients: int, balance: int, cost: int) -> bool:
+    user_id, email, business_id, reward_id = seed(balance, cost)
+    await credit(user_id, business_id, balance)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://stress", timeout=60) as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(
+            *(client.post("/redeem/", params={"reward_id": reward_id}, headers=headers) for _ in range(clients))
+        )
+        elapsed = time.perf_counter() - started
+
+    succeeded = sum(1 for r in responses if r.status_code == 200)
+    refused = sum(1 for r in responses if r.status_code == 400)
+    errors = clients - succeeded - refused
+    final_balance, ledger_total = await verify(user_id, business_id)
+    expected = min(clients, balance // cost)
+
+    print(f"{clients} clients in {elapsed:.2f}s ({clients / elapsed:.1f} req/s)")
+    print(f"succeeded={succeeded} refused={refused} errors={errors} expected_successes={expected}")
+    print(f"balance={final_balance} ledger_total={ledger_total}")
+    return succeeded == expected and errors == 0 and final_balance >= 0 and final_balance == ledger_total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--balance", type=int, default=1000)
+    parser.add_argument("--cost", type=int, default=7)
+    args = parser.parse_args()
+    ok = asyncio.run(run(args.clients, args.balance, args.cost))
+    print("PASS" if ok else "FAIL")
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,281 @@
+"""End-to-end API benchmark suite with a stored baseline.
+
+Seeds a synthetic dataset (see benchmarks/dataset.py), then runs a fixed set
+of mixed scenarios:
+- login_storm: bcrypt-bound logins;
+- catalog_browse: rewards, /auth/me and balances with a bearer token;
+- redemption_burst: POST /redeem/ against funded home businesses;
+- admin_listings: paginated /businesses/ and /users/all, plus /admin/stats.
+
+Each scenario runs either in-process over the ASGI transport or against a
+local uvicorn, or both. Results report throughput and p50/p95/p99 latency.
+--save-baseline writes them to a JSON file. --compare checks a run against
+that file and exits non-zero when any scenario loses more than --threshold
+of its throughput or p95 latency.
+
+Run from the backend directory:
+    python -m benchmarks.suite --scale small --mode inprocess uvicorn --save-baseline bench-baseline.json
+    python -m benchmarks.suite --scale small --mode inprocess uvicorn --compare bench-baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.dataset import ADMIN_EMAIL, PASSWORD, SCALES, home_business, reward_ids_for, scale_from_args, user_email
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("login_storm", "catalog_browse", "redemption_burst", "admin_listings")
+# Logins are ~100x more expensive than the other calls, so they get fewer requests
+LOGIN_REQUEST_SHARE = 0.1
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Context:
+    """Per-run state the scenarios share: the scale, bearer tokens and listing cursors."""
+
+    def __init__(self, scale, seed_value: int):
+        from auth_utils import create_access_token
+
+        self.scale = scale
+        self.rng = random.Random(seed_value)
+        # Tokens are minted directly so the setup does not pay for bcrypt
+        sample = self.rng.sample(range(1, scale.users + 1), min(scale.users, 500))
+        self.customers = [(user_id, {"Authorization": f"Bearer {create_access_token({'sub': user_email(user_id)})}"})
+                          for user_id in sample]
+        self.admin = {"Authorization": f"Bearer {create_access_token({'sub': ADMIN_EMAIL})}"}
+        self.cursors = {}
+
+
+async def login_storm(client, ctx: Context):
+    user_id = ctx.rng.randrange(ctx.scale.users) + 1
+    return await client.post("/auth/login", json={"email": user_email(user_id), "password": PASSWORD})
+
+
+async def catalog_browse(client, ctx: Context):
+    user_id, headers = ctx.rng.choice(ctx.customers)
+    roll = ctx.rng.random()
+    if roll < 0.7:
+        return await client.get(f"/businesses/{ctx.rng.randrange(ctx.scale.businesses) + 1}/rewards/")
+    if roll < 0.9:
+        return await client.get("/auth/me", headers=headers)
+    return await client.get(f"/businesses/{home_business(user_id, ctx.scale)}/points/me", headers=headers)
+
+
+async def redemption_burst(client, ctx: Context):
+    user_id, headers = ctx.rng.choice(ctx.customers)
+    reward_id = ctx.rng.choice(reward_ids_for(home_business(user_id, ctx.scale), ctx.scale))
+    return await client.post("/redeem/", params={"reward_id": reward_id}, headers=headers)
+
+
+async def admin_listings(client, ctx: Context):
+    path = ctx.rng.choice(("/businesses/", "/users/all", "/admin/stats"))
+    if path == "/admin/stats":
+        return await client.get(path, headers=ctx.admin)
+    # Walk each listing page by page, starting over once it runs out
+    params = {"limit": 100}
+    if ctx.cursors.get(path):
+        params["cursor"] = ctx.cursors[path]
+    response = await client.get(path, params=params, headers=ctx.admin)
+    ctx.cursors[path] = response.headers.get("X-Next-Cursor")
+    return response
+
+
+async def run_scenario(client, name: str, ctx: Context, total: int, concurrency: int) -> dict:
+    operation = globals()[name]
+    latencies, errors = [], {}
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                outcome = (await operation(client, ctx)).status_code
+            except Exception as e:
+                outcome = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            if not isinstance(outcome, int) or outcome >= 400:
+                errors[outcome] = errors.get(outcome, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": total,
+        "errors": sum(errors.values()),
+        "errors_by_outcome": {str(outcome): count for outcome, count in errors.items()},
+        "rps": total / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def run_mode(base_url: str, transport, ctx: Context, args) -> dict:
+    import httpx
+
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=120) as client:
+        for name in args.scenarios:
+            total = max(1, int(args.requests * LOGIN_REQUEST_SHARE)) if name == "login_storm" else args.requests
+            # Unmeasured warm-up: worker pools, connection pools and caches start cold
+            if args.warmup:
+                await run_scenario(client, name, ctx, args.warmup, args.concurrency)
+            results[name] = await run_scenario(client, name, ctx, total, args.concurrency)
+            print(format_row(name, results[name]))
+    return results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_uvicorn(port: int, workers: int) -> subprocess.Popen:
+    import httpx
+
+    cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+    server = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=dict(os.environ))
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with {server.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("uvicorn did not become ready within 60s")
+
+
+def format_row(name: str, row: dict) -> str:
+    return (f"  {name:<17} {row['rps']:9.1f} req/s  p50 {row['p50_ms']:8.2f} ms  p95 {row['p95_ms']:8.2f} ms  "
+            f"p99 {row['p99_ms']:8.2f} ms  errors {row['errors']}/{row['requests']}"
+            + (f" {row['errors_by_outcome']}" if row["errors"] else ""))
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Regressions of throughput or p95 latency beyond the threshold, as messages."""
+    failures = []
+    for mode, scenarios in current["results"].items():
+        for name, row in scenarios.items():
+            base = baseline.get("results", {}).get(mode, {}).get(name)
+            if base is None:
+                continue
+            if row["rps"] < base["rps"] * (1 - threshold):
+                failures.append(f"{mode}/{name}: throughput {row['rps']:.1f} req/s vs baseline {base['rps']:.1f}")
+            if row["p95_ms"] > base["p95_ms"] * (1 + threshold):
+                failures.append(f"{mode}/{name}: p95 {row['p95_ms']:.2f} ms vs baseline {base['p95_ms']:.2f} ms")
+            if row["errors"] > base["errors"]:
+                failures.append(f"{mode}/{name}: {row['errors']} errors vs baseline {base['errors']}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--businesses", type=int)
+    parser.add_argument("--rewards-per-business", type=int)
+    parser.add_argument("--transactions", type=int)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--database-url", help="Benchmark an existing database instead of a scratch SQLite file")
+    parser.add_argument("--no-seed", action="store_true", help="The database is already seeded at this scale")
+    parser.add_argument("--mode", nargs="+", choices=("inprocess", "uvicorn"), default=["inprocess"])
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests before each scenario")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression, as a fraction")
+    args = parser.parse_args()
+    scale = scale_from_args(args)
+
+    scratch = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch.name, 'bench.db')}"
+    sys.path.insert(0, BACKEND_DIR)
+
+    try:
+        # Engines are configured at import time, so nothing from the app is imported before this point
+        from benchmarks.dataset import seed
+        seeded = None if args.no_seed else seed(scale, args.seed)
+
+        run = {
+            "meta": {
+                "scale": scale.__dict__,
+                "seed": args.seed,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "warmup": args.warmup,
+                "database": "sqlite" if scratch else args.database_url.split(":", 1)[0],
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "seed_seconds": seeded["seconds"] if seeded else None,
+            },
+            "results": {},
+        }
+        for mode in args.mode:
+            print(f"{mode}:")
+            ctx = Context(scale, args.seed)
+            if mode == "inprocess":
+                import httpx
+                import main as app_module
+                transport = httpx.ASGITransport(app=app_module.app)
+                try:
+                    run["results"][mode] = asyncio.run(run_mode("http://bench", transport, ctx, args))
+                finally:
+                    app_module.password_hasher.shutdown()
+            else:
+                port = free_port()
+                server = start_uvicorn(port, args.workers)
+                try:
+                    run["results"][mode] = asyncio.run(run_mode(f"http://127.0.0.1:{port}", None, ctx, args))
+                finally:
+                    server.terminate()
+                    server.wait(timeout=30)
+    finally:
+        if scratch is not None:
+            scratch.cleanup()
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        failures = compare(run, baseline, args.threshold)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} of {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
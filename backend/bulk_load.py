@@ -0,0 +1,356 @@
+"""Bulk loader for staging and performance databases.
+
+Rows go in through Core executemany in chunks of BULK_CHUNK_SIZE, with one
+commit per chunk, so memory stays flat and a crash loses at most one chunk.
+Generated users share a single precomputed bcrypt hash. Imported rows that
+carry a plaintext `password` are hashed in parallel across worker processes.
+Stats counters and rollups are rebuilt once at the end instead of per row.
+With sharded storage (SHARD_COUNT), rows of business-scoped tables go to
+their business's shard, and generated reward ids come from that shard's
+id range.
+
+Generate a synthetic dataset (DATABASE_URL picks the target):
+    python bulk_load.py synthetic --users 500000 --businesses 20000 --rewards-per-business 10 --transactions 10000000
+
+Import rows from a file (CSV with a header row, or one JSON object per line):
+    python bulk_load.py import users users.csv
+    python bulk_load.py import transactions transactions.ndjson
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import time
+from sqlalchemy import Boolean, DateTime, Float, Integer, insert, text
+import geo
+import models
+import points
+import rollups
+import stats_counters
+import database
+from database import AsyncSessionLocal, engine
+from password_hasher import HASH_WORKERS, hash_password
+
+# Rows per executemany batch and commit
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "50000"))
+
+# Tables the import command accepts, by name
+TABLES = {
+    "users": models.User,
+    "businesses": models.Business,
+    "rewards": models.RedeemrReward,
+    "transactions": models.Transaction,
+    "points_balances": models.PointsBalance,
+    "points_ledger": models.PointsLedgerEntry,
+}
+
+# Synthetic data layout
+SYNTHETIC_PASSWORD = "password123"
+SYNTHETIC_ADMIN_EMAIL = "admin@example.com"
+# Generated transactions are spread over this many days before the reference time
+SYNTHETIC_HISTORY_DAYS = 90
+# Every generated user holds this many points at their home business
+SYNTHETIC_STARTING_BALANCE = 1_000_000
+# Generated businesses are scattered uniformly over this (min_lat, min_lon, max_lat, max_lon) box
+SYNTHETIC_REGION = (50.0, -1.0, 52.0, 1.0)
+
+def synthetic_email(user_id: int) -> str:
+    return f"user{user_id}@example.com"
+
+def home_business(user_id: int, businesses: int) -> int:
+    """Business where a generated user holds their points."""
+    return user_id % businesses + 1
+
+def reward_ids_for(business_id: int, rewards_per_business: int) -> range:
+    """Generated reward ids belonging to a business; rewards are laid out business by business."""
+    first = database.id_offset_for_business(business_id) + (business_id - 1) * rewards_per_business + 1
+    return range(first, first + rewards_per_business)
+
+def _shard_of(table, row: dict) -> int:
+    """Shard for a row of a sharded table: by business, or by reward for transactions."""
+    if "business_id" in row:
+        shard = database.shard_for_business(row["business_id"])
+        if table is models.RedeemrReward and row.get("id") is not None and database.shard_for_id(row["id"]) != shard:
+            raise ValueError(f"Reward id {row['id']} is outside the id range of business {row['business_id']}'s shard")
+        return shard
+    return database.shard_for_id(row["reward_id"])
+
+def load_rows(table, rows, chunk_size: int = BULK_CHUNK_SIZE, log=print) -> int:
+    """Insert an iterable of row dicts in chunks, committing after each one. Returns rows loaded."""
+    rows = iter(rows)
+    loaded = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        if database.SHARDED and table.__tablename__ in database.SHARDED_TABLES:
+            by_shard = {}
+            for row in chunk:
+                by_shard.setdefault(_shard_of(table, row), []).append(row)
+            for shard, rows_for_shard in by_shard.items():
+                with database.shard_engines[shard].begin() as conn:
+                    conn.execute(insert(table), rows_for_shard)
+        else:
+            with engine.begin() as conn:
+                conn.execute(insert(table), chunk)
+        loaded += len(chunk)
+        log(f"  {table.__tablename__}: {loaded} rows")
+    return loaded
+
+def fast_sqlite_session() -> None:
+    """Trade durability for load speed on SQLite (the file is unrecoverable if the load crashes)."""
+    if engine.dialect.name != "sqlite":
+        return
+    from sqlalchemy import event
+
+    def _unsafe_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.close()
+
+    for target in (engine, *database.shard_engines):
+        event.listen(target, "connect", _unsafe_pragmas)
+        target.dispose()
+
+def finish_load(rebuild_rollups: bool = True, log=print) -> dict:
+    """Fix up sequences after explicit ids, then rebuild rollups and stats counters."""
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for table in ("users", "businesses", "redeemr_rewards", "transactions", "points_ledger"):
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 1))"
+                ))
+
+    if rebuild_rollups:
+        for make_session in database.business_sessionmakers():
+            db = make_session()
+            try:
+                log(f"  rollups: {rollups.rebuild(db)}")
+            finally:
+                db.close()
+
+    async def rebuild_counters():
+        async with AsyncSessionLocal() as session:
+            return await stats_counters.rebuild(session)
+
+    counters = asyncio.run(rebuild_counters())
+    log(f"  counters: {counters}")
+    return counters
+
+def load_synthetic(users: int, businesses: int, rewards_per_business: int, transactions: int,
+                   seed: int = 1234, password: str = SYNTHETIC_PASSWORD,
+                   admin_email: str = SYNTHETIC_ADMIN_EMAIL, email=synthetic_email,
+                   reference_time: datetime = None, region=SYNTHETIC_REGION, log=print) -> dict:
+    """Generate a deterministic dataset into an empty database.
+
+    User i owns business i for the first `businesses` users. Every user is
+    funded at home_business(i), and the superuser `admin_email` comes after
+    the generated users. Businesses get random coordinates inside `region`.
+    Identical arguments give identical rows.
+    """
+    if users < businesses:
+        raise ValueError("Every business needs an owner: users must be >= businesses")
+
+    models.Base.metadata.create_all(bind=engine)
+    database.create_shard_tables()
+    rng = random.Random(seed)
+    reference_time = reference_time or datetime(2024, 1, 1, tzinfo=timezone.utc)
+    # One bcrypt hash, shared by every generated account
+    password_hash = hash_password(password)
+    started = time.perf_counter()
+
+    def user_rows():
+        for user_id in range(1, users + 1):
+            yield {
+                "id": user_id,
+                "email": email(user_id),
+                "name": f"User {user_id}",
+                "hashed_password": password_hash,
+                "is_active": True,
+                "is_superuser": False,
+                "is_business_owner": user_id <= businesses,
+            }
+        yield {
+            "id": users + 1,
+            "email": admin_email,
+            "name": "Admin",
+            "hashed_password": password_hash,
+            "is_active": True,
+            "is_superuser": True,
+            "is_business_owner": False,
+        }
+
+    reward_count = businesses * rewards_per_business
+    history = SYNTHETIC_HISTORY_DAYS * 86400
+    load_rows(models.User, user_rows(), log=log)
+    def business_rows():
+        # Own RNG, so adding locations did not change the rows generated after them
+        located = random.Random(seed + 1)
+        min_lat, min_lon, max_lat, max_lon = region
+        for i in range(1, businesses + 1):
+            latitude, longitude = located.uniform(min_lat, max_lat), located.uniform(min_lon, max_lon)
+            yield {
+                "id": i,
+                "name": f"Business {i}",
+                "owner_id": i,
+                "is_approved": True,
+                "latitude": latitude,
+                "longitude": longitude,
+                "geohash": geo.encode(latitude, longitude),
+            }
+
+    load_rows(models.Business, business_rows(), log=log)
+    def reward_id(i: int) -> int:
+        """Id of the i-th generated reward (i + 1 unless sharded)."""
+        return reward_ids_for(i // rewards_per_business + 1, rewards_per_business)[i % rewards_per_business]
+
+    load_rows(models.RedeemrReward, (
+        {
+            "id": reward_id(i),
+            "name": f"Reward {i % rewards_per_business + 1}",
+            "points_required": rng.choice((0, 10, 25, 50, 100)),
+            "business_id": i // rewards_per_business + 1,
+        }
+        for i in range(reward_count)
+    ), log=log)
+    load_rows(models.PointsBalance, (
+        {"user_id": i, "business_id": home_business(i, businesses), "balance": SYNTHETIC_STARTING_BALANCE}
+        for i in range(1, users + 1)
+    ), log=log)
+    # Matching earn entries keep the ledger summing to the materialized balances
+    load_rows(models.PointsLedgerEntry, (
+        {"user_id": i, "business_id": home_business(i, businesses), "delta": SYNTHETIC_STARTING_BALANCE, "kind": points.EARN}
+        for i in range(1, users + 1)
+    ), log=log)
+    load_rows(models.Transaction, (
+        {
+            "user_id": rng.randrange(users) + 1,
+            "reward_id": reward_id(rng.randrange(reward_count)),
+            "created_at": reference_time - timedelta(seconds=rng.randrange(history)),
+        }
+        for _ in range(transactions)
+    ), log=log)
+
+    finish_load(log=log)
+    elapsed = time.perf_counter() - started
+    log(f"Loaded in {elapsed:.1f}s")
+    return {"seconds": elapsed}
+
+def _coerce(table, row: dict) -> dict:
+    """Turn CSV strings (and JSON scalars) into values matching the table's column types."""
+    columns = table.__table__.columns
+    values = {}
+    for key, value in row.items():
+        if key not in columns:
+            continue
+        if value == "" or value is None:
+            values[key] = None
+            continue
+        column_type = columns[key].type
+        if isinstance(column_type, Boolean) and isinstance(value, str):
+            value = value.strip().lower() in ("1", "true", "t", "yes", "y")
+        elif isinstance(column_type, Integer) and not isinstance(value, bool):
+            value = int(value)
+        elif isinstance(column_type, Float):
+            value = float(value)
+        elif isinstance(column_type, DateTime) and isinstance(value, str):
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        values[key] = value
+    # Imported coordinates are indexed like API-set ones
+    if table is models.Business and values.get("latitude") is not None and values.get("longitude") is not None:
+        if not values.get("geohash"):
+            values["geohash"] = geo.encode(values["latitude"], values["longitude"])
+    return values
+
+def read_file(path: str, file_format: str = None):
+    """Yield row dicts from a CSV (header row) or NDJSON file."""
+    file_format = file_format or ("csv" if path.endswith(".csv") else "ndjson")
+    with open(path, newline="") as f:
+        if file_format == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def import_file(table_name: str, path: str, file_format: str = None, default_password: str = None,
+                log=print) -> int:
+    """Load rows from a file into one table.
+
+    For users, a `password` column is hashed per row in parallel across
+    worker processes. Rows without one get the single hash of
+    --default-password, when given.
+    """
+    table = TABLES[table_name]
+    models.Base.metadata.create_all(bind=engine)
+    database.create_shard_tables()
+    default_hash = hash_password(default_password) if default_password else None
+    started = time.perf_counter()
+
+    def rows():
+        source = read_file(path, file_format)
+        if table is not models.User:
+            for row in source:
+                yield _coerce(table, row)
+            return
+        with ProcessPoolExecutor(max_workers=HASH_WORKERS) as pool:
+            while True:
+                chunk = list(islice(source, BULK_CHUNK_SIZE))
+                if not chunk:
+                    return
+                plaintext = [row.pop("password", None) for row in chunk]
+                hashes = dict(zip(
+                    (i for i, value in enumerate(plaintext) if value),
+                    pool.map(hash_password, [value for value in plaintext if value], chunksize=64),
+                ))
+                for i, row in enumerate(chunk):
+                    values = _coerce(table, row)
+                    if i in hashes:
+                        values["hashed_password"] = hashes[i]
+                    elif not values.get("hashed_password"):
+                        values["hashed_password"] = default_hash
+                    yield values
+
+    loaded = load_rows(table, rows(), log=log)
+    # Rollups are derived from transactions and their rewards; other tables only move counters
+    finish_load(rebuild_rollups=table in (models.Transaction, models.RedeemrReward), log=log)
+    log(f"Imported {loaded} {table_name} rows in {time.perf_counter() - started:.1f}s")
+    return loaded
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--unsafe-fast", action="store_true",
+                        help="SQLite only: synchronous=OFF and an in-memory journal while loading")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    synthetic = commands.add_parser("synthetic", help="Generate a synthetic dataset into an empty database")
+    synthetic.add_argument("--users", type=int, default=100_000)
+    synthetic.add_argument("--businesses", type=int, default=5_000)
+    synthetic.add_argument("--rewards-per-business", type=int, default=10)
+    synthetic.add_argument("--transactions", type=int, default=1_000_000)
+    synthetic.add_argument("--seed", type=int, default=1234)
+    synthetic.add_argument("--password", default=SYNTHETIC_PASSWORD, help="Password for every generated account")
+
+    importer = commands.add_parser("import", help="Import rows from a CSV or NDJSON file")
+    importer.add_argument("table", choices=TABLES)
+    importer.add_argument("path")
+    importer.add_argument("--format", choices=("csv", "ndjson"), help="Defaults to the file extension")
+    importer.add_argument("--default-password", help="Hashed once and used for user rows without a password")
+
+    args = parser.parse_args()
+    if args.unsafe_fast:
+        fast_sqlite_session()
+    if args.command == "synthetic":
+        load_synthetic(args.users, args.businesses, args.rewards_per_business, args.transactions,
+                       seed=args.seed, password=args.password)
+    else:
+        import_file(args.table, args.path, args.format, args.default_password)
+
+if __name__ == "__main__":
+    main()
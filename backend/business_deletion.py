@@ -0,0 +1,136 @@
+from sqlalchemy import delete, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+import asyncio
+import os
+import job_queue
+import models
+import rollups
+import search
+import stats_counters
+from database import SHARDED, AsyncSessionLocal, business_session
+from logs import get_logger
+
+# Cascade delete configuration
+DELETE_CHUNK_SIZE = int(os.getenv("DELETE_CHUNK_SIZE", "1000"))
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+logger = get_logger("business_deletion")
+
+async def _delete_in_chunks(job_id: int, business_id: int, table, where, progress_field: str = None, keys=None,
+                            counter: str = None, before_delete=None):
+    """Delete the rows matching `where` in bounded chunks, committing each chunk with the job's progress.
+
+    Chunks are the first DELETE_CHUNK_SIZE matching rows, picked by `keys`:
+    the primary key, or the columns that complete it beside business_id. With sharded
+    storage the rows and their counter live on the business's shard, which
+    commits just before the job's progress in the main database.
+    `before_delete(db, keys)` runs and commits in the main database before
+    each chunk goes, so a crash in between only repeats it.
+    """
+    keys = keys or (table.id,)
+    key = keys[0] if len(keys) == 1 else tuple_(*keys)
+    while True:
+        async with AsyncSessionLocal() as db, business_session(db, business_id) as shard:
+            chunk = select(*keys).where(*where).limit(DELETE_CHUNK_SIZE)
+            if before_delete is not None:
+                chunk = (await shard.scalars(chunk)).all()
+                if not chunk:
+                    return
+                await before_delete(db, chunk)
+                await db.commit()
+            result = await shard.execute(
+                delete(table).where(*where, key.in_(chunk)).execution_options(synchronize_session=False)
+            )
+            deleted = result.rowcount or 0
+            if deleted == 0:
+                return
+            values = {"updated_at": func.now()}
+            if progress_field:
+                values[progress_field] = getattr(models.DeletionJob, progress_field) + deleted
+            await db.execute(update(models.DeletionJob).where(models.DeletionJob.id == job_id).values(values))
+            if counter:
+                await stats_counters.bump(shard, **{counter: -deleted})
+            await shard.commit()
+            await db.commit()
+        # Let redemptions and other writers in between chunks
+        await asyncio.sleep(0)
+
+async def run_job(job_id: int) -> None:
+    """Purge a soft-deleted business's rows chunk by chunk. Safe to re-run after a crash.
+
+    A failure is recorded on the deletion job and re-raised, so the job
+    queue retries the purge.
+    """
+    async with AsyncSessionLocal() as db:
+        job = await db.scalar(select(models.DeletionJob).where(models.DeletionJob.id == job_id))
+        if job is None or job.status == DONE:
+            return
+        business_id = job.business_id
+        job.status = RUNNING
+        job.error = None
+        await db.commit()
+
+    try:
+        reward_ids = select(models.RedeemrReward.id).where(models.RedeemrReward.business_id == business_id)
+
+        # Ledger entries reference transactions, so they go first
+        await _delete_in_chunks(job_id, business_id, models.PointsLedgerEntry,
+                                [models.PointsLedgerEntry.business_id == business_id], "ledger_entries_deleted")
+        await _delete_in_chunks(job_id, business_id, models.PointsBalance,
+                                [models.PointsBalance.business_id == business_id], keys=(models.PointsBalance.user_id,))
+        await _delete_in_chunks(job_id, business_id, models.Transaction,
+                                [models.Transaction.reward_id.in_(reward_ids)], "transactions_deleted",
+                                counter=stats_counters.TRANSACTIONS)
+        await _delete_in_chunks(job_id, business_id, models.TransactionArchive,
+                                [models.TransactionArchive.reward_id.in_(reward_ids)], "transactions_deleted",
+                                counter=stats_counters.TRANSACTIONS)
+        for table, _ in rollups.GRANULARITIES.values():
+            await _delete_in_chunks(job_id, business_id, table, [table.business_id == business_id],
+                                    keys=(table.bucket_start, table.reward_id))
+        # No triggers maintain the search documents of sharded rewards; each chunk drops them first
+        await _delete_in_chunks(job_id, business_id, models.RedeemrReward,
+                                [models.RedeemrReward.business_id == business_id], "rewards_deleted",
+                                counter=stats_counters.REWARDS,
+                                before_delete=search.unindex_rewards if SHARDED else None)
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(models.Business).where(models.Business.id == business_id))
+            await db.execute(
+                update(models.DeletionJob)
+                .where(models.DeletionJob.id == job_id)
+                .values(status=DONE, updated_at=func.now(), finished_at=func.now())
+            )
+            await db.commit()
+    except Exception as e:
+        logger.exception("deletion_job_failed", job_id=job_id, business_id=business_id)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(models.DeletionJob)
+                .where(models.DeletionJob.id == job_id)
+                .values(status=FAILED, error=str(e), updated_at=func.now())
+            )
+            await db.commit()
+        raise
+
+@job_queue.handler("purge_business")
+async def purge_business(payload: dict) -> None:
+    await run_job(payload["deletion_job_id"])
+
+async def schedule(db: AsyncSession, job_id: int) -> None:
+    """Queue the purge in the caller's transaction, unless it is already queued or running."""
+    await job_queue.enqueue(db, "purge_business", {"deletion_job_id": job_id}, key=f"purge_business:{job_id}")
+
+async def resume_unfinished() -> None:
+    """Queue deletion jobs left pending, running or failed, e.g. by a process from before the job queue."""
+    async with AsyncSessionLocal() as db:
+        job_ids = (await db.scalars(
+            select(models.DeletionJob.id).where(models.DeletionJob.status.in_([PENDING, RUNNING, FAILED]))
+        )).all()
+        for job_id in job_ids:
+            await schedule(db, job_id)
+        await db.commit()
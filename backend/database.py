@@ -1,21 +1,255 @@
-from sqlalchemy import create_engine
+from contextlib import asynccontextmanager
+from fastapi import Depends
+from sqlalchemy import MetaData, create_engine, event, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateIndex, CreateTable
+import asyncio
 import os
+import zlib
 
-# Use SQLite for development - easier to set up
-SQLALCHEMY_DATABASE_URL = "sqlite:///./redeemr.db"
+# Use SQLite for development - easier to set up; set DATABASE_URL to use Postgres
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./redeemr.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+# SQLite profile: WAL so readers never wait for the writer, and a busy timeout
+# so writers queue instead of failing with "database is locked"
+SQLITE_PRAGMAS = os.getenv("SQLITE_PRAGMAS", "1") == "1"
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# Connection pool profile (recycle and pre-ping only apply to server databases)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+# Sharded storage configuration (SQLite only; 0 keeps everything in one database).
+# SHARD_DATABASE_URL is a template with a {shard} placeholder. Changing the
+# shard count moves businesses between shards, so it needs a data migration.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))
+SHARD_DATABASE_URL = os.getenv(
+    "SHARD_DATABASE_URL", "{0}.shard{{shard}}{1}".format(*os.path.splitext(SQLALCHEMY_DATABASE_URL))
 )
+# Ids of rows created on shard n start above n * SHARD_ID_STRIDE, so an id names its shard
+SHARD_ID_STRIDE = 10**12
+SHARDED = SHARD_COUNT > 0
+
+# Business-scoped tables that live on the shards; everything else stays in the main database
+SHARDED_TABLES = (
+    "redeemr_rewards", "transactions", "transactions_archive", "points_ledger", "points_balances",
+    "redemption_rollups_hourly", "redemption_rollups_daily", "stats_counters",
+)
+# Sharded tables whose ids come from the shard's own id range
+SHARDED_ID_TABLES = ("redeemr_rewards", "transactions", "points_ledger")
+
+def to_async_url(url: str) -> str:
+    """Swap a sync database URL onto its asyncio driver (aiosqlite / asyncpg)."""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    if url.startswith("postgresql:") or url.startswith("postgresql+psycopg2:"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def engine_options(url: str) -> dict:
+    """create_engine keyword arguments for the configured profile."""
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+    if is_sqlite(url):
+        # File connections never go stale, so skip pre-ping and recycling
+        options["connect_args"] = {"check_same_thread": False}
+        return options
+    options.update(pool_recycle=DB_POOL_RECYCLE, pool_pre_ping=DB_POOL_PRE_PING)
+    return options
+
+def configure_engine(sync_engine, url: str):
+    """Attach per-connection setup (SQLite pragmas) to an engine."""
+    if is_sqlite(url) and SQLITE_PRAGMAS:
+        event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+    return sync_engine
+
+def make_engine(url: str = SQLALCHEMY_DATABASE_URL):
+    """Sync engine for the given URL with the environment's profile applied."""
+    return configure_engine(create_engine(url, **engine_options(url)), url)
+
+def make_async_engine(url: str = SQLALCHEMY_DATABASE_URL):
+    """Async engine for the given URL with the environment's profile applied."""
+    async_engine = create_async_engine(to_async_url(url), **engine_options(url))
+    configure_engine(async_engine.sync_engine, url)
+    return async_engine
+
+ASYNC_DATABASE_URL = to_async_url(SQLALCHEMY_DATABASE_URL)
+
+# Sync engine, used by scripts, migrations and table creation
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine, used by the API so queries never block the event loop
+async_engine = make_async_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Shard engines and sessions, one per shard (empty lists when storage is not sharded)
+if SHARDED and not is_sqlite(SQLALCHEMY_DATABASE_URL):
+    raise RuntimeError("SHARD_COUNT is only supported with SQLite databases")
+shard_engines = [make_engine(SHARD_DATABASE_URL.format(shard=shard)) for shard in range(SHARD_COUNT)]
+ShardSessionLocal = [sessionmaker(autocommit=False, autoflush=False, bind=shard_engine) for shard_engine in shard_engines]
+shard_async_engines = [make_async_engine(SHARD_DATABASE_URL.format(shard=shard)) for shard in range(SHARD_COUNT)]
+AsyncShardSessionLocal = [
+    async_sessionmaker(shard_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    for shard_engine in shard_async_engines
+]
+
 Base = declarative_base()
 
+def dialect_insert(db):
+    """Pick the dialect-specific INSERT that supports ON CONFLICT for a session."""
+    if db.get_bind().dialect.name == "postgresql":
+        return pg_insert
+    return sqlite_insert
+
+def shard_for_business(business_id: int) -> int:
+    """Shard holding a business's rows: a stable hash, so it never changes between processes."""
+    return zlib.crc32(str(business_id).encode()) % SHARD_COUNT
+
+def shard_for_id(row_id: int) -> int:
+    """Shard holding a sharded row (reward, transaction, ledger entry) by its id.
+
+    Ids outside every shard's range map to some shard anyway, where the
+    lookup simply finds nothing.
+    """
+    return row_id // SHARD_ID_STRIDE % SHARD_COUNT
+
+def id_offset_for_business(business_id: int) -> int:
+    """Start of the id range that a business's new rows are numbered from (0 unless sharded)."""
+    return shard_for_business(business_id) * SHARD_ID_STRIDE if SHARDED else 0
+
+def business_sessionmakers() -> list:
+    """Sync sessionmakers for every database holding business-scoped rows: the shards, or the main one."""
+    return ShardSessionLocal if SHARDED else [SessionLocal]
+
+def business_sessionmaker(business_id: int):
+    """Async sessionmaker for the database holding a business's rows."""
+    return AsyncShardSessionLocal[shard_for_business(business_id)] if SHARDED else AsyncSessionLocal
+
+@asynccontextmanager
+async def business_session(db: AsyncSession, business_id: int):
+    """Session for a business's rewards, transactions and points: `db` itself unless sharded."""
+    if not SHARDED:
+        yield db
+        return
+    async with AsyncShardSessionLocal[shard_for_business(business_id)]() as shard:
+        yield shard
+
+@asynccontextmanager
+async def row_session(db: AsyncSession, row_id: int):
+    """Session for the shard holding a row by id: `db` itself unless sharded."""
+    if not SHARDED:
+        yield db
+        return
+    async with AsyncShardSessionLocal[shard_for_id(row_id)]() as shard:
+        yield shard
+
+async def fan_out(db: AsyncSession, work) -> list:
+    """Await work(session) on every shard concurrently, each in its own session; [work(db)] unsharded."""
+    if not SHARDED:
+        return [await work(db)]
+
+    async def on_shard(make_session):
+        async with make_session() as shard:
+            return await work(shard)
+
+    return list(await asyncio.gather(*(on_shard(make_session) for make_session in AsyncShardSessionLocal)))
+
+async def fan_out_by(db: AsyncSession, keys, shard_of, work) -> list:
+    """Await work(session, keys) once per shard that holds any of `keys`, concurrently.
+
+    `shard_of` maps a key to its shard (shard_for_business or shard_for_id).
+    Unsharded, this is [work(db, keys)].
+    """
+    keys = list(keys)
+    if not SHARDED:
+        return [await work(db, keys)]
+    groups = {}
+    for key in keys:
+        groups.setdefault(shard_of(key), []).append(key)
+
+    async def on_shard(shard_index, shard_keys):
+        async with AsyncShardSessionLocal[shard_index]() as shard:
+            return await work(shard, shard_keys)
+
+    return list(await asyncio.gather(*(on_shard(index, group) for index, group in groups.items())))
+
+def create_shard_tables() -> None:
+    """Create the sharded tables on every shard and seed each shard's id range. Idempotent.
+
+    Foreign keys are left out, since most point at tables in the main
+    database. Id tables use AUTOINCREMENT, so a shard's ids start at
+    shard * SHARD_ID_STRIDE through sqlite_sequence.
+    """
+    metadata = MetaData()
+    tables = [Base.metadata.tables[name].to_metadata(metadata) for name in SHARDED_TABLES]
+    for table in tables:
+        if table.name in SHARDED_ID_TABLES:
+            table.dialect_kwargs["sqlite_autoincrement"] = True
+    for shard_index, shard_engine in enumerate(shard_engines):
+        with shard_engine.begin() as conn:
+            for table in tables:
+                conn.execute(CreateTable(table, include_foreign_key_constraints=[], if_not_exists=True))
+                for index in table.indexes:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+            for name in SHARDED_ID_TABLES:
+                conn.execute(text(
+                    "INSERT INTO sqlite_sequence (name, seq) SELECT :name, :seq "
+                    "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"
+                ), {"name": name, "seq": shard_index * SHARD_ID_STRIDE})
+
+def pool_stats() -> dict:
+    """Connection pool status for the main engines and any shard engines."""
+    stats = {}
+    pools = [("sync", engine.pool), ("async", async_engine.sync_engine.pool)]
+    for shard_index, shard_engine in enumerate(shard_async_engines):
+        pools.append((f"shard{shard_index}", shard_engine.sync_engine.pool))
+    for name, pool in pools:
+        entry = {"class": type(pool).__name__, "status": pool.status()}
+        for metric in ("size", "checkedin", "checkedout", "overflow"):
+            if hasattr(pool, metric):
+                entry[metric] = getattr(pool, metric)()
+        stats[name] = entry
+    return stats
+
 # Dependency to get the DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+# Dependencies for the session holding a business's (or a reward's) rows; the
+# request's main session unless storage is sharded
+async def get_business_db(business_id: int, db: AsyncSession = Depends(get_db)):
+    async with business_session(db, business_id) as shard:
+        yield shard
+
+async def get_reward_db(reward_id: int, db: AsyncSession = Depends(get_db)):
+    async with row_session(db, reward_id) as shard:
+        yield shard
@@ -0,0 +1,187 @@
+from typing import Iterable, List, Optional, Tuple
+import math
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import database
+import models
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# Precision stored on every business (cells of roughly 1.2 x 0.6 km)
+GEOHASH_PRECISION = 7
+# Never read more than this many cells for one query; a wider area uses coarser cells
+MAX_CELLS = 32
+# Extra nearest-by-approximation candidates measured exactly, covering approximation error at the cut-off
+CANDIDATE_SLACK = 16
+
+# /businesses/nearby limits
+DEFAULT_RADIUS_KM = 5.0
+MAX_RADIUS_KM = 50.0
+MAX_BBOX_DEGREES = 1.0
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Standard geohash of a point."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        target, value = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (target[0] + target[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            target[0] = middle
+        else:
+            target[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def cell_size_degrees(precision: int) -> Tuple[float, float]:
+    """(height, width) of a geohash cell in degrees of latitude and longitude."""
+    bits = precision * 5
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** (bits - bits // 2)
+
+
+def radius_bbox(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, min_lon, max_lat, max_lon) enclosing a circle; clamped at the poles."""
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    dlon = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 1e-6))
+    return (max(latitude - dlat, -90.0), max(longitude - dlon, -180.0),
+            min(latitude + dlat, 90.0), min(longitude + dlon, 180.0))
+
+
+def covering_cells(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[str]:
+    """Geohash prefixes that together cover a bounding box.
+
+    Uses the finest precision (up to the stored one) whose grid covers the box
+    in at most MAX_CELLS cells, so each cell becomes one index range scan.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size_degrees(precision)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        columns = math.floor(max_lon / width) - math.floor(min_lon / width) + 1
+        if rows * columns <= MAX_CELLS:
+            break
+    cells = set()
+    for row in range(rows):
+        latitude = min(min_lat + row * height, max_lat)
+        for column in range(columns):
+            cells.add(encode(latitude, min(min_lon + column * width, max_lon), precision))
+        cells.add(encode(latitude, max_lon, precision))
+    for column in range(columns):
+        cells.add(encode(max_lat, min(min_lon + column * width, max_lon), precision))
+    cells.add(encode(max_lat, max_lon, precision))
+    return sorted(cells)
+
+
+def distances_km(latitude: float, longitude: float, points: Iterable[Tuple[float, float]]) -> List[float]:
+    """Haversine distances from one origin to many points in a single pass."""
+    lat0 = math.radians(latitude)
+    lon0 = math.radians(longitude)
+    cos_lat0 = math.cos(lat0)
+    sin, cos, asin, sqrt, radians = math.sin, math.cos, math.asin, math.sqrt, math.radians
+    result = []
+    for point_lat, point_lon in points:
+        lat1 = radians(point_lat)
+        half_dlat = (lat1 - lat0) / 2
+        half_dlon = (radians(point_lon) - lon0) / 2
+        h = sin(half_dlat) ** 2 + cos_lat0 * cos(lat1) * sin(half_dlon) ** 2
+        result.append(2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(h))))
+    return result
+
+
+def locate(business, latitude: Optional[float], longitude: Optional[float]) -> None:
+    """Set (or clear) a business's coordinates and the geohash that indexes them."""
+    if latitude is None or longitude is None:
+        business.latitude = business.longitude = business.geohash = None
+        return
+    business.latitude = latitude
+    business.longitude = longitude
+    business.geohash = encode(latitude, longitude)
+
+
+async def nearby(
+    db: AsyncSession,
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+    origin: Optional[Tuple[float, float]] = None,
+    radius_km: Optional[float] = None,
+    limit: int = 50,
+) -> List[dict]:
+    """Approved businesses inside a bounding box, or within radius_km of origin.
+
+    Reads only the geohash cells covering the box and lets the database drop
+    points outside the exact box and preselect the nearest candidates by a
+    flat-earth distance. Exact distances are then measured for those in one
+    pass. Results are nearest first, to the origin or else to the box centre;
+    distance_km is only reported for an origin.
+    """
+    business = models.Business
+    ranges = [
+        and_(business.geohash >= cell, business.geohash < cell + "~")
+        for cell in covering_cells(min_lat, min_lon, max_lat, max_lon)
+    ]
+    # Every column here is in ix_businesses_location, so candidates are chosen without touching the table
+    candidates = (
+        select(business.id)
+        .where(or_(*ranges),
+               business.latitude.between(min_lat, max_lat), business.longitude.between(min_lon, max_lon),
+               business.is_approved.is_(True), business.deleted_at.is_(None))
+    )
+    # Nearest first: to the origin, or to the centre of the box when there is none.
+    # Squared equirectangular distance orders points like the true distance at these scales.
+    lat0, lon0 = origin or ((min_lat + max_lat) / 2, (min_lon + max_lon) / 2)
+    squash = math.cos(math.radians(lat0)) ** 2
+    candidates = candidates.order_by(
+        (business.latitude - lat0) * (business.latitude - lat0)
+        + (business.longitude - lon0) * (business.longitude - lon0) * squash
+    ).limit(limit + CANDIDATE_SLACK)
+    ids = (await db.scalars(candidates)).all()
+    if not ids:
+        return []
+
+    rows = (await db.execute(
+        select(business.id, business.name, business.owner_id, business.latitude, business.longitude)
+        .where(business.id.in_(ids))
+    )).all()
+    results = [
+        dict(row._mapping, distance_km=distance)
+        for row, distance in zip(rows, distances_km(lat0, lon0, ((row.latitude, row.longitude) for row in rows)))
+        if radius_km is None or distance <= radius_km
+    ]
+    results.sort(key=lambda item: item["distance_km"])
+    if not origin:
+        for item in results:
+            item["distance_km"] = None
+    return results[:limit]
+
+
+async def attach_rewards(db: AsyncSession, businesses: List[dict]) -> None:
+    """Embed each business's rewards with one query for the whole page (one per shard when sharded)."""
+    by_id = {business["id"]: business for business in businesses}
+    for business in businesses:
+        business["rewards"] = []
+    if not by_id:
+        return
+
+    async def fetch(session, business_ids):
+        return (await session.execute(
+            select(models.RedeemrReward.id, models.RedeemrReward.name,
+                   models.RedeemrReward.points_required, models.RedeemrReward.business_id)
+            .where(models.RedeemrReward.business_id.in_(business_ids))
+            .order_by(models.RedeemrReward.id)
+        )).mappings().all()
+
+    for rows in await database.fan_out_by(db, by_id, database.shard_for_business, fetch):
+        for row in rows:
+            by_id[row["business_id"]]["rewards"].append(dict(row))
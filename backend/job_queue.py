@@ -0,0 +1,306 @@
+"""Durable background jobs, stored in the app database.
+
+enqueue() adds a `jobs` row inside the caller's transaction, so a job exists
+exactly when the change that asked for it commits, and the endpoint can
+return without waiting for the work. Workers claim the most urgent due job
+(highest priority, then oldest run_at) and hold it for
+JOB_VISIBILITY_TIMEOUT seconds, extended while the handler runs. A job whose
+worker died becomes claimable again once its lock lapses. A failed job is
+retried after an exponential backoff until it has used max_attempts, then it
+stays `dead` with its last error. Handlers may therefore run more than once
+and must be idempotent.
+
+Modules register handlers with @handler("kind"); a handler takes the JSON
+payload and is either a coroutine function or a plain function, which runs
+on a thread. The API process runs JOB_WORKERS workers (0 disables them);
+`python worker.py` runs them in a separate process instead.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import asyncio
+import json
+import os
+import socket
+import time
+from sqlalchemy import event, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import models
+from database import AsyncSessionLocal, dialect_insert
+from logs import get_logger
+
+# Job queue configuration
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_BACKOFF_BASE = float(os.getenv("JOB_BACKOFF_BASE", "2.0"))
+JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", "3600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10
+
+logger = get_logger("job_queue")
+
+# kind -> handler(payload)
+HANDLERS = {}
+
+def handler(kind: str):
+    """Register the function that runs jobs of this kind."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def backoff(attempts: int) -> float:
+    """Seconds to wait before retrying a job that has failed `attempts` times."""
+    return min(JOB_BACKOFF_MAX, JOB_BACKOFF_BASE * 2 ** (attempts - 1))
+
+async def enqueue(db: AsyncSession, kind: str, payload: Optional[dict] = None, *, priority: int = PRIORITY_NORMAL,
+                  key: Optional[str] = None, delay: float = 0, max_attempts: int = JOB_MAX_ATTEMPTS) -> models.Job:
+    """Add a job to the caller's transaction; it becomes visible to workers on commit.
+
+    With a `key`, a queued or running job with the same key is returned
+    instead of adding another one. The partial unique index on live keys
+    settles concurrent enqueues: the losing INSERT does nothing.
+    """
+    live = models.Job.status.in_([QUEUED, RUNNING])
+    values = {"kind": kind, "payload": json.dumps(payload or {}), "key": key, "priority": priority,
+              "status": QUEUED, "max_attempts": max_attempts, "run_at": _now() + timedelta(seconds=delay)}
+    while True:
+        stmt = dialect_insert(db)(models.Job).values(**values)
+        if key is not None:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[models.Job.key], index_where=live)
+        job_id = (await db.execute(stmt.returning(models.Job.id))).scalar()
+        if job_id is None:
+            job_id = await db.scalar(select(models.Job.id).where(models.Job.key == key, live))
+            # The live job finished in between: try the insert again
+            if job_id is None:
+                continue
+        else:
+            # Wake this process's workers once the job is committed
+            db.info["job_enqueued"] = True
+        return await db.get(models.Job, job_id)
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session):
+    if session.info.pop("job_enqueued", False):
+        job_workers.wake()
+
+async def claim(worker_id: str):
+    """Take the most urgent due job, or None. Returns (id, kind, payload, attempts, max_attempts)."""
+    async with AsyncSessionLocal() as db:
+        while True:
+            now = _now()
+            # Look before writing, so idle workers never take the write lock
+            job_id = await db.scalar(
+                select(models.Job.id)
+                .where(models.Job.status == QUEUED, models.Job.run_at <= now)
+                .order_by(models.Job.priority.desc(), models.Job.run_at, models.Job.id)
+                .limit(1)
+            )
+            if job_id is None:
+                return None
+            row = (await db.execute(
+                update(models.Job)
+                .where(models.Job.id == job_id, models.Job.status == QUEUED)
+                .values(status=RUNNING, attempts=models.Job.attempts + 1, locked_by=worker_id,
+                        locked_until=now + timedelta(seconds=JOB_VISIBILITY_TIMEOUT))
+                .returning(models.Job.id, models.Job.kind, models.Job.payload, models.Job.attempts,
+                           models.Job.max_attempts)
+                .execution_options(synchronize_session=False)
+            )).first()
+            await db.commit()
+            # Another worker got there first: look again
+            if row is not None:
+                return row
+
+async def _finish(job_id: int, worker_id: str, **values) -> bool:
+    """Record a job's outcome, unless its lock lapsed and another worker owns it now."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(models.Job)
+            .where(models.Job.id == job_id, models.Job.status == RUNNING, models.Job.locked_by == worker_id)
+            .values(locked_by=None, locked_until=None, **values)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    return result.rowcount == 1
+
+async def _heartbeat(job_id: int, worker_id: str) -> None:
+    """Keep extending a running job's lock until cancelled."""
+    while True:
+        await asyncio.sleep(JOB_VISIBILITY_TIMEOUT / 3)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(models.Job)
+                .where(models.Job.id == job_id, models.Job.status == RUNNING, models.Job.locked_by == worker_id)
+                .values(locked_until=_now() + timedelta(seconds=JOB_VISIBILITY_TIMEOUT))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+async def run_job(job, worker_id: str) -> bool:
+    """Run a claimed job and record success, a retry or its death. True when it succeeded."""
+    job_id, kind, payload, attempts, max_attempts = job
+    func = HANDLERS.get(kind)
+    started = time.perf_counter()
+    heartbeat = asyncio.get_running_loop().create_task(_heartbeat(job_id, worker_id))
+    try:
+        if func is None:
+            raise LookupError(f"No handler for job kind {kind!r}")
+        if asyncio.iscoroutinefunction(func):
+            await func(json.loads(payload))
+        else:
+            await asyncio.to_thread(func, json.loads(payload))
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        if func is None or attempts >= max_attempts:
+            logger.exception("job_dead", job_id=job_id, kind=kind, attempts=attempts)
+            await _finish(job_id, worker_id, status=DEAD, last_error=error, finished_at=_now())
+        else:
+            retry_in = backoff(attempts)
+            await _finish(job_id, worker_id, status=QUEUED, last_error=error,
+                          run_at=_now() + timedelta(seconds=retry_in))
+            logger.warning("job_retry", job_id=job_id, kind=kind, attempts=attempts, retry_in=retry_in, error=error)
+        return False
+    finally:
+        heartbeat.cancel()
+    await _finish(job_id, worker_id, status=DONE, last_error=None, finished_at=_now())
+    logger.info("job_done", job_id=job_id, kind=kind, attempts=attempts,
+                ms=round((time.perf_counter() - started) * 1000, 1))
+    return True
+
+async def release_expired() -> int:
+    """Requeue running jobs whose lock lapsed, or mark them dead when out of attempts."""
+    now = _now()
+    expired = (models.Job.status == RUNNING, models.Job.locked_until <= now)
+    async with AsyncSessionLocal() as db:
+        if await db.scalar(select(models.Job.id).where(*expired).limit(1)) is None:
+            return 0
+        released = 0
+        for attempts_check, values in (
+            (models.Job.attempts >= models.Job.max_attempts, {"status": DEAD, "finished_at": now}),
+            (models.Job.attempts < models.Job.max_attempts, {"status": QUEUED, "run_at": now}),
+        ):
+            result = await db.execute(
+                update(models.Job).where(*expired, attempts_check)
+                .values(locked_by=None, locked_until=None, last_error="Visibility timeout expired", **values)
+                .execution_options(synchronize_session=False)
+            )
+            released += result.rowcount or 0
+        await db.commit()
+    logger.warning("jobs_released", count=released)
+    return released
+
+async def run_until_idle(worker_id: str = "inline") -> int:
+    """Run due jobs one by one in the calling task until none is left. Returns how many ran."""
+    ran = 0
+    while (job := await claim(worker_id)) is not None:
+        await run_job(job, worker_id)
+        ran += 1
+    return ran
+
+async def counts() -> dict:
+    """Jobs per status, and queued jobs per kind."""
+    async with AsyncSessionLocal() as db:
+        by_status = dict((await db.execute(
+            select(models.Job.status, func.count()).group_by(models.Job.status)
+        )).all())
+        queued = dict((await db.execute(
+            select(models.Job.kind, func.count()).where(models.Job.status == QUEUED).group_by(models.Job.kind)
+        )).all())
+    return {"by_status": {name: by_status.get(name, 0) for name in (QUEUED, RUNNING, DONE, DEAD)}, "queued_by_kind": queued}
+
+
+class JobWorkers:
+    """A pool of asyncio workers claiming jobs in this process.
+
+    Workers poll every JOB_POLL_INTERVAL seconds, and jobs enqueued by this
+    process wake them as soon as they commit. Plain-function handlers run on
+    the default thread pool.
+    """
+
+    def __init__(self, concurrency: int = JOB_WORKERS):
+        self.concurrency = concurrency
+        self._tasks = []
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_release = 0.0
+        self.running = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def start(self):
+        if self._tasks or self.concurrency <= 0:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks = [self._loop.create_task(self._work(f"{prefix}:{n}")) for n in range(self.concurrency)]
+
+    def wake(self):
+        """Safe from any thread; a no-op while the pool is not running."""
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _idle(self):
+        try:
+            await asyncio.wait_for(self._wake.wait(), JOB_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _work(self, worker_id: str):
+        while True:
+            try:
+                if time.monotonic() - self._last_release >= min(60.0, JOB_VISIBILITY_TIMEOUT):
+                    self._last_release = time.monotonic()
+                    await release_expired()
+                job = await claim(worker_id)
+            except Exception:
+                logger.exception("job_claim_failed", worker=worker_id)
+                job = None
+            if job is None:
+                await self._idle()
+                continue
+            self.running += 1
+            try:
+                if await run_job(job, worker_id):
+                    self.succeeded += 1
+                else:
+                    self.failed += 1
+            except Exception:
+                # The outcome could not be recorded; the lock lapses and the job is retried
+                self.failed += 1
+                logger.exception("job_outcome_failed", job_id=job[0], worker=worker_id)
+            finally:
+                self.running -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "running": self.running,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "handlers": sorted(HANDLERS),
+        }
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = self._wake = None
+
+
+job_workers = JobWorkers()
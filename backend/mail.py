@@ -0,0 +1,66 @@
+"""Outgoing email, always sent from a background job.
+
+MAIL_BACKEND picks where messages go:
+- "log" (the default) logs the recipient and subject and drops the message;
+  bodies can carry reset tokens, so they never reach the logs;
+- "outbox" writes each message as an .eml file under MAIL_OUTBOX_DIR, a
+  stand-in mail sink for working offline and checking what would be sent;
+- "smtp" delivers through MAIL_SMTP_HOST:MAIL_SMTP_PORT.
+
+send() blocks, so it is called from job handlers (e.g. the password reset
+email in auth_utils), which the job queue retries when delivery fails.
+"""
+from email.message import EmailMessage
+import os
+import smtplib
+import time
+import uuid
+from logs import get_logger
+
+# Mail configuration
+MAIL_BACKEND = os.getenv("MAIL_BACKEND", "log")
+MAIL_FROM = os.getenv("MAIL_FROM", "Redeemr <no-reply@redeemr.local>")
+MAIL_OUTBOX_DIR = os.getenv("MAIL_OUTBOX_DIR", "outbox")
+MAIL_SMTP_HOST = os.getenv("MAIL_SMTP_HOST", "localhost")
+MAIL_SMTP_PORT = int(os.getenv("MAIL_SMTP_PORT", "25"))
+MAIL_SMTP_USER = os.getenv("MAIL_SMTP_USER")
+MAIL_SMTP_PASSWORD = os.getenv("MAIL_SMTP_PASSWORD")
+MAIL_SMTP_STARTTLS = os.getenv("MAIL_SMTP_STARTTLS", "0") == "1"
+
+logger = get_logger("mail")
+
+def build_message(to: str, subject: str, body: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = MAIL_FROM
+    message["To"] = to
+    message["Subject"] = subject
+    message.set_content(body)
+    return message
+
+def _write_outbox(message: EmailMessage) -> str:
+    os.makedirs(MAIL_OUTBOX_DIR, exist_ok=True)
+    path = os.path.join(MAIL_OUTBOX_DIR, f"{time.time_ns()}-{uuid.uuid4().hex[:8]}.eml")
+    # Written under a temporary name so a reader never sees half a message
+    with open(path + ".tmp", "wb") as f:
+        f.write(bytes(message))
+    os.replace(path + ".tmp", path)
+    return path
+
+def _send_smtp(message: EmailMessage) -> None:
+    with smtplib.SMTP(MAIL_SMTP_HOST, MAIL_SMTP_PORT, timeout=30) as smtp:
+        if MAIL_SMTP_STARTTLS:
+            smtp.starttls()
+        if MAIL_SMTP_USER:
+            smtp.login(MAIL_SMTP_USER, MAIL_SMTP_PASSWORD or "")
+        smtp.send_message(message)
+
+def send(to: str, subject: str, body: str) -> None:
+    """Deliver one message through MAIL_BACKEND. Blocking; call it from a job."""
+    message = build_message(to, subject, body)
+    if MAIL_BACKEND == "smtp":
+        _send_smtp(message)
+        logger.info("mail_sent", to=to, subject=subject)
+    elif MAIL_BACKEND == "outbox":
+        logger.info("mail_written", to=to, subject=subject, path=_write_outbox(message))
+    else:
+        logger.info("mail_logged", to=to, subject=subject)
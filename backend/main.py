@@ -1,27 +1,58 @@
-from datetime import timedelta
-from typing import List
-from fastapi import FastAPI, Depends, HTTPException, status
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from sqlalchemy.sql import func
 from pydantic import BaseModel
-from database import SessionLocal, engine, get_db
-import models, schemas
+from serialization import ORJSONResponse, projection
+from database import AsyncSessionLocal, async_engine, engine, get_business_db, get_db, get_reward_db, pool_stats
+import database, job_queue, logs, metrics, query_profiler, models, schemas, points, stats_counters, business_deletion, rollups, reward_catalog, search, geo, redemption_feed, transaction_export, reward_import
 from auth_utils import (
     authenticate_user,
     create_access_token,
+    create_stream_token,
     get_current_user,
-    get_password_hash,
+    principal_for_email,
+    principal_for_token,
     ACCESS_TOKEN_EXPIRE_MINUTES,
-    create_password_reset_token,
-    verify_password_reset_token
+    STREAM_TOKEN_EXPIRE_SECONDS,
+    verify_password_reset_token,
+    verify_stream_token
 )
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, keyset_page, ndjson_response, prefix_pattern
+from password_hasher import password_hasher
+from principal_cache import Principal, principal_cache
+from redemptions import apply_redemption, redemption_batcher
+
+logger = logs.get_logger("api")
 
 # Create all tables if they don't exist
 models.Base.metadata.create_all(bind=engine)
+# Sharded storage: business-scoped tables on every shard, rewards indexed from there
+database.create_shard_tables()
+search.install(engine, database.shard_engines)
+
+# Untyped payloads are rendered by orjson; typed routes are dumped by their response_model
+app = FastAPI(default_response_class=ORJSONResponse)
 
-app = FastAPI()
+@app.on_event("startup")
+async def resume_background_jobs():
+    await business_deletion.resume_unfinished()
+    job_queue.job_workers.start()
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    password_hasher.shutdown()
+    await job_queue.job_workers.shutdown()
+    await redemption_batcher.shutdown()
+    await redemption_feed.feed_hub.shutdown()
+    logs.shutdown()
 
 # CORS middleware configuration
 app.add_middleware(
@@ -30,18 +61,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "Server-Timing", "ETag"],
 )
 
+# Per-request SQL counts and time, reported as Server-Timing and checked for N+1 patterns
+query_profiler.instrument(engine)
+query_profiler.instrument(async_engine.sync_engine)
+for shard_engine in database.shard_async_engines:
+    query_profiler.instrument(shard_engine.sync_engine)
+app.add_middleware(query_profiler.QueryProfilerMiddleware)
+
+# Per-route latency, in-flight and status metrics, exported on /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Root endpoint for health check
 @app.get("/")
-def read_root():
+async def read_root():
     return {"status": "ok", "message": "API is running"}
 
 # Authentication endpoints
 @app.post("/auth/register", response_model=schemas.User)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
     # Check if user already exists
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+    db_user = await db.scalar(select(models.User).where(models.User.email == user.email))
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -49,7 +91,7 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_hasher.hash(user.password)
     db_user = models.User(
         email=user.email,
         name=user.name,
@@ -59,29 +101,27 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         is_business_owner=user.is_business_owner
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await stats_counters.bump(db, users=1)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @app.post("/auth/login", response_model=schemas.Token)
-def login(user_data: schemas.UserLogin, db: Session = Depends(get_db)):
-    print(f"Login attempt for email: {user_data.email}")
-    user = authenticate_user(db, user_data.email, user_data.password)
+async def login(user_data: schemas.UserLogin, db: AsyncSession = Depends(get_db)):
+    user = await authenticate_user(db, user_data.email, user_data.password)
     
     if not user:
-        print(f"Authentication failed for email: {user_data.email}")
+        logger.info("login_failed", email=user_data.email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Log user details
-    print(f"User authenticated: {user.email}, is_active: {user.is_active}, is_superuser: {user.is_superuser}")
-    
     # Update last login time
     user.last_login = func.now()
-    db.commit()
+    await db.commit()
+    principal_cache.invalidate(user.email)
     
     # Create access token
     access_token_expires = timedelta(
@@ -91,15 +131,15 @@ def login(user_data: schemas.UserLogin, db: Session = Depends(get_db)):
         data={"sub": user.email}, expires_delta=access_token_expires
     )
     
-    print(f"Access token generated for {user.email}")
+    logger.info("login_succeeded", user_id=user.id, remember_me=user_data.remember_me, sampled=True)
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.post("/auth/token", response_model=schemas.Token)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -113,44 +153,47 @@ def login_for_access_token(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.get("/auth/me", response_model=schemas.User)
-def read_users_me(current_user: models.User = Depends(get_current_user)):
+async def read_users_me(current_user: Principal = Depends(get_current_user)):
     return current_user
 
 @app.post("/auth/password-reset", response_model=dict)
-def request_password_reset(email_data: schemas.PasswordReset, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == email_data.email).first()
+async def request_password_reset(email_data: schemas.PasswordReset, db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(models.User).where(models.User.email == email_data.email))
     if user:
-        # In a real application, send password reset email here
-        return {"message": "If an account exists with this email, a password reset link will be sent."}
+        await job_queue.enqueue(db, "password_reset_email", {"email": user.email},
+                                priority=job_queue.PRIORITY_HIGH, key=f"password_reset:{user.email}")
+        await db.commit()
     return {"message": "If an account exists with this email, a password reset link will be sent."}
 
 @app.post("/auth/change-password")
-def change_password(
+async def change_password(
     password_data: schemas.PasswordChange,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    # Verify current password
-    if not authenticate_user(db, current_user.email, password_data.current_password):
+    # Verify current password; load by primary key rather than repeating the email lookup
+    user = await db.get(models.User, current_user.id)
+    if not user or not await password_hasher.verify(password_data.current_password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect password"
         )
     
     # Update password
-    current_user.hashed_password = get_password_hash(password_data.new_password)
-    db.commit()
+    user.hashed_password = await password_hasher.hash(password_data.new_password)
+    await db.commit()
+    principal_cache.invalidate(user.email)
     return {"message": "Password updated successfully"}
 
 # Add a business registration endpoint for regular users
 @app.post("/businesses/register", response_model=schemas.BusinessResponse)
-def register_business(
+async def register_business(
     business_data: schemas.BusinessRegister,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     # Check if the user already has a business
-    if db.query(models.Business).filter(models.Business.owner_id == current_user.id).first() and not current_user.is_superuser:
+    if await db.scalar(select(models.Business).where(models.Business.owner_id == current_user.id, models.Business.deleted_at.is_(None))) and not current_user.is_superuser:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You already have a registered business."
@@ -162,24 +205,27 @@ def register_business(
         owner_id=current_user.id,
         is_approved=False
     )
+    geo.locate(business, business_data.latitude, business_data.longitude)
     
     db.add(business)
-    db.commit()
-    db.refresh(business)
+    await stats_counters.bump(db, businesses=1, pending_businesses=1)
+    await db.commit()
+    await db.refresh(business)
     
     # Update user as business owner if not already
     if not current_user.is_business_owner:
-        current_user.is_business_owner = True
-        db.commit()
+        await db.execute(update(models.User).where(models.User.id == current_user.id).values(is_business_owner=True))
+        await db.commit()
+        principal_cache.invalidate(current_user.email)
     
     return business
 
 # Approve a business (admin only)
 @app.post("/businesses/{business_id}/approve")
-def approve_business(
+async def approve_business(
     business_id: int,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     # Check if user is superuser
     if not current_user.is_superuser:
@@ -189,7 +235,7 @@ def approve_business(
         )
     
     # Find the business
-    business = db.query(models.Business).filter(models.Business.id == business_id).first()
+    business = await db.scalar(select(models.Business).where(models.Business.id == business_id, models.Business.deleted_at.is_(None)))
     if not business:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -197,18 +243,23 @@ def approve_business(
         )
     
     # Update approval status
+    if not business.is_approved:
+        await stats_counters.bump(db, pending_businesses=-1)
     business.is_approved = True
-    db.commit()
-    db.refresh(business)
+    await reward_catalog.bump_version(db, business.id)
+    await db.commit()
+    await db.refresh(business)
+    if business.owner_id is not None:
+        principal_cache.invalidate_user(business.owner_id)
     
     return {"message": f"Business {business.name} has been approved"}
 
 # Reject a business (admin only)
 @app.post("/businesses/{business_id}/reject")
-def reject_business(
+async def reject_business(
     business_id: int,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     # Check if user is superuser
     if not current_user.is_superuser:
@@ -217,8 +268,10 @@ def reject_business(
             detail="Only administrators can reject businesses"
         )
     
-    # Find the business
-    business = db.query(models.Business).filter(models.Business.id == business_id).first()
+    # Find the business; load its rewards up front so the delete can unlink them
+    business = await db.scalar(
+        select(models.Business).options(selectinload(models.Business.rewards)).where(models.Business.id == business_id, models.Business.deleted_at.is_(None))
+    )
     if not business:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -226,22 +279,35 @@ def reject_business(
         )
     
     # Delete the business
-    db.delete(business)
-    db.commit()
+    await db.delete(business)
+    await stats_counters.bump(db, businesses=-1, pending_businesses=0 if business.is_approved else -1)
+    if database.SHARDED:
+        # Sharded rewards are out of the relationship's reach: unlink them on the shard
+        async with database.business_session(db, business_id) as shard:
+            reward_ids = (await shard.scalars(
+                update(models.RedeemrReward).where(models.RedeemrReward.business_id == business_id)
+                .values(business_id=None).returning(models.RedeemrReward.id)
+            )).all()
+            await search.unindex_rewards(db, reward_ids)
+            await shard.commit()
+    await db.commit()
+    reward_catalog.catalog_cache.invalidate(business_id)
+    if business.owner_id is not None:
+        principal_cache.invalidate_user(business.owner_id)
     
     return {"message": f"Business {business.name} has been rejected and removed"}
 
 # 1️⃣ Create a Business (admin only)
-@app.post("/businesses/")
-def create_business(
+@app.post("/businesses/", response_model=schemas.BusinessResponse)
+async def create_business(
     name: str,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    print(f"User attempting to create business: {current_user.email}, is_superuser: {current_user.is_superuser}")
-    
     if not current_user.is_superuser:
-        print(f"Permission denied: user {current_user.email} is not a superuser")
+        logger.warning("create_business_forbidden", user_id=current_user.id)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to create businesses. Superuser privileges required."
@@ -249,42 +315,118 @@ def create_business(
     
     try:
         business = models.Business(name=name)
+        geo.locate(business, latitude, longitude)
         db.add(business)
-        db.commit()
-        db.refresh(business)
-        print(f"Business created successfully: {business.id}")
+        await stats_counters.bump(db, businesses=1, pending_businesses=1)
+        await db.commit()
+        logger.info("business_created", business_id=business.id, user_id=current_user.id)
         return business
     except Exception as e:
-        print(f"Error creating business: {e}")
-        db.rollback()
+        logger.exception("create_business_failed", user_id=current_user.id)
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating business: {str(e)}"
         )
 
 # 2️⃣ Create a Redeemr Reward
-@app.post("/rewards/")  
-def create_reward(name: str, points_required: int, business_id: int, db: Session = Depends(get_db)):
+@app.post("/rewards/", response_model=schemas.RewardResponse)
+async def create_reward(
+    name: str,
+    points_required: int,
+    business_id: int,
+    db: AsyncSession = Depends(get_db),
+    shard: AsyncSession = Depends(get_business_db)
+):
     reward = models.RedeemrReward(name=name, points_required=points_required, business_id=business_id)
-    db.add(reward)
-    db.commit()
-    db.refresh(reward)
+    shard.add(reward)
+    try:
+        await shard.flush()
+    except IntegrityError:
+        await shard.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This business already has a reward with that name"
+        )
+    await stats_counters.bump(shard, rewards=1)
+    await search.index_rewards(db, [(reward.id, name, business_id)])
+    await reward_catalog.bump_version(db, business_id)
+    # Without sharding `shard` is `db` and this is one commit
+    await shard.commit()
+    await db.commit()
     return reward
 
-# 3️⃣ List Businesses
-@app.get("/businesses/")
-def get_businesses(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+# Create or update many rewards at once from a JSON array or CSV (owner or admin)
+@app.post("/businesses/{business_id}/rewards/bulk", response_model=schemas.RewardImportResponse)
+async def bulk_upsert_rewards(
+    business_id: int,
+    request: Request,
+    response: Response,
+    atomic: bool = False,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    shard: AsyncSession = Depends(get_business_db)
+):
+    business = await db.scalar(select(models.Business).where(models.Business.id == business_id, models.Business.deleted_at.is_(None)))
+    if not business:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Business not found"
+        )
+    if business.owner_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the business owner can import rewards"
+        )
+
+    results = reward_import.validate(await reward_import.read_rows(request))
+    # With atomic=true a single bad row rejects the whole import
+    if atomic and any(result["status"] == reward_import.ERROR for result in results):
+        response.status_code = 422
+        return reward_import.summary(results)
+
+    await reward_import.upsert(db, shard, business_id, results)
+    await shard.commit()
+    await db.commit()
+    logger.info("rewards_imported", business_id=business_id, user_id=current_user.id, rows=len(results))
+    return reward_import.summary(results)
+
+# 3️⃣ List Businesses (keyset paginated; follow the X-Next-Cursor header for more)
+@app.get("/businesses/", response_model=List[schemas.BusinessResponse])
+async def get_businesses(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    is_approved: Optional[bool] = None,
+    name_prefix: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
     # Only superusers can see all businesses
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view all businesses"
         )
-    return db.query(models.Business).all()
+
+    filters = [models.Business.deleted_at.is_(None)]
+    if is_approved is not None:
+        filters.append(models.Business.is_approved == is_approved)
+    if name_prefix:
+        filters.append(models.Business.name.like(prefix_pattern(name_prefix), escape="\\"))
+    after = decode_cursor(cursor)
+
+    # NDJSON export streams every matching row unless a limit is given
+    columns = projection(models.Business, schemas.BusinessResponse).where(*filters)
+    if format == "ndjson":
+        return ndjson_response(columns, models.Business.id, after, limit, schemas.BusinessResponse)
+
+    return await keyset_page(db, columns, models.Business.id, after, limit or DEFAULT_PAGE_SIZE, response)
 
 # Get the current user's business
-@app.get("/businesses/me")
-def get_my_business(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.get("/businesses/me", response_model=schemas.BusinessResponse)
+async def get_my_business(current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     # Check if user is a business owner
     if not current_user.is_business_owner and not current_user.is_superuser:
         raise HTTPException(
@@ -293,7 +435,10 @@ def get_my_business(current_user: models.User = Depends(get_current_user), db: S
         )
     
     # Get the user's business
-    business = db.query(models.Business).filter(models.Business.owner_id == current_user.id).first()
+    business = (await db.execute(
+        projection(models.Business, schemas.BusinessResponse)
+        .where(models.Business.owner_id == current_user.id, models.Business.deleted_at.is_(None))
+    )).mappings().first()
     
     if not business:
         raise HTTPException(
@@ -303,79 +448,367 @@ def get_my_business(current_user: models.User = Depends(get_current_user), db: S
     
     return business
 
-# 4️⃣ List Rewards for a Business
-@app.get("/businesses/{business_id}/rewards/")
-def get_rewards(business_id: int, db: Session = Depends(get_db)):
-    return db.query(models.RedeemrReward).filter(models.RedeemrReward.business_id == business_id).all()
+# Approved businesses near a point (radius) or inside a bounding box, nearest first
+@app.get("/businesses/nearby", response_model=List[schemas.NearbyBusiness], response_model_exclude_none=True)
+async def get_nearby_businesses(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(geo.DEFAULT_RADIUS_KM, gt=0, le=geo.MAX_RADIUS_KM),
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lon: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lon: Optional[float] = Query(None, ge=-180, le=180),
+    limit: int = Query(50, ge=1, le=200),
+    include_rewards: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    bbox = (min_lat, min_lon, max_lat, max_lon)
+    origin = (lat, lon) if lat is not None and lon is not None else None
+    if all(value is not None for value in bbox):
+        if min_lat > max_lat or min_lon > max_lon:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Bounding box minimums must not exceed its maximums"
+            )
+        if max_lat - min_lat > geo.MAX_BBOX_DEGREES or max_lon - min_lon > geo.MAX_BBOX_DEGREES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Bounding box may span at most {geo.MAX_BBOX_DEGREES} degrees"
+            )
+        # A point given with a box only orders the results by distance
+        results = await geo.nearby(db, *bbox, origin=origin, limit=limit)
+    elif origin and not any(value is not None for value in bbox):
+        results = await geo.nearby(db, *geo.radius_bbox(lat, lon, radius_km), origin=origin, radius_km=radius_km, limit=limit)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Give lat and lon, or all of min_lat, min_lon, max_lat and max_lon"
+        )
+    if include_rewards:
+        await geo.attach_rewards(db, results)
+    return results
+
+# Set a business's location (owner or admin)
+@app.put("/businesses/{business_id}/location", response_model=schemas.BusinessResponse)
+async def set_business_location(
+    business_id: int,
+    location: schemas.BusinessLocation,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    business = await db.scalar(select(models.Business).where(models.Business.id == business_id, models.Business.deleted_at.is_(None)))
+    if not business:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Business not found"
+        )
+    if business.owner_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the owner or an administrator can move a business"
+        )
+    
+    geo.locate(business, location.latitude, location.longitude)
+    await db.commit()
+    await db.refresh(business)
+    return business
+
+# 4️⃣ List Rewards for a Business (ETag / If-None-Match aware; see reward_catalog)
+# Returns its pre-rendered body directly; the response_model documents it
+@app.get("/businesses/{business_id}/rewards/", response_model=List[schemas.RewardResponse])
+async def get_rewards(
+    business_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    shard: AsyncSession = Depends(get_business_db)
+):
+    return await reward_catalog.catalog_response(request, db, business_id, shard)
+
+# Ranked search over approved businesses and their rewards (follow X-Next-Cursor for more)
+@app.get("/search", response_model=List[schemas.SearchResult])
+async def search_catalog(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    type: str = Query("all", pattern="^(all|business|reward)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    offset = decode_cursor(cursor)
+    kinds = [search.BUSINESS, search.REWARD] if type == "all" else [type]
+    results = await search.search(db, q, kinds, offset, limit + 1)
+    if results is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query has no searchable words"
+        )
+    if len(results) > limit:
+        results = results[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(offset + limit)
+    return results
 
 # 5️⃣ Register a User
 @app.post("/users/")
-def create_user(name: str, db: Session = Depends(get_db)):
+async def create_user(name: str, db: AsyncSession = Depends(get_db)):
     user = models.User(name=name)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await stats_counters.bump(db, users=1)
+    await db.commit()
+    await db.refresh(user)
     return user
 
-# 6️⃣ Redeem a Reward
-@app.post("/redeem/")
-def redeem_reward(user_id: int, reward_id: int, db: Session = Depends(get_db)):
-    transaction = models.Transaction(user_id=user_id, reward_id=reward_id)
-    db.add(transaction)
-    db.commit()
-    db.refresh(transaction)
-    return {"message": "Reward redeemed!", "transaction": transaction}
+# 6️⃣ Redeem a Reward (spends the current user's points; admins may redeem for another user)
+@app.post("/redeem/", response_model=schemas.RedeemResponse)
+async def redeem_reward(
+    reward_id: int,
+    user_id: Optional[int] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    shard: AsyncSession = Depends(get_reward_db)
+):
+    if user_id is None:
+        user_id = current_user.id
+    elif user_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only redeem rewards with your own points"
+        )
+    # With group commit enabled, concurrent redemptions share one transaction
+    if redemption_batcher.enabled:
+        transaction, balance = await redemption_batcher.submit(user_id, reward_id)
+        return {"message": "Reward redeemed!", "transaction": transaction, "balance": balance}
+
+    try:
+        transaction, balance = await apply_redemption(db, user_id, reward_id, shard)
+    except HTTPException:
+        await shard.rollback()
+        raise
+    await shard.commit()
+    await shard.refresh(transaction)
+    return {"message": "Reward redeemed!", "transaction": transaction, "balance": balance}
+
+# Short-lived token for opening a business's redemption stream (owner or admin)
+@app.post("/businesses/{business_id}/redemptions/stream-token", response_model=schemas.StreamTokenResponse)
+async def create_redemption_stream_token(
+    business_id: int,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    business = await db.scalar(select(models.Business).where(models.Business.id == business_id, models.Business.deleted_at.is_(None)))
+    if not business:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Business not found"
+        )
+    if business.owner_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the owner or an administrator can follow this business's redemptions"
+        )
+    return {"token": create_stream_token(current_user.email, business_id), "expires_in": STREAM_TOKEN_EXPIRE_SECONDS}
+
+# Live redemptions for a business (owner or admin), as Server-Sent Events
+@app.get("/businesses/{business_id}/redemptions/stream")
+async def stream_redemptions(
+    business_id: int,
+    request: Request,
+    token: Optional[str] = None,
+    last_event_id: Optional[str] = None,
+):
+    # EventSource cannot send headers, so browsers pass ?token= from the stream-token endpoint;
+    # access tokens are only taken from the Authorization header, never from the URL
+    authorization = request.headers.get("authorization", "")
+    access_token = authorization[7:] if authorization.lower().startswith("bearer ") else None
+    stream_email = verify_stream_token(token, business_id) if token and not access_token else None
+    if not access_token and stream_email is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    # Sent by EventSource when it reconnects, or as ?last_event_id= by a client opening a new stream:
+    # replay what was committed since
+    last_event_id = request.headers.get("last-event-id") or last_event_id or ""
+    resume_after = int(last_event_id) if last_event_id.isdigit() else None
+
+    # A short-lived session: an open stream must not hold a pooled connection
+    async with AsyncSessionLocal() as db:
+        if access_token:
+            current_user = await principal_for_token(access_token, db)
+        else:
+            current_user = await principal_for_email(stream_email, db)
+            if current_user is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Not authenticated",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+        business = await db.scalar(select(models.Business).where(models.Business.id == business_id, models.Business.deleted_at.is_(None)))
+        if not business:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Business not found"
+            )
+        if business.owner_id != current_user.id and not current_user.is_superuser:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only the owner or an administrator can follow this business's redemptions"
+            )
+        # Subscribe before replaying so nothing committed in between is missed
+        subscription = redemption_feed.feed_hub.subscribe(business_id)
+        missed = []
+        if resume_after is not None:
+            try:
+                async with database.business_session(db, business_id) as shard:
+                    rows = (await shard.execute(
+                        select(models.Transaction.id, models.Transaction.user_id, models.Transaction.created_at, models.RedeemrReward)
+                        .join(models.RedeemrReward, models.RedeemrReward.id == models.Transaction.reward_id)
+                        .where(models.RedeemrReward.business_id == business_id, models.Transaction.id > resume_after)
+                        .order_by(models.Transaction.id)
+                        .limit(redemption_feed.FEED_REPLAY_LIMIT)
+                    )).all()
+            except Exception:
+                redemption_feed.feed_hub.unsubscribe(subscription)
+                raise
+            missed = [redemption_feed.redemption_event(row.id, row.user_id, row.RedeemrReward, row.created_at) for row in rows]
+
+    async def events():
+        try:
+            yield f"retry: {int(redemption_feed.FEED_HEARTBEAT_SECONDS * 1000)}\n\n".encode()
+            sent = missed[-1]["transaction_id"] if missed else resume_after or 0
+            for payload in missed:
+                yield redemption_feed.format_sse(payload)
+            while True:
+                item = await subscription.queue.get()
+                if item == redemption_feed.CLOSED:
+                    return
+                if item == redemption_feed.KEEPALIVE:
+                    yield b": keepalive\n\n"
+                elif item["transaction_id"] > sent:
+                    yield redemption_feed.format_sse(item)
+        finally:
+            redemption_feed.feed_hub.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# Award points to a customer (business owner or admin)
+@app.post("/businesses/{business_id}/points", response_model=schemas.PointsBalanceResponse)
+async def award_points(
+    business_id: int,
+    award: schemas.PointsAward,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    shard: AsyncSession = Depends(get_business_db)
+):
+    if award.points <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Points must be a positive number"
+        )
+
+    business = await db.scalar(select(models.Business).where(models.Business.id == business_id, models.Business.deleted_at.is_(None)))
+    if not business:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Business not found"
+        )
+    if business.owner_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the business owner can award points"
+        )
+
+    balance = await points.credit_points(shard, award.user_id, business_id, award.points)
+    await shard.commit()
+    return {"user_id": award.user_id, "business_id": business_id, "balance": balance}
+
+# Current user's points balance at a business
+@app.get("/businesses/{business_id}/points/me", response_model=schemas.PointsBalanceResponse)
+async def get_my_points(
+    business_id: int,
+    current_user: Principal = Depends(get_current_user),
+    shard: AsyncSession = Depends(get_business_db)
+):
+    balance = await points.get_balance(shard, current_user.id, business_id)
+    return {"user_id": current_user.id, "business_id": business_id, "balance": balance}
 
 # 7️⃣ Delete a Business and All Related Data
-@app.delete("/businesses/{business_id}")
-def delete_business(business_id: int, db: Session = Depends(get_db)):
-    # Delete transactions tied to rewards owned by this business
-    rewards = db.query(models.RedeemrReward).filter(models.RedeemrReward.business_id == business_id).all()
-    reward_ids = [r.id for r in rewards]
-    if reward_ids:
-        db.query(models.Transaction).filter(models.Transaction.reward_id.in_(reward_ids)).delete(synchronize_session=False)
+# The business disappears from reads at once; its rewards, transactions and
+# points are purged in chunks by a background job that resumes after a crash.
+@app.delete("/businesses/{business_id}", status_code=status.HTTP_202_ACCEPTED, response_model=schemas.DeletionJobResponse)
+async def delete_business(business_id: int, db: AsyncSession = Depends(get_db)):
+    business = await db.scalar(select(models.Business).where(models.Business.id == business_id))
+    if not business:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Business not found"
+        )
 
-    # Delete rewards
-    db.query(models.RedeemrReward).filter(models.RedeemrReward.business_id == business_id).delete(synchronize_session=False)
+    # Already being deleted: hand back the existing job
+    if business.deleted_at is not None:
+        job = await db.scalar(
+            select(models.DeletionJob).where(models.DeletionJob.business_id == business_id).order_by(models.DeletionJob.id.desc())
+        )
+        if job:
+            await business_deletion.schedule(db, job.id)
+            await db.commit()
+            return job
 
-    # Delete the business
-    db.query(models.Business).filter(models.Business.id == business_id).delete()
+    business.deleted_at = func.now()
+    business.catalog_version = models.Business.catalog_version + 1
+    await stats_counters.bump(db, businesses=-1, pending_businesses=0 if business.is_approved else -1)
+    job = models.DeletionJob(business_id=business_id, status=business_deletion.PENDING)
+    db.add(job)
+    await db.flush()
+    # The purge is queued in the same transaction as the soft delete
+    await business_deletion.schedule(db, job.id)
+    await db.commit()
+    await db.refresh(job)
+    reward_catalog.catalog_cache.invalidate(business_id)
+    return job
 
-    db.commit()
-    return {"message": f"Business {business_id} and related data deleted."}
+# Progress of a business deletion job
+@app.get("/deletion-jobs/{job_id}", response_model=schemas.DeletionJobResponse)
+async def get_deletion_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    job = await db.scalar(select(models.DeletionJob).where(models.DeletionJob.id == job_id))
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deletion job not found"
+        )
+    return job
 
 # Password reset endpoints
 @app.post("/request-password-reset/")
-def request_password_reset(reset_data: schemas.PasswordResetRequest, db: Session = Depends(get_db)):
+async def request_password_reset(reset_data: schemas.PasswordResetRequest, db: AsyncSession = Depends(get_db)):
     """
     Initiates the password reset process.
-    In a production environment, this would send an email with the reset link.
+    The email with the reset link is sent by a background job.
     """
-    user = db.query(models.User).filter(models.User.email == reset_data.email).first()
+    user = await db.scalar(select(models.User).where(models.User.email == reset_data.email))
     
     # Always return success message whether user exists or not (for security)
     # This prevents user enumeration
     if not user:
-        print(f"Password reset requested for non-existent user: {reset_data.email}")
+        logger.info("password_reset_unknown_email", email=reset_data.email)
         return {"message": "If an account exists with this email, a password reset link will be sent."}
     
-    # Generate reset token
-    token = create_password_reset_token(user.email)
-    
-    # In a real application, you would send an email with the reset link
-    # For this demo, we'll just log the token and build a URL
-    reset_url = f"http://localhost:3000/reset-password?token={token}&email={user.email}"
-    print(f"Password reset URL for {user.email}: {reset_url}")
+    # The job mints the token and sends the link; one pending email per address
+    await job_queue.enqueue(db, "password_reset_email", {"email": user.email},
+                            priority=job_queue.PRIORITY_HIGH, key=f"password_reset:{user.email}")
+    await db.commit()
+    logger.info("password_reset_requested", user_id=user.id)
     
     return {"message": "If an account exists with this email, a password reset link will be sent."}
 
 @app.post("/reset-password/")
-def reset_password(reset_data: schemas.PasswordResetConfirm, db: Session = Depends(get_db)):
+async def reset_password(reset_data: schemas.PasswordResetConfirm, db: AsyncSession = Depends(get_db)):
     """
     Completes the password reset process by verifying the token and updating the password.
     """
     # Check if user exists
-    user = db.query(models.User).filter(models.User.email == reset_data.email).first()
+    user = await db.scalar(select(models.User).where(models.User.email == reset_data.email))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -390,25 +823,283 @@ def reset_password(reset_data: schemas.PasswordResetConfirm, db: Session = Depen
         )
     
     # Update the password
-    user.hashed_password = get_password_hash(reset_data.new_password)
-    db.commit()
+    user.hashed_password = await password_hasher.hash(reset_data.new_password)
+    await db.commit()
+    principal_cache.invalidate(user.email)
     
     return {"message": "Password has been reset successfully"}
 
-# Get all users (admin only)
+# Get all users (admin only, keyset paginated; follow the X-Next-Cursor header for more)
 @app.get("/users/all", response_model=List[schemas.User])
-def get_all_users(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_all_users(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    is_business_owner: Optional[bool] = None,
+    is_superuser: Optional[bool] = None,
+    name_prefix: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
     # Check if user is superuser
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only administrators can view all users"
         )
-    
-    # Get all users
-    users = db.query(models.User).all()
-    print(f"Returning {len(users)} users")
-    # For debugging - print first user details
-    if users:
-        print(f"First user: id={users[0].id}, email={users[0].email}, is_superuser={users[0].is_superuser}")
-    return users
\ No newline at end of file
+
+    filters = []
+    if is_business_owner is not None:
+        filters.append(models.User.is_business_owner == is_business_owner)
+    if is_superuser is not None:
+        filters.append(models.User.is_superuser == is_superuser)
+    if name_prefix:
+        filters.append(models.User.name.like(prefix_pattern(name_prefix), escape="\\"))
+    after = decode_cursor(cursor)
+
+    # NDJSON export streams every matching row unless a limit is given
+    columns = projection(models.User, schemas.User).where(*filters)
+    if format == "ndjson":
+        return ndjson_response(columns, models.User.id, after, limit, schemas.User)
+
+    return await keyset_page(db, columns, models.User.id, after, limit or DEFAULT_PAGE_SIZE, response)
+
+# Principal cache counters (admin only)
+@app.get("/admin/principal-cache")
+async def get_principal_cache_stats(current_user: Principal = Depends(get_current_user)):
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can view cache statistics"
+        )
+    return principal_cache.stats()
+
+# Password hashing pool metrics (admin only)
+@app.get("/admin/password-hasher")
+async def get_password_hasher_stats(current_user: Principal = Depends(get_current_user)):
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can view hashing statistics"
+        )
+    return password_hasher.stats()
+
+# Database connection pool status (admin only)
+@app.get("/admin/db-pool")
+async def get_db_pool_stats(current_user: Principal = Depends(get_current_user)):
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can view pool statistics"
+        )
+    return pool_stats()
+
+# Redemption group commit metrics (admin only)
+@app.get("/admin/redemption-batcher")
+async def get_redemption_batcher_stats(current_user: Principal = Depends(get_current_user)):
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can view batching statistics"
+        )
+    return redemption_batcher.stats()
+
+# Live redemption feed subscribers and drops (admin only)
+@app.get("/admin/redemption-feed")
+async def get_redemption_feed_stats(current_user: Principal = Depends(get_current_user)):
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can view feed statistics"
+        )
+    return redemption_feed.feed_hub.stats()
+
+# Reward catalog cache counters (admin only)
+@app.get("/admin/catalog-cache")
+async def get_catalog_cache_stats(current_user: Principal = Depends(get_current_user)):
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can view cache statistics"
+        )
+    return reward_catalog.catalog_cache.stats()
+
+# Platform totals for the admin dashboard (admin only)
+@app.get("/admin/stats")
+async def get_admin_stats(
+    refresh: bool = False,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can view platform statistics"
+        )
+    # Counters are maintained incrementally; refresh=true recounts from the tables
+    if refresh:
+        return await stats_counters.rebuild(db)
+    return await stats_counters.read(db)
+
+# Background job queue depth and this process's workers (admin only)
+@app.get("/admin/jobs")
+async def get_job_queue_stats(current_user: Principal = Depends(get_current_user)):
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can view job statistics"
+        )
+    return {**await job_queue.counts(), "workers": job_queue.job_workers.stats()}
+
+# Status of one background job (admin only)
+@app.get("/admin/jobs/{job_id}", response_model=schemas.JobResponse)
+async def get_job(job_id: int, current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can view jobs"
+        )
+    job = await db.scalar(select(models.Job).where(models.Job.id == job_id))
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+# Rebuild the redemption rollups from transaction history in the background (admin only)
+@app.post("/admin/rollups/rebuild", status_code=status.HTTP_202_ACCEPTED, response_model=schemas.JobResponse)
+async def rebuild_rollups(current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can rebuild analytics"
+        )
+    job = await job_queue.enqueue(db, "rebuild_rollups", priority=job_queue.PRIORITY_LOW, key="rebuild_rollups")
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+# Analytics configuration
+ANALYTICS_DEFAULT_DAYS = 7
+ANALYTICS_MAX_BUCKETS = 5000
+
+def analytics_range(granularity: str, start: Optional[datetime], end: Optional[datetime]):
+    """Resolve the requested window, defaulting to the last week."""
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=ANALYTICS_DEFAULT_DAYS)
+    _, width = rollups.GRANULARITIES[granularity]
+    if rollups.to_epoch(start) >= rollups.to_epoch(end):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
+    if (rollups.to_epoch(end) - rollups.to_epoch(start)) / width > ANALYTICS_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Time range too large for this granularity"
+        )
+    return start, end
+
+# Redemptions per reward over time for one business (owner or admin)
+@app.get("/businesses/{business_id}/analytics")
+async def get_business_analytics(
+    business_id: int,
+    granularity: str = Query("hour", pattern="^(hour|day)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    reward_id: Optional[int] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    shard: AsyncSession = Depends(get_business_db)
+):
+    business = await db.scalar(select(models.Business).where(models.Business.id == business_id, models.Business.deleted_at.is_(None)))
+    if not business:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Business not found"
+        )
+    if business.owner_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the business owner can view analytics"
+        )
+
+    start, end = analytics_range(granularity, start, end)
+    return await rollups.query(shard, granularity, start, end, business_id=business_id, reward_id=reward_id)
+
+# Download a business's redemption history as CSV or NDJSON, optionally gzipped (owner or admin)
+@app.get("/businesses/{business_id}/transactions/export")
+async def export_business_transactions(
+    business_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    business = await db.scalar(select(models.Business).where(models.Business.id == business_id, models.Business.deleted_at.is_(None)))
+    if not business:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Business not found"
+        )
+    if business.owner_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the business owner can export transactions"
+        )
+    if start is not None and end is not None and rollups.to_epoch(start) >= rollups.to_epoch(end):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
+
+    return transaction_export.export_response(business_id, start, end, format, gzip)
+
+# Redemptions per business over time across the platform (admin only)
+@app.get("/admin/analytics")
+async def get_platform_analytics(
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can view platform analytics"
+        )
+
+    start, end = analytics_range(granularity, start, end)
+    # Every shard aggregates its own businesses, in parallel
+    return rollups.merge(await database.fan_out(
+        db, lambda shard: rollups.query(shard, granularity, start, end, by_business=True)
+    ))
+
+
+# Worker and cache gauges, read at scrape time
+metrics.registry.gauge("redeemr_password_hash_queue_depth", "Hash jobs waiting for a worker.",
+                       function=lambda: password_hasher.queue_depth)
+metrics.registry.gauge("redeemr_password_hash_rejected", "Hash jobs turned away with 503 since start.",
+                       function=lambda: password_hasher.rejected)
+metrics.registry.gauge("redeemr_password_hash_failed", "Hash jobs that raised since start.",
+                       function=lambda: password_hasher.failed)
+metrics.registry.gauge("redeemr_principal_cache_hit_ratio", "Share of principal lookups served from cache.",
+                       function=lambda: principal_cache.stats()["hit_ratio"])
+metrics.registry.gauge("redeemr_redeem_batch_queued", "Redemptions waiting for the next group commit.",
+                       function=lambda: redemption_batcher.stats()["queued"])
+metrics.registry.gauge("redeemr_feed_subscribers", "Open redemption feed streams on this worker.",
+                       function=redemption_feed.feed_hub.subscriber_count)
+metrics.registry.gauge("redeemr_jobs_running", "Background jobs running on this worker.",
+                       function=lambda: job_queue.job_workers.running)
+metrics.registry.gauge("redeemr_log_records_dropped", "Log records dropped because the log queue was full.",
+                       function=logs.dropped)
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
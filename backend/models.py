@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -10,21 +10,40 @@ class Business(Base):
     name = Column(String, index=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     is_approved = Column(Boolean, default=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+    # Bumped whenever the reward list changes; drives the catalog ETag
+    catalog_version = Column(Integer, nullable=False, default=1, server_default="1")
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    # Derived from the coordinates (see geo.py)
+    geohash = Column(String, nullable=True)
     
     rewards = relationship("RedeemrReward", back_populates="business")
     owner = relationship("User", back_populates="business")
 
+    # Nearby queries range-scan geohash cells and filter on the rest without reading the table;
+    # /businesses/me and registration look a live business up by owner
+    __table_args__ = (
+        Index("ix_businesses_location", "geohash", "latitude", "longitude", "is_approved", "deleted_at"),
+        Index("ix_businesses_owner", "owner_id", "deleted_at"),
+    )
+
 class RedeemrReward(Base):
     __tablename__ = "redeemr_rewards"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     points_required = Column(Integer)
-    business_id = Column(Integer, ForeignKey("businesses.id"))
+    business_id = Column(Integer, ForeignKey("businesses.id"), index=True)
 
     business = relationship("Business", back_populates="rewards")
     transactions = relationship("Transaction", back_populates="reward")
 
+    # Bulk imports upsert on the reward name within a business
+    __table_args__ = (
+        Index("uq_redeemr_rewards_business_name", "business_id", "name", unique=True),
+    )
+
 class User(Base):
     __tablename__ = "users"
 
@@ -40,6 +59,7 @@ class User(Base):
     
     transactions = relationship("Transaction", back_populates="user")
     business = relationship("Business", back_populates="owner", uselist=False)
+    points_balances = relationship("PointsBalance", back_populates="user")
 
 class Transaction(Base):
     __tablename__ = "transactions"
@@ -51,3 +71,123 @@ class Transaction(Base):
     
     user = relationship("User", back_populates="transactions")
     reward = relationship("RedeemrReward", back_populates="transactions")
+
+    # Per-business history reads (exports) walk each reward's redemptions in time order.
+    # AUTOINCREMENT keeps SQLite from reusing the ids of rows moved to the archive
+    __table_args__ = (
+        Index("ix_transactions_reward_created", "reward_id", "created_at"),
+        {"sqlite_autoincrement": True},
+    )
+
+# Cold tier: transactions moved out of the hot table by transaction_archive, ids unchanged
+class TransactionArchive(Base):
+    __tablename__ = "transactions_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    reward_id = Column(Integer, ForeignKey("redeemr_rewards.id"))
+    created_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # The created_at index answers "is anything archived at or after this time?" with one seek
+    __table_args__ = (
+        Index("ix_transactions_archive_reward_created", "reward_id", "created_at"),
+        Index("ix_transactions_archive_created", "created_at"),
+    )
+
+# Append-only record of every points earn (positive delta) and spend (negative delta)
+class PointsLedgerEntry(Base):
+    __tablename__ = "points_ledger"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Indexed for the business purge
+    business_id = Column(Integer, ForeignKey("businesses.id"), nullable=False, index=True)
+    delta = Column(Integer, nullable=False)
+    kind = Column(String, nullable=False)
+    # The transaction may have moved to transactions_archive, so there is no foreign key
+    transaction_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Materialized ledger total per user and business, updated in the same transaction as points_ledger
+class PointsBalance(Base):
+    __tablename__ = "points_balances"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    # The primary key leads with user_id; the business purge needs its own index
+    business_id = Column(Integer, ForeignKey("businesses.id"), primary_key=True, index=True)
+    balance = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    user = relationship("User", back_populates="points_balances")
+
+# Running platform totals for the admin dashboard, bumped by the endpoints that change them
+class StatCounter(Base):
+    __tablename__ = "stats_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+# Background purge of a soft-deleted business, with per-table progress so it can resume
+class DeletionJob(Base):
+    __tablename__ = "deletion_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    business_id = Column(Integer, nullable=False, index=True)
+    status = Column(String, nullable=False, default="pending")
+    ledger_entries_deleted = Column(Integer, nullable=False, default=0)
+    transactions_deleted = Column(Integer, nullable=False, default=0)
+    rewards_deleted = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+# Redemption counts per business, reward and hour, maintained on the redemption write path
+class RedemptionRollupHourly(Base):
+    __tablename__ = "redemption_rollups_hourly"
+
+    business_id = Column(Integer, ForeignKey("businesses.id"), primary_key=True)
+    bucket_start = Column(Integer, primary_key=True, index=True)
+    reward_id = Column(Integer, ForeignKey("redeemr_rewards.id"), primary_key=True)
+    redemptions = Column(Integer, nullable=False, default=0)
+
+# Redemption counts per business, reward and UTC day
+class RedemptionRollupDaily(Base):
+    __tablename__ = "redemption_rollups_daily"
+
+    business_id = Column(Integer, ForeignKey("businesses.id"), primary_key=True)
+    bucket_start = Column(Integer, primary_key=True, index=True)
+    reward_id = Column(Integer, ForeignKey("redeemr_rewards.id"), primary_key=True)
+    redemptions = Column(Integer, nullable=False, default=0)
+
+# Durable background work, claimed and retried by job_queue workers
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    # JSON arguments for the kind's handler
+    payload = Column(String, nullable=False, default="{}")
+    # At most one queued or running job per key
+    key = Column(String, nullable=True)
+    # Higher runs first
+    priority = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    # Not claimed before this; pushed back by the retry backoff
+    run_at = Column(DateTime(timezone=True), nullable=False)
+    # Visibility timeout: a running job whose lock lapses is claimable again
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    locked_by = Column(String, nullable=True)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Claims seek the most urgent due job; a key is unique among queued and running jobs
+    __table_args__ = (
+        Index("ix_jobs_claim", status, priority.desc(), run_at),
+        Index("uq_jobs_live_key", key, unique=True,
+              sqlite_where=status.in_(["queued", "running"]), postgresql_where=status.in_(["queued", "running"])),
+    )
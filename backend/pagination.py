@@ -0,0 +1,71 @@
+from typing import Optional
+from fastapi import HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+import base64
+import binascii
+import json
+from database import AsyncSessionLocal
+
+# Listing configuration
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(last_id: int) -> str:
+    """Build an opaque cursor that resumes a listing after the given primary key."""
+    return base64.urlsafe_b64encode(json.dumps({"after": last_id}).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Return the primary key to resume after, or 0 for the first page."""
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after = json.loads(base64.urlsafe_b64decode(padded.encode()))["after"]
+        if not isinstance(after, int):
+            raise ValueError(after)
+        return after
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def prefix_pattern(prefix: str) -> str:
+    """LIKE pattern for a prefix match; wildcards in the prefix are backslash-escaped."""
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+async def keyset_page(db: AsyncSession, stmt, pk_column, after: int, limit: int, response: Response):
+    """Fetch one page ordered by primary key and set the next cursor header.
+
+    `stmt` selects columns (see serialization.projection), which must include
+    the primary key; rows come back as mappings. Reads limit + 1 rows so the
+    last page is known without a COUNT.
+    """
+    rows = (await db.execute(stmt.where(pk_column > after).order_by(pk_column).limit(limit + 1))).mappings().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1][pk_column.key])
+    return rows
+
+def ndjson_response(stmt, pk_column, after: int, limit: Optional[int], schema) -> StreamingResponse:
+    """Stream matching rows as NDJSON in primary key order without buffering the table.
+
+    Runs in its own session because the response body outlives the request's
+    dependencies.
+    """
+    stmt = stmt.where(pk_column > after).order_by(pk_column)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    stmt = stmt.execution_options(yield_per=STREAM_BATCH_SIZE)
+
+    async def rows():
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(stmt)
+            async for partition in result.partitions():
+                yield "".join(schema.model_validate(dict(row._mapping)).model_dump_json() + "\n" for row in partition)
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
@@ -0,0 +1,115 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+import asyncio
+import multiprocessing
+import os
+import time
+
+# Hashing configuration (per deployment)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "64"))
+HASH_RETRY_AFTER_SECONDS = int(os.getenv("HASH_RETRY_AFTER_SECONDS", "1"))
+
+# Password hashing configuration
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+def hash_password(password: str) -> str:
+    """Generate password hash (runs inside a worker process)."""
+    return pwd_context.hash(password)
+
+def check_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash (runs inside a worker process)."""
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """Process pool for bcrypt with a bounded backlog.
+
+    Jobs beyond `workers + queue_limit` outstanding calls are refused with a
+    503 instead of piling up behind each other. With `workers=0` the hashing
+    runs on the default thread pool, which is handy for development.
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS, queue_limit: int = HASH_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = None
+        self._in_flight = 0
+        self._latencies = deque(maxlen=1024)
+        self.completed = 0
+        # Jobs that raised, e.g. a malformed hash or a broken worker pool
+        self.failed = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        if self.workers > 0 and self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls waiting for a free worker."""
+        return max(0, self._in_flight - max(self.workers, 1))
+
+    async def run(self, func, *args):
+        """Run a hashing function off the event loop, or raise 503 when saturated."""
+        if self._in_flight >= max(self.workers, 1) + self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, please retry shortly",
+                headers={"Retry-After": str(HASH_RETRY_AFTER_SECONDS)},
+            )
+        self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            self._latencies.append(time.perf_counter() - started)
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self.run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(check_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        """Return queue depth and hash latency metrics."""
+        samples = sorted(self._latencies)
+
+        def pct(p):
+            return samples[min(len(samples) - 1, int(len(samples) * p / 100))] * 1000 if samples else 0.0
+
+        return {
+            "workers": self.workers,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "queue_limit": self.queue_limit,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "latency_p50_ms": pct(50),
+            "latency_p99_ms": pct(99),
+            "latency_max_ms": samples[-1] * 1000 if samples else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,54 @@
+from typing import Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+import models
+from database import dialect_insert
+
+EARN = "earn"
+SPEND = "spend"
+
+async def credit_points(db: AsyncSession, user_id: int, business_id: int, points: int) -> int:
+    """Append an earn entry and add it to the materialized balance. Returns the new balance.
+
+    The caller owns the transaction and must commit.
+    """
+    insert = dialect_insert(db)
+    stmt = insert(models.PointsBalance).values(user_id=user_id, business_id=business_id, balance=points)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.PointsBalance.user_id, models.PointsBalance.business_id],
+        set_={"balance": models.PointsBalance.balance + stmt.excluded.balance, "updated_at": func.now()},
+    ).returning(models.PointsBalance.balance)
+    balance = (await db.execute(stmt)).scalar_one()
+    db.add(models.PointsLedgerEntry(user_id=user_id, business_id=business_id, delta=points, kind=EARN))
+    return balance
+
+async def debit_points(db: AsyncSession, user_id: int, business_id: int, points: int) -> Optional[int]:
+    """Take points off the balance with one conditional UPDATE.
+
+    Returns the new balance, or None when the balance is too low. The check and
+    the write happen in the same statement, so concurrent debits cannot push the
+    balance below zero. The caller appends the ledger entry and commits.
+    """
+    stmt = (
+        update(models.PointsBalance)
+        .where(
+            models.PointsBalance.user_id == user_id,
+            models.PointsBalance.business_id == business_id,
+            models.PointsBalance.balance >= points,
+        )
+        .values(balance=models.PointsBalance.balance - points, updated_at=func.now())
+        .returning(models.PointsBalance.balance)
+        .execution_options(synchronize_session=False)
+    )
+    return (await db.execute(stmt)).scalar_one_or_none()
+
+async def get_balance(db: AsyncSession, user_id: int, business_id: int) -> int:
+    """Primary-key lookup of the materialized balance; independent of ledger length."""
+    balance = await db.scalar(
+        select(models.PointsBalance.balance).where(
+            models.PointsBalance.user_id == user_id,
+            models.PointsBalance.business_id == business_id,
+        )
+    )
+    return balance or 0
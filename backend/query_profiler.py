@@ -0,0 +1,142 @@
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+import os
+import time
+from sqlalchemy import event
+import metrics
+from logs import get_logger
+
+# SQL instrumentation configuration
+SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "1") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Identical statements run this many times in one request are reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+# Origin allowed to read Server-Timing from the browser's Performance API (the React dev server)
+SERVER_TIMING_ALLOW_ORIGIN = os.getenv("SERVER_TIMING_ALLOW_ORIGIN", "http://localhost:3000")
+
+logger = get_logger("sql")
+
+STATEMENTS = metrics.registry.histogram(
+    "redeemr_sql_statements_per_request", "SQL statements executed per request.", ("route",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+DB_TIME = metrics.registry.histogram(
+    "redeemr_sql_time_per_request_seconds", "Total time spent in SQL statements per request.", ("route",)
+)
+N_PLUS_ONE = metrics.registry.counter(
+    "redeemr_sql_n_plus_one_total", "Requests that repeated one statement shape N_PLUS_ONE_THRESHOLD times.", ("route",)
+)
+
+class RequestQueries:
+    """Statement counts and DB time gathered for one request."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.statements = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        # Tasks spawned during the request inherit its context; stop counting once it ends
+        self.closed = False
+
+    def record(self, statement: str, seconds: float):
+        self.statements += 1
+        self.seconds += seconds
+        self.shapes[statement] += 1
+
+    def repeated(self):
+        """Statement shapes run at least N_PLUS_ONE_THRESHOLD times, most frequent first."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= N_PLUS_ONE_THRESHOLD]
+
+    @property
+    def route(self) -> str:
+        # The router leaves the matched route in the scope before any handler runs
+        return getattr(self.scope.get("route"), "path", metrics.UNMATCHED_ROUTE)
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.2f};desc="{self.statements} queries"'
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+def current() -> Optional[RequestQueries]:
+    return _current.get()
+
+# The start time lives on the statement's execution context, so a statement that raises
+# (and never reaches after_cursor_execute) leaves nothing behind on the pooled connection
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.query_started = time.perf_counter()
+    else:
+        conn.info["query_started"] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "query_started", None) if context is not None else conn.info.pop("query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    queries = _current.get()
+    if queries is not None and not queries.closed:
+        queries.record(statement, elapsed)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            "slow_query",
+            ms=round(elapsed * 1000, 2),
+            route=queries.route if queries is not None else None,
+            statement=statement[:1000],
+        )
+
+def instrument(sync_engine) -> None:
+    """Attach the timing hooks to an engine (use async_engine.sync_engine for async engines)."""
+    if not SQL_INSTRUMENTATION:
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+class QueryProfilerMiddleware:
+    """ASGI middleware that scopes SQL counters to each request.
+
+    Totals go out as a Server-Timing header. Statement shapes repeated past
+    N_PLUS_ONE_THRESHOLD are logged with the route as a likely N+1. Queries
+    run after the response has started (streaming bodies) are counted in the
+    metrics and the log but cannot make it into the header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_INSTRUMENTATION:
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(scope)
+        token = _current.set(queries)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", queries.server_timing().encode("latin-1")),
+                    (b"timing-allow-origin", SERVER_TIMING_ALLOW_ORIGIN.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            queries.closed = True
+            route = queries.route
+            STATEMENTS.observe(queries.statements, route=route)
+            DB_TIME.observe(queries.seconds, route=route)
+            repeated = queries.repeated()
+            if repeated:
+                N_PLUS_ONE.inc(route=route)
+                shape, count = repeated[0]
+                logger.warning(
+                    "n_plus_one_suspected",
+                    route=route,
+                    method=scope["method"],
+                    count=count,
+                    statements=queries.statements,
+                    statement=shape[:1000],
+                )
@@ -0,0 +1,25 @@
+from database import business_sessionmakers, create_shard_tables, engine
+import models
+import rollups
+
+def rebuild_rollups():
+    # Make sure the rollup tables exist on databases created before they were added
+    models.Base.metadata.create_all(bind=engine)
+    create_shard_tables()
+    # With sharded storage every shard rebuilds its own rollups
+    for make_session in business_sessionmakers():
+        db = make_session()
+        try:
+            print("Rebuilding redemption rollups from transaction history...")
+            counts = rollups.rebuild(db)
+            for granularity, rows in counts.items():
+                print(f"  {granularity}: {rows} buckets")
+            print("Rollups rebuilt successfully!")
+        except Exception as e:
+            db.rollback()
+            print(f"Error rebuilding rollups: {e}")
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    rebuild_rollups()
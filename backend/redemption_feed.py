@@ -0,0 +1,285 @@
+"""Live redemption events for business dashboards.
+
+apply_redemption stages an event on the session; it is published to the hub
+only once that session commits, and dropped on rollback. Subscribers get a
+bounded queue each. One that falls FEED_QUEUE_SIZE events behind is cut
+off rather than slowing the publisher; its client reconnects and catches
+up from the database with Last-Event-ID.
+
+With one worker the in-process hub is enough. With several, set
+FEED_BROKER_PATH and run the relay next to the workers:
+    python redemption_feed.py broker
+Each worker then sends its events to the relay, which echoes them to every
+worker for local fan-out.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set
+import argparse
+import asyncio
+import json
+import os
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from logs import get_logger
+
+# Redemption feed configuration
+FEED_QUEUE_SIZE = int(os.getenv("FEED_QUEUE_SIZE", "100"))
+FEED_HEARTBEAT_SECONDS = float(os.getenv("FEED_HEARTBEAT_SECONDS", "15"))
+# Events replayed from the database to a reconnecting client
+FEED_REPLAY_LIMIT = int(os.getenv("FEED_REPLAY_LIMIT", "100"))
+# Unix socket of the relay shared by all workers; empty keeps events in-process
+FEED_BROKER_PATH = os.getenv("FEED_BROKER_PATH", "")
+FEED_BROKER_RETRY_SECONDS = float(os.getenv("FEED_BROKER_RETRY_SECONDS", "1"))
+# The relay disconnects a worker that stops reading once this much is buffered for it
+FEED_BROKER_MAX_BUFFER = int(os.getenv("FEED_BROKER_MAX_BUFFER", str(4 * 1024 * 1024)))
+
+_PENDING = "redemption_feed_pending"
+
+# Queue markers; everything else in a subscriber queue is an event dict
+KEEPALIVE = "keepalive"
+CLOSED = "closed"
+
+logger = get_logger("redemption_feed")
+
+
+class Subscription:
+    """One listener on one business's feed."""
+
+    def __init__(self, business_id: int, size: int):
+        self.business_id = business_id
+        self.queue = asyncio.Queue(maxsize=size)
+
+    def offer(self, item) -> bool:
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def close(self) -> None:
+        # Make room so the marker always fits; the client reconnects and replays what it missed
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(CLOSED)
+
+
+class FeedHub:
+    """In-process fan-out from publishers to per-business subscribers.
+
+    Publishing never waits: each subscriber queue is bounded, and a
+    subscriber whose queue is full is closed and removed. One heartbeat task
+    feeds keepalives to every queue, so idle subscribers cost no timers.
+    """
+
+    def __init__(self, queue_size: int = FEED_QUEUE_SIZE, heartbeat_seconds: float = FEED_HEARTBEAT_SECONDS):
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+        self.published = 0
+        self.delivered = 0
+        self.dropped_subscribers = 0
+
+    def _ensure_started(self) -> None:
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.get_running_loop().create_task(self._beat())
+
+    async def _beat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            for subscriptions in list(self._subscribers.values()):
+                for subscription in list(subscriptions):
+                    # A full queue already has something to send
+                    subscription.offer(KEEPALIVE)
+
+    def subscribe(self, business_id: int) -> Subscription:
+        self._ensure_started()
+        subscription = Subscription(business_id, self.queue_size)
+        self._subscribers.setdefault(business_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.business_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscribers[subscription.business_id]
+
+    def publish(self, business_id: int, payload: dict) -> None:
+        """Send an event to this worker's subscribers. Safe to call from sync code on the loop thread."""
+        self.published += 1
+        self.deliver(business_id, payload)
+
+    def deliver(self, business_id: int, payload: dict) -> None:
+        for subscription in list(self._subscribers.get(business_id, ())):
+            if subscription.offer(payload):
+                self.delivered += 1
+            else:
+                self.dropped_subscribers += 1
+                subscription.close()
+                self.unsubscribe(subscription)
+                logger.warning("feed_subscriber_dropped", business_id=business_id)
+
+    def subscriber_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "subscribers": self.subscriber_count(),
+            "businesses": len(self._subscribers),
+            "queue_size": self.queue_size,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped_subscribers": self.dropped_subscribers,
+        }
+
+    async def shutdown(self) -> None:
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        for subscriptions in list(self._subscribers.values()):
+            for subscription in list(subscriptions):
+                subscription.close()
+        self._subscribers.clear()
+
+
+class BrokerFeedHub(FeedHub):
+    """FeedHub that shares events between workers through the relay.
+
+    Events go to the relay, and only the copies it echoes back are delivered
+    locally, so every worker (this one included) sees each event once. While
+    the relay is unreachable, events are delivered locally only and the
+    connection is retried in the background.
+    """
+
+    def __init__(self, path: str = FEED_BROKER_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self.local_only = 0
+
+    def _ensure_started(self) -> None:
+        super()._ensure_started()
+        if self._reader_task is None or self._reader_task.done():
+            self._reader_task = asyncio.get_running_loop().create_task(self._relay())
+
+    async def _relay(self) -> None:
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.path)
+                logger.info("feed_broker_connected", path=self.path)
+                while line := await reader.readline():
+                    message = json.loads(line)
+                    self.deliver(message["business_id"], message["event"])
+            except (OSError, ValueError) as e:
+                logger.warning("feed_broker_unavailable", path=self.path, error=str(e), sampled=True)
+            finally:
+                if self._writer is not None:
+                    self._writer.close()
+                    self._writer = None
+            await asyncio.sleep(FEED_BROKER_RETRY_SECONDS)
+
+    def publish(self, business_id: int, payload: dict) -> None:
+        self._ensure_started()
+        self.published += 1
+        if self._writer is None or self._writer.is_closing():
+            self.local_only += 1
+            self.deliver(business_id, payload)
+            return
+        self._writer.write(json.dumps({"business_id": business_id, "event": payload}).encode() + b"\n")
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "backend": "broker",
+            "broker_path": self.path,
+            "broker_connected": self._writer is not None and not self._writer.is_closing(),
+            "local_only": self.local_only,
+        }
+
+    async def shutdown(self) -> None:
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        await super().shutdown()
+
+
+feed_hub = BrokerFeedHub() if FEED_BROKER_PATH else FeedHub()
+
+
+def stage(session, business_id: int, payload: dict) -> None:
+    """Queue an event to be published when `session` commits."""
+    session.info.setdefault(_PENDING, []).append((business_id, payload))
+
+
+def redemption_event(transaction_id: int, user_id: int, reward, redeemed_at: Optional[datetime] = None) -> dict:
+    redeemed_at = redeemed_at or datetime.now(timezone.utc)
+    if redeemed_at.tzinfo is None:
+        # SQLite hands back naive UTC timestamps
+        redeemed_at = redeemed_at.replace(tzinfo=timezone.utc)
+    return {
+        "transaction_id": transaction_id,
+        "user_id": user_id,
+        "reward_id": reward.id,
+        "reward_name": reward.name,
+        "points_spent": reward.points_required or 0,
+        "redeemed_at": redeemed_at.isoformat(),
+    }
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session) -> None:
+    for business_id, payload in session.info.pop(_PENDING, ()):
+        feed_hub.publish(business_id, payload)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session, previous_transaction) -> None:
+    session.info.pop(_PENDING, None)
+
+
+def format_sse(payload: dict) -> bytes:
+    return f"id: {payload['transaction_id']}\nevent: redemption\ndata: {json.dumps(payload)}\n\n".encode()
+
+
+async def run_broker(path: str = FEED_BROKER_PATH) -> None:
+    """Relay every line received from a worker to all connected workers."""
+    clients: Set[asyncio.StreamWriter] = set()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        clients.add(writer)
+        try:
+            while line := await reader.readline():
+                for client in list(clients):
+                    if client.transport.get_write_buffer_size() > FEED_BROKER_MAX_BUFFER:
+                        clients.discard(client)
+                        client.close()
+                        continue
+                    client.write(line)
+        except OSError:
+            pass
+        finally:
+            clients.discard(writer)
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(handle, path=path)
+    print(f"Redemption feed relay listening on {path}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redemption feed relay for multi-worker deployments")
+    parser.add_argument("command", choices=("broker",))
+    parser.add_argument("--path", default=FEED_BROKER_PATH or "/tmp/redeemr-feed.sock")
+    args = parser.parse_args()
+    asyncio.run(run_broker(args.path))
+
+
+if __name__ == "__main__":
+    main()
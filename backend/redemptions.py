@@ -0,0 +1,245 @@
+from typing import Optional
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import os
+import time
+import database
+import models
+import points
+import redemption_feed
+import rollups
+import stats_counters
+from database import AsyncSessionLocal
+from logs import get_logger
+
+# Group commit configuration (opt-in)
+REDEEM_BATCHING = os.getenv("REDEEM_BATCHING", "0") == "1"
+REDEEM_BATCH_WINDOW_MS = float(os.getenv("REDEEM_BATCH_WINDOW_MS", "5"))
+REDEEM_BATCH_MAX_ROWS = int(os.getenv("REDEEM_BATCH_MAX_ROWS", "100"))
+
+logger = get_logger("redemptions")
+
+# Queued by shutdown(): the flush loop stops once everything before it is committed
+_STOP = None
+
+async def apply_redemption(db: AsyncSession, user_id: int, reward_id: int, shard: Optional[AsyncSession] = None):
+    """Debit the reward's points and record the transaction without committing.
+
+    `shard` is the session holding the reward (see database.row_session);
+    every write goes there. Left out, or the same as `db`, everything is in
+    one database. Raises HTTPException before writing anything when the
+    reward is unknown or the balance is too low, so a failed redemption
+    leaves the session clean. Returns (transaction, balance).
+    """
+    if shard is None or shard is db:
+        shard = db
+        reward = await db.scalar(
+            select(models.RedeemrReward)
+            .join(models.Business, models.Business.id == models.RedeemrReward.business_id)
+            .where(models.RedeemrReward.id == reward_id, models.Business.deleted_at.is_(None))
+        )
+    else:
+        # The business directory stays in the main database
+        reward = await shard.scalar(select(models.RedeemrReward).where(models.RedeemrReward.id == reward_id))
+        if reward is not None and not await db.scalar(
+            select(models.Business.id).where(models.Business.id == reward.business_id, models.Business.deleted_at.is_(None))
+        ):
+            reward = None
+    if not reward:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reward not found"
+        )
+
+    # Spend the points first; the conditional UPDATE refuses to go negative
+    cost = reward.points_required or 0
+    balance = None
+    if cost > 0:
+        balance = await points.debit_points(shard, user_id, reward.business_id, cost)
+        if balance is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Not enough points to redeem this reward"
+            )
+
+    transaction = models.Transaction(user_id=user_id, reward_id=reward_id)
+    shard.add(transaction)
+    await stats_counters.bump(shard, transactions=1)
+    await rollups.record_redemption(shard, reward.business_id, reward_id)
+    await shard.flush()
+    if cost > 0:
+        shard.add(models.PointsLedgerEntry(
+            user_id=user_id,
+            business_id=reward.business_id,
+            delta=-cost,
+            kind=points.SPEND,
+            transaction_id=transaction.id
+        ))
+    # Sent to the business's live feed if and when this session commits
+    redemption_feed.stage(shard, reward.business_id, redemption_feed.redemption_event(transaction.id, user_id, reward))
+    return transaction, balance
+
+
+class RedemptionBatcher:
+    """Coalesces concurrent redemptions into one commit.
+
+    Requests are queued and flushed together every `window_ms` milliseconds or
+    as soon as `max_rows` are waiting. Each caller awaits its own future, so it
+    still gets its own transaction or its own error. If the batch commit fails,
+    the batch is replayed one request per transaction so only the offending
+    request sees the failure.
+    """
+
+    def __init__(self, enabled: bool = REDEEM_BATCHING, window_ms: float = REDEEM_BATCH_WINDOW_MS, max_rows: int = REDEEM_BATCH_MAX_ROWS):
+        self.enabled = enabled
+        self.window_ms = window_ms
+        self.max_rows = max_rows
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Futures of callers still waiting, so shutdown() can answer them all
+        self._pending = set()
+        self.batches = 0
+        self.rows = 0
+        self.fallbacks = 0
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, user_id: int, reward_id: int):
+        """Queue a redemption and wait for the batch that commits it."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        await self._queue.put((user_id, reward_id, future))
+        return await future
+
+    async def _collect(self):
+        """The next batch, and whether shutdown() asked the loop to stop after it."""
+        item = await self._queue.get()
+        batch = []
+        deadline = time.monotonic() + self.window_ms / 1000
+        while item is not _STOP:
+            batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.max_rows or remaining <= 0:
+                return batch, False
+            try:
+                item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                return batch, False
+        return batch, True
+
+    async def _run(self):
+        while True:
+            batch, stopping = await self._collect()
+            if batch:
+                try:
+                    await self._flush(batch)
+                except Exception:
+                    self.fallbacks += 1
+                    await self._flush_individually(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch):
+        if not database.SHARDED:
+            async with AsyncSessionLocal() as db:
+                await self._commit(db, db, batch)
+        else:
+            # One group commit per shard, the shards in parallel
+            groups = {}
+            for item in batch:
+                groups.setdefault(database.shard_for_id(item[1]), []).append(item)
+            outcomes = await asyncio.gather(
+                *(self._flush_shard(shard_index, items) for shard_index, items in groups.items()),
+                return_exceptions=True,
+            )
+            # Shards that committed have answered their callers; only the rest are replayed
+            failed = next((outcome for outcome in outcomes if isinstance(outcome, Exception)), None)
+            if failed is not None:
+                raise failed
+
+        self.batches += 1
+        self.rows += len(batch)
+
+    async def _flush_shard(self, shard_index: int, items):
+        async with AsyncSessionLocal() as db, database.AsyncShardSessionLocal[shard_index]() as shard:
+            await self._commit(db, shard, items)
+
+    async def _commit(self, db: AsyncSession, shard: AsyncSession, items):
+        """Apply and commit one group of redemptions in `shard`, then answer their callers."""
+        results = []
+        for user_id, reward_id, future in items:
+            try:
+                results.append((future, await apply_redemption(db, user_id, reward_id, shard)))
+            except HTTPException as e:
+                results.append((future, e))
+        await shard.commit()
+
+        # Load server defaults (created_at) for the whole batch in one query.
+        # The rows are already committed, so a failure here must not replay them.
+        ids = [r[0].id for _, r in results if not isinstance(r, Exception)]
+        if ids:
+            try:
+                await shard.execute(select(models.Transaction).where(models.Transaction.id.in_(ids)))
+            except Exception as e:
+                logger.warning("redeem_batch_reload_failed", rows=len(ids), error=str(e))
+
+        for future, result in results:
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _flush_individually(self, batch):
+        for user_id, reward_id, future in batch:
+            if future.done():
+                continue
+            try:
+                async with AsyncSessionLocal() as db, database.row_session(db, reward_id) as shard:
+                    transaction, balance = await apply_redemption(db, user_id, reward_id, shard)
+                    await shard.commit()
+                    await shard.refresh(transaction)
+                future.set_result((transaction, balance))
+            except Exception as e:
+                future.set_exception(e)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window_ms,
+            "max_rows": self.max_rows,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "fallbacks": self.fallbacks,
+        }
+
+    async def shutdown(self, timeout: float = 5.0):
+        """Commit what was already submitted, then stop. Callers still waiting after `timeout` get a 503."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        await self._queue.put(_STOP)
+        try:
+            # Cancels the flush loop when it overruns
+            await asyncio.wait_for(task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("redeem_batcher_shutdown_timeout", waiting=len(self._pending))
+        for future in list(self._pending):
+            if not future.done():
+                future.set_exception(HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server is shutting down"
+                ))
+
+
+redemption_batcher = RedemptionBatcher()
@@ -0,0 +1,145 @@
+from collections import OrderedDict
+from typing import Optional
+import os
+import threading
+from fastapi import Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+import serialization
+
+# Reward catalog HTTP caching configuration
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "5000"))
+# Clients may keep the catalog but must revalidate it; a 304 costs one primary-key lookup
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "no-cache")
+
+
+class CatalogCache:
+    """Bounded LRU of serialized reward lists, one entry per business.
+
+    Entries are tagged with the catalog version they were rendered at, so a
+    bumped version simply misses and is replaced; nothing has to be purged
+    across workers.
+    """
+
+    def __init__(self, max_entries: int = CATALOG_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def get(self, business_id: int, version: int) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(business_id)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(business_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, business_id: int, version: int, body: bytes) -> None:
+        with self._lock:
+            self._entries[business_id] = (version, body)
+            self._entries.move_to_end(business_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, business_id: int) -> None:
+        with self._lock:
+            self._entries.pop(business_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+            }
+
+
+catalog_cache = CatalogCache()
+
+
+async def bump_version(db: AsyncSession, business_id: int) -> None:
+    """Invalidate every cached copy of a business's catalog in the caller's transaction."""
+    await db.execute(
+        update(models.Business)
+        .where(models.Business.id == business_id)
+        .values(catalog_version=models.Business.catalog_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def etag_for(business_id: int, version: int) -> str:
+    return f'"rewards-{business_id}-v{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: ignore W/ prefixes, accept * and lists."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def current_version(db: AsyncSession, business_id: int) -> Optional[int]:
+    """Catalog version of a live business, or None if it does not exist or is being deleted."""
+    return await db.scalar(
+        select(models.Business.catalog_version)
+        .where(models.Business.id == business_id, models.Business.deleted_at.is_(None))
+    )
+
+
+async def render(db: AsyncSession, business_id: int) -> bytes:
+    """Serialize a business's rewards straight from column tuples."""
+    rows = (await db.execute(
+        select(
+            models.RedeemrReward.id,
+            models.RedeemrReward.name,
+            models.RedeemrReward.points_required,
+            models.RedeemrReward.business_id,
+        ).where(models.RedeemrReward.business_id == business_id)
+        .order_by(models.RedeemrReward.id)
+    )).mappings().all()
+    return serialization.dumps([dict(row) for row in rows])
+
+
+async def catalog_response(request: Request, db: AsyncSession, business_id: int,
+                           shard: Optional[AsyncSession] = None) -> Response:
+    """Answer a catalog read with 304, a cached body or a fresh render, in that order.
+
+    The version comes from `db`; the rewards are rendered from `shard` when
+    they live on a shard (see database.business_session).
+    """
+    version = await current_version(db, business_id)
+    if version is None:
+        return Response(content=b"[]", media_type="application/json")
+
+    etag = etag_for(business_id, version)
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        catalog_cache.not_modified += 1
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    body = catalog_cache.get(business_id, version)
+    if body is None:
+        body = await render(shard or db, business_id)
+        catalog_cache.put(business_id, version, body)
+    return Response(content=body, media_type="application/json", headers=headers)
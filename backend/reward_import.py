@@ -0,0 +1,169 @@
+"""Bulk reward catalog upsert.
+
+A whole catalog (JSON array or CSV with name,points_required columns) is
+validated in one pass and then written in one transaction: existing rewards
+are looked up by (business_id, name) a chunk at a time. New ones go in with
+one INSERT ... ON CONFLICT DO NOTHING per chunk and changed ones with one
+INSERT ... ON CONFLICT DO UPDATE, so a name created concurrently by another
+import is updated, never stored twice.
+Every row gets a result: created, updated, unchanged, error, or skipped when
+an atomic import is rejected.
+"""
+from typing import Dict, List
+import csv
+import io
+import json
+import os
+from fastapi import HTTPException, Request, status
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from database import dialect_insert
+import reward_catalog
+import schemas
+import search
+import stats_counters
+
+# Bulk reward import configuration
+REWARD_IMPORT_MAX_ROWS = int(os.getenv("REWARD_IMPORT_MAX_ROWS", "10000"))
+# Rows per lookup, INSERT and UPDATE statement; keeps IN lists under driver parameter limits
+REWARD_IMPORT_CHUNK_SIZE = int(os.getenv("REWARD_IMPORT_CHUNK_SIZE", "500"))
+
+CREATED = "created"
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+ERROR = "error"
+# Valid rows of an atomic import that was rejected
+SKIPPED = "skipped"
+
+
+async def read_rows(request: Request) -> List[dict]:
+    """Rows from a JSON array body, a text/csv body or a multipart `file` upload (CSV)."""
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            upload = (await request.form()).get("file")
+            if upload is None or isinstance(upload, str):
+                raise ValueError("Upload the CSV as a form field named 'file'")
+            text = (await upload.read()).decode("utf-8-sig")
+            rows = list(csv.DictReader(io.StringIO(text)))
+        elif content_type.startswith("text/csv"):
+            rows = list(csv.DictReader(io.StringIO((await request.body()).decode("utf-8-sig"))))
+        else:
+            rows = json.loads(await request.body())
+            if not isinstance(rows, list):
+                raise ValueError("Expected a JSON array of rewards")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not read rewards: {e}"
+        )
+    if len(rows) > REWARD_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {REWARD_IMPORT_MAX_ROWS} rewards per request"
+        )
+    return rows
+
+
+def validate(rows: List[dict]) -> List[dict]:
+    """One result per input row; valid rows carry the parsed reward, the rest an error."""
+    results, seen = [], {}
+    for index, row in enumerate(rows):
+        result = {"row": index, "name": row.get("name") if isinstance(row, dict) else None, "status": None, "id": None, "error": None}
+        try:
+            reward = schemas.RewardImportRow.model_validate(row)
+        except ValidationError as e:
+            result["status"] = ERROR
+            result["error"] = "; ".join(f"{'.'.join(map(str, error['loc'])) or 'row'}: {error['msg']}" for error in e.errors())
+        else:
+            result["name"] = reward.name
+            if reward.name in seen:
+                result["status"] = ERROR
+                result["error"] = f"Duplicate of row {seen[reward.name]}"
+            else:
+                seen[reward.name] = index
+                result["reward"] = reward
+        results.append(result)
+    return results
+
+
+def _values(business_id: int, reward) -> dict:
+    return {"name": reward.name, "points_required": reward.points_required, "business_id": business_id}
+
+
+async def upsert(db: AsyncSession, shard: AsyncSession, business_id: int, results: List[dict]) -> None:
+    """Write the valid rows of `results` and fill in their status and id. Does not commit.
+
+    Rewards are written through `shard` (the business's shard, or `db`
+    itself when storage is not sharded); the catalog version goes to `db`.
+    """
+    valid = [result for result in results if "reward" in result]
+    created = 0
+    for start in range(0, len(valid), REWARD_IMPORT_CHUNK_SIZE):
+        chunk = valid[start:start + REWARD_IMPORT_CHUNK_SIZE]
+        existing: Dict[str, tuple] = {}
+        rows = await shard.execute(
+            select(models.RedeemrReward.id, models.RedeemrReward.name, models.RedeemrReward.points_required)
+            .where(models.RedeemrReward.business_id == business_id,
+                   models.RedeemrReward.name.in_([result["reward"].name for result in chunk]))
+        )
+        for reward_id, name, points_required in rows:
+            existing[name] = (reward_id, points_required)
+
+        new, changed = [], []
+        for result in chunk:
+            reward = result.pop("reward")
+            match = existing.get(reward.name)
+            if match is None:
+                new.append((result, reward))
+            elif match[1] != reward.points_required:
+                changed.append((result, reward))
+            else:
+                result.update(status=UNCHANGED, id=match[0])
+
+        upsert_stmt = dialect_insert(shard)(models.RedeemrReward)
+        unique_name = [models.RedeemrReward.business_id, models.RedeemrReward.name]
+        if new:
+            # executemany with RETURNING is sent as batched multi-row INSERTs; names are unique
+            # within the import, so ids are matched by name instead of forcing row order.
+            # Only rows this INSERT added come back: a name created concurrently is updated below
+            inserted = await shard.execute(
+                upsert_stmt.on_conflict_do_nothing(index_elements=unique_name)
+                .returning(models.RedeemrReward.id, models.RedeemrReward.name),
+                [_values(business_id, reward) for _, reward in new],
+            )
+            ids = {name: reward_id for reward_id, name in inserted}
+            for result, reward in new:
+                if reward.name in ids:
+                    result.update(status=CREATED, id=ids[reward.name])
+                else:
+                    changed.append((result, reward))
+            await search.index_rewards(db, ((ids[reward.name], reward.name, business_id)
+                                            for _, reward in new if reward.name in ids))
+            created += len(ids)
+        if changed:
+            updated = await shard.execute(
+                upsert_stmt.on_conflict_do_update(index_elements=unique_name,
+                                                  set_={"points_required": upsert_stmt.excluded.points_required})
+                .returning(models.RedeemrReward.id, models.RedeemrReward.name),
+                [_values(business_id, reward) for _, reward in changed],
+            )
+            ids = {name: reward_id for reward_id, name in updated}
+            for result, reward in changed:
+                result.update(status=UPDATED, id=ids[reward.name])
+
+    if created:
+        await stats_counters.bump(shard, rewards=created)
+    if any(result["status"] in (CREATED, UPDATED) for result in results):
+        await reward_catalog.bump_version(db, business_id)
+
+
+def summary(results: List[dict]) -> dict:
+    counts = {CREATED: 0, UPDATED: 0, UNCHANGED: 0, ERROR: 0, SKIPPED: 0}
+    for result in results:
+        if result.pop("reward", None) is not None:
+            result["status"] = SKIPPED
+        counts[result["status"]] += 1
+    return {**counts, "results": results}
@@ -0,0 +1,137 @@
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import BigInteger, cast, delete, extract, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import job_queue
+import models
+import transaction_archive
+from database import business_sessionmakers, dialect_insert
+
+HOUR = 3600
+DAY = 86400
+
+# Rollup table and bucket width in seconds for each granularity
+GRANULARITIES = {
+    "hour": (models.RedemptionRollupHourly, HOUR),
+    "day": (models.RedemptionRollupDaily, DAY),
+}
+
+def to_epoch(value: datetime) -> int:
+    """Seconds since the epoch, treating naive datetimes as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+def from_epoch(value: int) -> datetime:
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+async def record_redemption(db: AsyncSession, business_id: int, reward_id: int, at: Optional[datetime] = None) -> None:
+    """Count one redemption into the hourly and daily rollups in the caller's transaction."""
+    now = to_epoch(at or datetime.now(timezone.utc))
+    insert_ = dialect_insert(db)
+    for table, width in GRANULARITIES.values():
+        stmt = insert_(table).values(
+            business_id=business_id, reward_id=reward_id, bucket_start=now - now % width, redemptions=1
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.business_id, table.bucket_start, table.reward_id],
+            set_={"redemptions": table.redemptions + 1},
+        )
+        await db.execute(stmt)
+
+def _bucket_expression(dialect_name: str, column, width: int):
+    """SQL expression for the epoch-second start of the bucket containing `column`."""
+    if dialect_name == "postgresql":
+        seconds = cast(extract("epoch", column), BigInteger)
+    else:
+        seconds = cast(func.strftime("%s", column), BigInteger)
+    return (seconds // width) * width
+
+def rebuild(db: Session) -> dict:
+    """Regenerate both rollup tables from the transactions history, archive included. Commits."""
+    dialect_name = db.get_bind().dialect.name
+    transactions = transaction_archive.history(include_archive=True)
+    counts = {}
+    for granularity, (table, width) in GRANULARITIES.items():
+        bucket = _bucket_expression(dialect_name, transactions.c.created_at, width)
+        history = (
+            select(
+                models.RedeemrReward.business_id,
+                bucket.label("bucket_start"),
+                transactions.c.reward_id,
+                func.count().label("redemptions"),
+            )
+            .select_from(transactions)
+            .join(models.RedeemrReward, models.RedeemrReward.id == transactions.c.reward_id)
+            # Rewards unlinked by a rejected business belong to no business and get no buckets
+            .where(models.RedeemrReward.business_id.is_not(None))
+            .group_by(models.RedeemrReward.business_id, bucket, transactions.c.reward_id)
+        )
+        db.execute(delete(table))
+        result = db.execute(
+            insert(table).from_select(["business_id", "bucket_start", "reward_id", "redemptions"], history)
+        )
+        counts[granularity] = result.rowcount
+    db.commit()
+    return counts
+
+@job_queue.handler("rebuild_rollups")
+def rebuild_all(payload: dict) -> None:
+    """Job: rebuild() on every database holding transactions, i.e. each shard when sharded."""
+    for make_session in business_sessionmakers():
+        with make_session() as db:
+            rebuild(db)
+
+async def query(
+    db: AsyncSession,
+    granularity: str,
+    start: datetime,
+    end: datetime,
+    business_id: Optional[int] = None,
+    reward_id: Optional[int] = None,
+    by_business: bool = False,
+) -> dict:
+    """Redemptions per bucket in [start, end), read from the rollups only.
+
+    Series rows are broken down by reward for a single business, or by
+    business when `by_business` is set.
+    """
+    table, width = GRANULARITIES[granularity]
+    start_epoch = to_epoch(start) // width * width
+    end_epoch = to_epoch(end)
+
+    key = table.business_id if by_business else table.reward_id
+    stmt = (
+        select(table.bucket_start, key.label("key"), func.sum(table.redemptions).label("redemptions"))
+        .where(table.bucket_start >= start_epoch, table.bucket_start < end_epoch)
+        .group_by(table.bucket_start, key)
+        .order_by(table.bucket_start, key)
+    )
+    if business_id is not None:
+        stmt = stmt.where(table.business_id == business_id)
+    if reward_id is not None:
+        stmt = stmt.where(table.reward_id == reward_id)
+
+    key_name = "business_id" if by_business else "reward_id"
+    series = [
+        {"bucket_start": from_epoch(bucket_start), key_name: key_value, "redemptions": redemptions}
+        for bucket_start, key_value, redemptions in (await db.execute(stmt)).all()
+    ]
+    return {
+        "granularity": granularity,
+        "start": from_epoch(start_epoch),
+        "end": from_epoch(end_epoch),
+        "total": sum(row["redemptions"] for row in series),
+        "series": series,
+    }
+
+def merge(results: list) -> dict:
+    """Combine query() results for the same window from databases holding disjoint businesses (shards)."""
+    merged = dict(results[0])
+    merged["series"] = sorted(
+        (row for result in results for row in result["series"]),
+        key=lambda row: (row["bucket_start"], row.get("business_id", row.get("reward_id"))),
+    )
+    merged["total"] = sum(result["total"] for result in results)
+    return merged
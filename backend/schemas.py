@@ -1,11 +1,16 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import List, Optional
 from datetime import datetime
 
 class Token(BaseModel):
     access_token: str
     token_type: str
 
+class StreamTokenResponse(BaseModel):
+    token: str
+    # Seconds the token can still open a stream; an open stream outlives it
+    expires_in: int
+
 class TokenData(BaseModel):
     email: Optional[str] = None
 
@@ -14,12 +19,20 @@ class BusinessCreate(BaseModel):
 
 class BusinessRegister(BaseModel):
     name: str
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+
+class BusinessLocation(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
 
 class BusinessResponse(BaseModel):
     id: int
     name: str
     owner_id: Optional[int] = None
     is_approved: bool = False
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     
     class Config:
         from_attributes = True
@@ -29,6 +42,39 @@ class RewardCreate(BaseModel):
     points_required: int
     business_id: int
 
+class RewardResponse(BaseModel):
+    id: int
+    name: str
+    points_required: Optional[int] = None
+    business_id: int
+
+    class Config:
+        from_attributes = True
+
+class RewardImportRow(BaseModel):
+    name: str = Field(..., min_length=1, max_length=200)
+    points_required: int = Field(..., ge=0)
+
+    @field_validator("name", mode="before")
+    @classmethod
+    def strip_name(cls, value):
+        return value.strip() if isinstance(value, str) else value
+
+class RewardImportResult(BaseModel):
+    row: int
+    name: Optional[str] = None
+    status: str
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class RewardImportResponse(BaseModel):
+    created: int
+    updated: int
+    unchanged: int
+    error: int
+    skipped: int
+    results: List[RewardImportResult]
+
 class UserBase(BaseModel):
     email: EmailStr
     name: str
@@ -70,3 +116,82 @@ class PasswordChange(BaseModel):
 class RedeemRequest(BaseModel):
     user_id: int
     reward_id: int
+
+class TransactionResponse(BaseModel):
+    id: int
+    user_id: int
+    reward_id: int
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class RedeemResponse(BaseModel):
+    message: str
+    transaction: TransactionResponse
+    balance: Optional[int] = None
+
+class PointsAward(BaseModel):
+    user_id: int
+    points: int
+
+class PointsBalanceResponse(BaseModel):
+    user_id: int
+    business_id: int
+    balance: int
+
+    class Config:
+        from_attributes = True
+
+class DeletionJobResponse(BaseModel):
+    id: int
+    business_id: int
+    status: str
+    ledger_entries_deleted: int
+    transactions_deleted: int
+    rewards_deleted: int
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    priority: int
+    attempts: int
+    max_attempts: int
+    run_at: datetime
+    last_error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class SearchResult(BaseModel):
+    type: str
+    id: int
+    name: str
+    business_id: int
+    business_name: str
+    points_required: Optional[int] = None
+    score: float
+
+class NearbyReward(BaseModel):
+    id: int
+    name: Optional[str] = None
+    points_required: Optional[int] = None
+
+class NearbyBusiness(BaseModel):
+    id: int
+    name: str
+    owner_id: Optional[int] = None
+    latitude: float
+    longitude: float
+    distance_km: Optional[float] = None
+    rewards: Optional[List[NearbyReward]] = None
@@ -0,0 +1,294 @@
+from typing import List, Optional
+import re
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+import database
+import models
+
+BUSINESS = "business"
+REWARD = "reward"
+
+# Terms at least this long tolerate one edit, and two from TYPO_TWO_EDITS_LENGTH on
+TYPO_MIN_LENGTH = 4
+TYPO_TWO_EDITS_LENGTH = 8
+# Corrections tried per query term
+TYPO_MAX_CANDIDATES = 5
+# Businesses outrank rewards with the same text match
+BUSINESS_BOOST = 2.0
+# Above this many raw matches (short, broad prefixes) bm25 ranking costs more than
+# it is worth, so results come back in index order, which FTS5 can stream
+RANKED_MATCH_LIMIT = 2000
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# SQLite: one FTS5 table over both names. The rowid encodes the source row
+# (2*id for businesses, 2*id+1 for rewards) so the triggers can delete by rowid
+# instead of scanning.
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        name, business_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )""",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_vocab USING fts5vocab(search_index, 'row')",
+    """CREATE TRIGGER IF NOT EXISTS search_business_insert AFTER INSERT ON businesses BEGIN
+        INSERT INTO search_index(rowid, name, business_id) VALUES (new.id * 2, new.name, new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_business_update AFTER UPDATE OF name ON businesses BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2;
+        INSERT INTO search_index(rowid, name, business_id) VALUES (new.id * 2, new.name, new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_business_delete AFTER DELETE ON businesses BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_reward_insert AFTER INSERT ON redeemr_rewards BEGIN
+        INSERT INTO search_index(rowid, name, business_id) VALUES (new.id * 2 + 1, new.name, new.business_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_reward_update AFTER UPDATE OF name, business_id ON redeemr_rewards BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2 + 1;
+        INSERT INTO search_index(rowid, name, business_id) VALUES (new.id * 2 + 1, new.name, new.business_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_reward_delete AFTER DELETE ON redeemr_rewards BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2 + 1;
+    END""",
+]
+
+SQLITE_REBUILD = [
+    "DELETE FROM search_index",
+    "INSERT INTO search_index(rowid, name, business_id) SELECT id * 2, name, id FROM businesses",
+    "INSERT INTO search_index(rowid, name, business_id) SELECT id * 2 + 1, name, business_id FROM redeemr_rewards",
+]
+
+# With sharded storage the rewards live on the shards, out of the triggers' reach:
+# the app adds and removes their documents itself (index_rewards / unindex_rewards)
+SQLITE_INDEX_REWARD = "INSERT INTO search_index(rowid, name, business_id) VALUES (:id * 2 + 1, :name, :business_id)"
+SQLITE_UNINDEX_REWARD = "DELETE FROM search_index WHERE rowid = :id * 2 + 1"
+# Reward rows copied per statement when rebuilding the index from the shards
+SEARCH_REBUILD_CHUNK_SIZE = 10000
+
+# Postgres maintains its GIN indexes itself: full-text for words and prefixes,
+# trigrams for typo tolerance
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_businesses_name_fts ON businesses USING gin (to_tsvector('simple', name))",
+    "CREATE INDEX IF NOT EXISTS ix_redeemr_rewards_name_fts ON redeemr_rewards USING gin (to_tsvector('simple', name))",
+    "CREATE INDEX IF NOT EXISTS ix_businesses_name_trgm ON businesses USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_redeemr_rewards_name_trgm ON redeemr_rewards USING gin (name gin_trgm_ops)",
+]
+
+
+def install(engine, reward_engines=None) -> None:
+    """Create the search index for the engine's dialect; backfill it when it has drifted. Idempotent.
+
+    `reward_engines` are the databases holding the rewards when that is not
+    `engine` itself (the shards).
+    """
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            for statement in POSTGRES_DDL:
+                conn.execute(text(statement))
+            return
+        for statement in SQLITE_DDL:
+            conn.execute(text(statement))
+        # Rows loaded before the triggers existed (older databases, bulk loads) are picked up here
+        indexed = conn.execute(text("SELECT COUNT(*) FROM search_index")).scalar()
+        if not reward_engines:
+            expected = conn.execute(text(
+                "SELECT (SELECT COUNT(*) FROM businesses) + (SELECT COUNT(*) FROM redeemr_rewards)"
+            )).scalar()
+            if indexed != expected:
+                for statement in SQLITE_REBUILD:
+                    conn.execute(text(statement))
+            return
+
+        expected = conn.execute(text("SELECT COUNT(*) FROM businesses")).scalar()
+        for reward_engine in reward_engines:
+            with reward_engine.connect() as source:
+                expected += source.execute(text("SELECT COUNT(*) FROM redeemr_rewards")).scalar()
+        if indexed == expected:
+            return
+        for statement in SQLITE_REBUILD[:2]:
+            conn.execute(text(statement))
+        for reward_engine in reward_engines:
+            with reward_engine.connect() as source:
+                rows = source.execute(text("SELECT id, name, business_id FROM redeemr_rewards")).mappings()
+                for chunk in rows.partitions(SEARCH_REBUILD_CHUNK_SIZE):
+                    conn.execute(text(SQLITE_INDEX_REWARD), [dict(row) for row in chunk])
+
+
+async def index_rewards(db: AsyncSession, rewards) -> None:
+    """Add sharded rewards, as (id, name, business_id), to the index in `db`'s transaction.
+
+    A no-op unless storage is sharded; otherwise the triggers do this.
+    """
+    rows = [{"id": reward_id, "name": name, "business_id": business_id} for reward_id, name, business_id in rewards]
+    if database.SHARDED and rows:
+        await db.execute(text(SQLITE_INDEX_REWARD), rows)
+
+
+async def unindex_rewards(db: AsyncSession, reward_ids) -> None:
+    """Drop sharded rewards from the index in `db`'s transaction; a no-op unless storage is sharded."""
+    rows = [{"id": reward_id} for reward_id in reward_ids]
+    if database.SHARDED and rows:
+        await db.execute(text(SQLITE_UNINDEX_REWARD), rows)
+
+
+def tokenize(query: str) -> List[str]:
+    return [token.lower() for token in _TOKEN.findall(query)][:8]
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, giving up once it exceeds `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+async def _sqlite_corrections(db: AsyncSession, term: str) -> List[str]:
+    """Indexed terms within the typo budget of `term`, sharing its first letter.
+
+    Only used when nothing in the index starts with `term`, so real prefix
+    matches are never outranked by near misses.
+    """
+    if len(term) < TYPO_MIN_LENGTH:
+        return []
+    prefixed = await db.scalar(
+        text("SELECT 1 FROM search_vocab WHERE term >= :term AND term < :term || char(1114111) LIMIT 1"),
+        {"term": term},
+    )
+    if prefixed:
+        return []
+    limit = 2 if len(term) >= TYPO_TWO_EDITS_LENGTH else 1
+    # Range scan over the vocabulary rather than reading all of it
+    rows = await db.execute(
+        text("SELECT term, doc FROM search_vocab WHERE term >= :low AND term < :high "
+             "AND length(term) BETWEEN :shortest AND :longest"),
+        {"low": term[0], "high": chr(ord(term[0]) + 1), "shortest": len(term) - limit, "longest": len(term) + limit},
+    )
+    scored = []
+    for candidate, documents in rows:
+        if candidate == term:
+            continue
+        distance = edit_distance(term, candidate, limit)
+        if distance <= limit:
+            scored.append((distance, -documents, candidate))
+    return [candidate for _, _, candidate in sorted(scored)[:TYPO_MAX_CANDIDATES]]
+
+
+async def _sqlite_search(db: AsyncSession, terms: List[str], kinds: List[str], offset: int, limit: int):
+    clauses = []
+    for term in terms:
+        options = [f'"{term}"*'] + [f'"{fix}"' for fix in await _sqlite_corrections(db, term)]
+        clauses.append("(" + " OR ".join(options) + ")")
+    match = " AND ".join(clauses)
+
+    matches = await db.scalar(
+        text("SELECT COUNT(*) FROM (SELECT 1 FROM search_index WHERE search_index MATCH :match LIMIT :cap)"),
+        {"match": match, "cap": RANKED_MATCH_LIMIT + 1},
+    )
+    if matches > RANKED_MATCH_LIMIT:
+        score, order = "0.0", "s.rowid"
+    else:
+        score, order = "-bm25(search_index) * CASE WHEN s.rowid % 2 = 0 THEN :boost ELSE 1.0 END", "score DESC, s.rowid"
+
+    kind_filter = ""
+    if kinds == [BUSINESS]:
+        kind_filter = "AND s.rowid % 2 = 0"
+    elif kinds == [REWARD]:
+        kind_filter = "AND s.rowid % 2 = 1"
+
+    rows = await db.execute(text(f"""
+        SELECT s.rowid AS doc, s.name AS name, s.business_id AS business_id, b.name AS business_name,
+               r.points_required AS points_required,
+               {score} AS score
+        FROM search_index s
+        JOIN businesses b ON b.id = s.business_id
+        LEFT JOIN redeemr_rewards r ON s.rowid % 2 = 1 AND r.id = s.rowid / 2
+        WHERE search_index MATCH :match
+          AND b.is_approved AND b.deleted_at IS NULL {kind_filter}
+        ORDER BY {order}
+        LIMIT :limit OFFSET :offset
+    """), {"match": match, "boost": BUSINESS_BOOST, "limit": limit, "offset": offset})
+    return [
+        {
+            "type": BUSINESS if row.doc % 2 == 0 else REWARD,
+            "id": row.doc // 2,
+            "name": row.name,
+            "business_id": row.business_id,
+            "business_name": row.business_name,
+            "points_required": row.points_required,
+            "score": row.score,
+        }
+        for row in rows
+    ]
+
+
+async def _postgres_search(db: AsyncSession, terms: List[str], kinds: List[str], offset: int, limit: int):
+    query = " ".join(terms)
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+    parts = []
+    if BUSINESS in kinds:
+        parts.append("""
+            SELECT 'business' AS type, b.id AS id, b.name AS name, b.id AS business_id, b.name AS business_name,
+                   NULL::integer AS points_required,
+                   (ts_rank(to_tsvector('simple', b.name), to_tsquery('simple', :tsquery)) + similarity(b.name, :query)) * :boost AS score
+            FROM businesses b
+            WHERE (to_tsvector('simple', b.name) @@ to_tsquery('simple', :tsquery) OR b.name % :query)
+              AND b.is_approved AND b.deleted_at IS NULL""")
+    if REWARD in kinds:
+        parts.append("""
+            SELECT 'reward' AS type, r.id AS id, r.name AS name, b.id AS business_id, b.name AS business_name,
+                   r.points_required AS points_required,
+                   ts_rank(to_tsvector('simple', r.name), to_tsquery('simple', :tsquery)) + similarity(r.name, :query) AS score
+            FROM redeemr_rewards r JOIN businesses b ON b.id = r.business_id
+            WHERE (to_tsvector('simple', r.name) @@ to_tsquery('simple', :tsquery) OR r.name % :query)
+              AND b.is_approved AND b.deleted_at IS NULL""")
+    rows = await db.execute(
+        text(" UNION ALL ".join(parts) + " ORDER BY score DESC, type, id LIMIT :limit OFFSET :offset"),
+        {"query": query, "tsquery": tsquery, "boost": BUSINESS_BOOST, "limit": limit, "offset": offset},
+    )
+    return [dict(row._mapping) for row in rows]
+
+
+async def search(db: AsyncSession, query: str, kinds: List[str], offset: int, limit: int) -> Optional[list]:
+    """Ranked matches over approved, live businesses and their rewards.
+
+    Every query word matches as a prefix, or through a close spelling when it
+    is long enough. Returns None when the query has no searchable words.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return None
+    if db.get_bind().dialect.name == "postgresql":
+        return await _postgres_search(db, terms, kinds, offset, limit)
+    results = await _sqlite_search(db, terms, kinds, offset, limit)
+    if database.SHARDED:
+        await _shard_points(db, results)
+    return results
+
+
+async def _shard_points(db: AsyncSession, results: list) -> None:
+    """Fill in points_required for sharded rewards, one query per shard on the page."""
+    rewards = {result["id"]: result for result in results if result["type"] == REWARD}
+    if not rewards:
+        return
+
+    async def fetch(shard, reward_ids):
+        return (await shard.execute(
+            select(models.RedeemrReward.id, models.RedeemrReward.points_required)
+            .where(models.RedeemrReward.id.in_(reward_ids))
+        )).all()
+
+    for rows in await database.fan_out_by(db, rewards, database.shard_for_id, fetch):
+        for reward_id, points_required in rows:
+            rewards[reward_id]["points_required"] = points_required
@@ -0,0 +1,36 @@
+"""JSON responses without the jsonable_encoder walk.
+
+ORJSONResponse is the app's default response class. Routes declare a
+response_model: their return value is validated into it, dumped to plain
+JSON types by Pydantic and rendered by orjson. orjson is optional; without
+it responses fall back to the standard json module. projection() builds the
+column-only select behind a response schema, so reads skip ORM instances
+and the identity map.
+"""
+from typing import Any, Type
+import json
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import select
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Compact JSON bytes, through orjson when it is installed."""
+    if orjson is None:
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def projection(model, schema: Type[BaseModel]):
+    """select() of the model columns named by the schema's fields, in schema order."""
+    return select(*(getattr(model, field) for field in schema.model_fields))
@@ -0,0 +1,81 @@
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+import database
+import models
+
+BUSINESSES = "businesses"
+PENDING_BUSINESSES = "pending_businesses"
+USERS = "users"
+REWARDS = "rewards"
+TRANSACTIONS = "transactions"
+COUNTERS = (BUSINESSES, PENDING_BUSINESSES, USERS, REWARDS, TRANSACTIONS)
+# Counters of business-scoped rows; with sharded storage each shard keeps its own and reads add them up
+SHARDED_COUNTERS = (REWARDS, TRANSACTIONS)
+GLOBAL_COUNTERS = tuple(name for name in COUNTERS if name not in SHARDED_COUNTERS)
+
+async def bump(db: AsyncSession, **deltas: int) -> None:
+    """Apply counter deltas in the caller's transaction, e.g. bump(db, businesses=1).
+
+    Counters that have not been seeded yet are skipped; the next read seeds
+    them from SQL aggregates. Rewards and transactions are bumped in the
+    session that writes those rows (the business's shard, when sharded).
+    """
+    for name, delta in deltas.items():
+        if delta:
+            await db.execute(
+                update(models.StatCounter)
+                .where(models.StatCounter.name == name)
+                .values(value=models.StatCounter.value + delta)
+            )
+
+async def _store(db: AsyncSession, values: dict) -> None:
+    await db.execute(delete(models.StatCounter).where(models.StatCounter.name.in_(values)))
+    db.add_all(models.StatCounter(name=name, value=value) for name, value in values.items())
+    await db.commit()
+
+async def _rebuild_sharded(db: AsyncSession) -> dict:
+    """Recount the rewards and transactions held in `db`'s database and store them there. Commits."""
+    values = {
+        REWARDS: await db.scalar(select(func.count()).select_from(models.RedeemrReward)),
+        # Both tiers: archiving moves history, it does not remove it
+        TRANSACTIONS: await db.scalar(select(func.count()).select_from(models.Transaction))
+        + await db.scalar(select(func.count()).select_from(models.TransactionArchive)),
+    }
+    await _store(db, values)
+    return values
+
+async def _read(db: AsyncSession, names) -> dict:
+    rows = await db.execute(
+        select(models.StatCounter.name, models.StatCounter.value).where(models.StatCounter.name.in_(names))
+    )
+    return {name: value for name, value in rows}
+
+async def rebuild(db: AsyncSession) -> dict:
+    """Recompute every counter from SQL aggregates and store it, shards in parallel. Commits."""
+    values = {
+        BUSINESSES: await db.scalar(
+            select(func.count()).select_from(models.Business).where(models.Business.deleted_at.is_(None))
+        ),
+        PENDING_BUSINESSES: await db.scalar(
+            select(func.count()).select_from(models.Business).where(
+                models.Business.deleted_at.is_(None), models.Business.is_approved.isnot(True)
+            )
+        ),
+        USERS: await db.scalar(select(func.count()).select_from(models.User)),
+    }
+    await _store(db, values)
+    for counts in await database.fan_out(db, _rebuild_sharded):
+        for name, value in counts.items():
+            values[name] = values.get(name, 0) + value
+    return values
+
+async def read(db: AsyncSession) -> dict:
+    """Return all counters, seeding them on first use. Shard counters are read in parallel and summed."""
+    values = await _read(db, GLOBAL_COUNTERS)
+    per_shard = await database.fan_out(db, lambda shard: _read(shard, SHARDED_COUNTERS))
+    if len(values) < len(GLOBAL_COUNTERS) or any(len(counts) < len(SHARDED_COUNTERS) for counts in per_shard):
+        return await rebuild(db)
+    for counts in per_shard:
+        for name, value in counts.items():
+            values[name] = values.get(name, 0) + value
+    return {name: values[name] for name in COUNTERS}
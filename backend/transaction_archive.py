@@ -0,0 +1,193 @@
+"""Hot/cold tiering of the transactions table.
+
+Redemptions older than ARCHIVE_AFTER_DAYS move from `transactions` to
+`transactions_archive`. They keep their ids, and each batch moves in its own
+database transaction (copy, then delete, checked to match), so the hot table
+and its indexes only hold recent history. A crash between batches leaves
+nothing half-moved. Batches walk the primary key and need no created_at
+index on the hot table.
+
+Readers that take a time range, such as the transaction export, use
+history() to query both tiers. They only do so when the range reaches back
+to horizon(), the newest archived timestamp. Full-history readers (rollup
+rebuilds, counter recounts, business purges) always include the archive.
+
+Run from the backend directory:
+    python transaction_archive.py run --older-than-days 90
+    python transaction_archive.py verify
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import argparse
+import os
+import time
+from sqlalchemy import String, and_, delete, func, insert, select, type_coerce, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import models
+import stats_counters
+from logs import get_logger
+
+# Transaction archival configuration
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+
+COLUMNS = ("id", "user_id", "reward_id", "created_at")
+
+logger = get_logger("transaction_archive")
+
+
+def as_stored(value: Optional[datetime], dialect_name: str) -> Optional[datetime]:
+    """UTC for a created_at comparison; SQLite stores naive UTC text, so drop the zone there."""
+    if value is None:
+        return None
+    value = value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return value.replace(tzinfo=None) if dialect_name == "sqlite" else value
+
+
+def bound(value: datetime, dialect_name: str):
+    """A created_at range bound (from as_stored) that compares correctly on SQLite.
+
+    SQLite compares the stored text. server_default rows hold
+    'YYYY-MM-DD HH:MM:SS' and rows written from Python add '.ffffff', so a
+    bound for a whole second drops the fraction and sorts at or below both
+    spellings of that second.
+    """
+    if dialect_name != "sqlite":
+        return value
+    text = value.strftime("%Y-%m-%d %H:%M:%S")
+    if value.microsecond:
+        text += f".{value.microsecond:06d}"
+    return type_coerce(text, String)
+
+
+def history(include_archive: bool):
+    """The hot transactions table, or both tiers as one selectable with the same columns."""
+    hot = models.Transaction.__table__
+    if not include_archive:
+        return hot
+    archive = models.TransactionArchive.__table__
+    return union_all(
+        select(*(hot.c[name] for name in COLUMNS)),
+        select(*(archive.c[name] for name in COLUMNS)),
+    ).subquery("transactions_all")
+
+
+async def horizon(db: AsyncSession) -> Optional[datetime]:
+    """created_at of the newest archived transaction, or None while the archive is empty."""
+    return await db.scalar(select(func.max(models.TransactionArchive.created_at)))
+
+
+def archive(db: Session, older_than_days: float = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE,
+            log=print) -> dict:
+    """Move transactions older than the cutoff to the archive, one committed batch at a time."""
+    dialect_name = db.get_bind().dialect.name
+    cutoff = as_stored(datetime.now(timezone.utc) - timedelta(days=older_than_days), dialect_name)
+    hot, cold = models.Transaction.__table__, models.TransactionArchive.__table__
+    started = time.perf_counter()
+    after = moved = batches = 0
+    while True:
+        page = (
+            select(hot.c.id).where(hot.c.id > after, hot.c.created_at < cutoff)
+            .order_by(hot.c.id).limit(batch_size).subquery()
+        )
+        last = db.scalar(select(func.max(page.c.id)))
+        if last is None:
+            break
+        in_batch = and_(hot.c.id > after, hot.c.id <= last, hot.c.created_at < cutoff)
+        # A reused id would fail the copy halfway through the run; stop before touching the batch
+        clashes = db.scalar(select(func.count()).select_from(hot).join(cold, cold.c.id == hot.c.id).where(in_batch))
+        if clashes:
+            db.rollback()
+            raise RuntimeError(f"{clashes} transactions in the batch after id {after} are already archived; "
+                               f"run update_db.py and `verify` before archiving again")
+        copied = db.execute(insert(cold).from_select(
+            COLUMNS, select(*(hot.c[name] for name in COLUMNS)).where(in_batch)
+        )).rowcount
+        deleted = db.execute(delete(hot).where(in_batch)).rowcount
+        if copied != deleted:
+            db.rollback()
+            raise RuntimeError(f"Batch after id {after} copied {copied} rows but deleted {deleted}; rolled back")
+        db.commit()
+        moved += deleted
+        batches += 1
+        after = last
+        log(f"  archived {moved} transactions (through id {last})")
+
+    result = {"cutoff": cutoff.isoformat(), "moved": moved, "batches": batches,
+              "seconds": round(time.perf_counter() - started, 3)}
+    logger.info("transactions_archived", **result)
+    return result
+
+
+def verify(db: Session, older_than_days: float = ARCHIVE_AFTER_DAYS) -> dict:
+    """Check the tiers are consistent: no id in both, and the totals match the transactions counter."""
+    dialect_name = db.get_bind().dialect.name
+    cutoff = as_stored(datetime.now(timezone.utc) - timedelta(days=older_than_days), dialect_name)
+    hot, cold = models.Transaction, models.TransactionArchive
+    hot_rows = db.scalar(select(func.count()).select_from(hot))
+    archived_rows = db.scalar(select(func.count()).select_from(cold))
+    counter = db.scalar(select(models.StatCounter.value).where(models.StatCounter.name == stats_counters.TRANSACTIONS))
+    report = {
+        "hot_rows": hot_rows,
+        "archived_rows": archived_rows,
+        "in_both_tiers": db.scalar(select(func.count()).select_from(hot).join(cold, cold.id == hot.id)),
+        # Rows past the cutoff still waiting for the next run; not an error
+        "hot_rows_past_cutoff": db.scalar(select(func.count()).select_from(hot).where(hot.created_at < cutoff)),
+        "oldest_hot": db.scalar(select(func.min(hot.created_at))),
+        "archive_range": (db.scalar(select(func.min(cold.created_at))), db.scalar(select(func.max(cold.created_at)))),
+        "transactions_counter": counter,
+    }
+    problems = []
+    if report["in_both_tiers"]:
+        problems.append(f"{report['in_both_tiers']} transactions are in both tiers")
+    if counter is not None and counter != hot_rows + archived_rows:
+        problems.append(f"counter says {counter} transactions, tiers hold {hot_rows + archived_rows}")
+    report["problems"] = problems
+    return report
+
+
+def main():
+    from database import SHARDED, business_sessionmakers, create_shard_tables, engine
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="Move old transactions to the archive")
+    run.add_argument("--older-than-days", type=float, default=ARCHIVE_AFTER_DAYS)
+    run.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    check = commands.add_parser("verify", help="Check the hot and archive tiers against each other")
+    check.add_argument("--older-than-days", type=float, default=ARCHIVE_AFTER_DAYS)
+    args = parser.parse_args()
+
+    # Make sure the archive table exists on databases created before it was added
+    models.Base.metadata.create_all(bind=engine, tables=[models.TransactionArchive.__table__])
+    create_shard_tables()
+    problems = []
+    # With sharded storage each shard archives and checks its own transactions
+    for shard_index, make_session in enumerate(business_sessionmakers()):
+        if SHARDED:
+            print(f"Shard {shard_index}:")
+        db = make_session()
+        try:
+            if args.command == "run":
+                print(f"Archiving transactions older than {args.older_than_days:g} days...")
+                result = archive(db, args.older_than_days, args.batch_size)
+                print(f"Moved {result['moved']} transactions in {result['batches']} batches ({result['seconds']}s)")
+            else:
+                report = verify(db, args.older_than_days)
+                for name, value in report.items():
+                    if name != "problems":
+                        print(f"  {name}: {value}")
+                for problem in report["problems"]:
+                    print(f"PROBLEM: {problem}")
+                problems += report["problems"]
+        finally:
+            db.close()
+    if args.command == "verify":
+        if problems:
+            raise SystemExit(1)
+        print("Archive is consistent")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Streaming export of a business's redemption history.
+
+Rows are read window by window in time order through server-side cursors
+(yield_per / stream_results), encoded as CSV or NDJSON per batch and
+optionally gzipped as they go. Only one batch is held at a time, so memory
+and time to first byte stay flat however long the history is. Each window
+is a range scan on ix_transactions_reward_created for the business's
+rewards; the first and last redemption bound the windows, so empty spans
+cost nothing. Windows older than the archive horizon also read
+transactions_archive (see transaction_archive).
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+import csv
+import io
+import json
+import os
+import zlib
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+import models
+import transaction_archive
+from database import business_sessionmaker
+from pagination import STREAM_BATCH_SIZE
+
+# Transaction export configuration
+EXPORT_WINDOW_HOURS = float(os.getenv("EXPORT_WINDOW_HOURS", "24"))
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+
+COLUMNS = ("transaction_id", "created_at", "user_id", "reward_id", "reward_name", "points_required")
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.isoformat()
+
+
+def encode_csv(rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(COLUMNS)
+    writer.writerows((row.id, _timestamp(row.created_at), row.user_id, row.reward_id, row.reward_name, row.points_required)
+                     for row in rows)
+    return buffer.getvalue()
+
+
+def encode_ndjson(rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(COLUMNS, (row.id, _timestamp(row.created_at), row.user_id, row.reward_id,
+                                      row.reward_name, row.points_required)))) + "\n"
+        for row in rows
+    )
+
+
+async def export_rows(business_id: int, start: Optional[datetime], end: Optional[datetime], file_format: str):
+    """Yield the encoded export in chunks, oldest redemption first."""
+    # The business's shard, when storage is sharded
+    async with business_sessionmaker(business_id)() as db:
+        dialect_name = db.get_bind().dialect.name
+        start, end = transaction_archive.as_stored(start, dialect_name), transaction_archive.as_stored(end, dialect_name)
+        reward_ids: List[int] = (await db.scalars(
+            select(models.RedeemrReward.id).where(models.RedeemrReward.business_id == business_id)
+        )).all()
+
+        if file_format == "csv":
+            yield encode_csv((), header=True)
+        if not reward_ids:
+            return
+
+        # The archive tier is only read when the range reaches back into it
+        archived_until = await transaction_archive.horizon(db)
+        include_archive = archived_until is not None and (start is None or start <= archived_until)
+        tiers = (models.Transaction, models.TransactionArchive) if include_archive else (models.Transaction,)
+
+        # One statement, with an index seek per reward and end; a MIN/MAX over the whole IN list
+        # would scan every entry
+        reward = models.RedeemrReward
+        bounds = []
+        for table in tiers:
+            of_reward = table.reward_id == reward.id
+            bounds += [
+                func.min(select(func.min(table.created_at)).where(of_reward).scalar_subquery()),
+                func.max(select(func.max(table.created_at)).where(of_reward).scalar_subquery()),
+            ]
+        row = (await db.execute(select(*bounds).where(reward.business_id == business_id))).one()
+        firsts = [value for value in row[0::2] if value is not None]
+        lasts = [value for value in row[1::2] if value is not None]
+        if not firsts:
+            return
+        first, last = min(firsts), max(lasts)
+        window_start = max(start, first) if start is not None else first
+        stop = min(end, last + timedelta(microseconds=1)) if end is not None else last + timedelta(microseconds=1)
+        width = timedelta(hours=EXPORT_WINDOW_HOURS)
+
+        def window(source, window_start, window_end):
+            return (
+                select(source.c.id, source.c.created_at, source.c.user_id, source.c.reward_id,
+                       models.RedeemrReward.name.label("reward_name"), models.RedeemrReward.points_required)
+                .select_from(source)
+                .join(models.RedeemrReward, models.RedeemrReward.id == source.c.reward_id)
+                .where(source.c.reward_id.in_(reward_ids),
+                       source.c.created_at >= transaction_archive.bound(window_start, dialect_name),
+                       source.c.created_at < transaction_archive.bound(window_end, dialect_name))
+                .order_by(source.c.created_at, source.c.id)
+                .execution_options(yield_per=STREAM_BATCH_SIZE)
+            )
+
+        hot = transaction_archive.history(include_archive=False)
+        both = transaction_archive.history(include_archive=True) if include_archive else hot
+        while window_start < stop:
+            window_end = min(window_start + width, stop)
+            # Windows past the archive horizon read the hot table alone
+            source = both if include_archive and window_start <= archived_until else hot
+            result = await db.stream(window(source, window_start, window_end))
+            async for partition in result.partitions():
+                yield encode_csv(partition, header=False) if file_format == "csv" else encode_ndjson(partition)
+            window_start = window_end
+
+
+async def gzipped(chunks):
+    """Compress a text stream on the fly, flushing once per chunk so bytes keep flowing."""
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def export_response(business_id: int, start: Optional[datetime], end: Optional[datetime],
+                    file_format: str, gzip: bool) -> StreamingResponse:
+    """Download response for a business's transactions. Runs in its own session, since the body outlives the request."""
+    filename = f"business-{business_id}-transactions.{file_format}"
+    body = export_rows(business_id, start, end, file_format)
+    media_type = MEDIA_TYPES[file_format]
+    if gzip:
+        body, media_type, filename = gzipped(body), "application/gzip", filename + ".gz"
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
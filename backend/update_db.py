@@ -1,5 +1,6 @@
-from database import engine, SessionLocal, get_db
+from database import engine, shard_engines, SessionLocal, get_db
 from sqlalchemy import Column, Boolean, Integer, ForeignKey
+from sqlalchemy.schema import CreateIndex, CreateTable
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import text
 import models
@@ -37,6 +38,99 @@ try:
         db.execute(text("ALTER TABLE businesses ADD COLUMN is_approved BOOLEAN DEFAULT FALSE"))
         db.commit()
     
+    # Check if deleted_at column exists in businesses table
+    try:
+        db.execute(text("SELECT deleted_at FROM businesses LIMIT 1"))
+        print("Column 'deleted_at' already exists in businesses table")
+    except Exception:
+        print("Adding 'deleted_at' column to businesses table")
+        db.execute(text("ALTER TABLE businesses ADD COLUMN deleted_at DATETIME"))
+        db.commit()
+    
+    # Check if catalog_version column exists in businesses table
+    try:
+        db.execute(text("SELECT catalog_version FROM businesses LIMIT 1"))
+        print("Column 'catalog_version' already exists in businesses table")
+    except Exception:
+        print("Adding 'catalog_version' column to businesses table")
+        db.execute(text("ALTER TABLE businesses ADD COLUMN catalog_version INTEGER NOT NULL DEFAULT 1"))
+        db.commit()
+    
+    # Check if location columns exist in businesses table
+    try:
+        db.execute(text("SELECT latitude, longitude, geohash FROM businesses LIMIT 1"))
+        print("Location columns already exist in businesses table")
+    except Exception:
+        print("Adding location columns to businesses table")
+        db.execute(text("ALTER TABLE businesses ADD COLUMN latitude FLOAT"))
+        db.execute(text("ALTER TABLE businesses ADD COLUMN longitude FLOAT"))
+        db.execute(text("ALTER TABLE businesses ADD COLUMN geohash VARCHAR"))
+        db.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_businesses_location "
+            "ON businesses (geohash, latitude, longitude, is_approved, deleted_at)"
+        ))
+        db.commit()
+    
+    # Nearby results embed rewards by business; older databases lack this index
+    db.execute(text("CREATE INDEX IF NOT EXISTS ix_redeemr_rewards_business_id ON redeemr_rewards (business_id)"))
+    db.commit()
+    
+    # Transaction exports range-scan each reward's history by time
+    db.execute(text("CREATE INDEX IF NOT EXISTS ix_transactions_reward_created ON transactions (reward_id, created_at)"))
+    db.commit()
+    
+    # Indexes the query plan audit (benchmarks/plan_audit.py) found missing
+    db.execute(text("CREATE INDEX IF NOT EXISTS ix_businesses_owner ON businesses (owner_id, deleted_at)"))
+    db.execute(text("CREATE INDEX IF NOT EXISTS ix_points_ledger_business_id ON points_ledger (business_id)"))
+    db.execute(text("CREATE INDEX IF NOT EXISTS ix_points_balances_business_id ON points_balances (business_id)"))
+    db.commit()
+    
+    # Bulk imports upsert rewards on (business_id, name); a later reward reusing a name gets its id appended
+    for target in [engine, *shard_engines]:
+        with target.begin() as conn:
+            conn.execute(text(
+                "UPDATE redeemr_rewards SET name = name || ' #' || CAST(id AS VARCHAR) "
+                "WHERE id NOT IN (SELECT MIN(id) FROM redeemr_rewards GROUP BY business_id, name)"
+            ))
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_redeemr_rewards_business_name ON redeemr_rewards (business_id, name)"
+            ))
+    
+    # Archived transactions keep their ledger entries, which can no longer reference the hot table
+    if engine.dialect.name == "postgresql":
+        db.execute(text("ALTER TABLE points_ledger DROP CONSTRAINT IF EXISTS points_ledger_transaction_id_fkey"))
+        db.commit()
+    models.Base.metadata.create_all(bind=engine, tables=[models.TransactionArchive.__table__])
+    
+    # Archived ids must never be handed out again: SQLite reuses the highest ids of a table
+    # without AUTOINCREMENT, so rebuild it with AUTOINCREMENT and start its sequence above every
+    # id in either tier (Postgres sequences never go back)
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            table_sql = conn.execute(text(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'transactions'"
+            )).scalar()
+            if table_sql and "AUTOINCREMENT" not in table_sql.upper():
+                print("Rebuilding transactions table with AUTOINCREMENT")
+                hot = models.Transaction.__table__
+                # Legacy renaming leaves other tables' references to "transactions" alone
+                conn.execute(text("PRAGMA legacy_alter_table = ON"))
+                conn.execute(text("ALTER TABLE transactions RENAME TO transactions_old"))
+                conn.execute(CreateTable(hot))
+                conn.execute(text(
+                    "INSERT INTO transactions (id, user_id, reward_id, created_at) "
+                    "SELECT id, user_id, reward_id, created_at FROM transactions_old"
+                ))
+                conn.execute(text("DROP TABLE transactions_old"))
+                conn.execute(text("PRAGMA legacy_alter_table = OFF"))
+                for index in hot.indexes:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+                conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'transactions'"))
+                conn.execute(text(
+                    "INSERT INTO sqlite_sequence (name, seq) SELECT 'transactions', COALESCE(MAX(id), 0) FROM ("
+                    "SELECT MAX(id) AS id FROM transactions UNION ALL SELECT MAX(id) FROM transactions_archive)"
+                ))
+    
     print("Database schema updated successfully!")
 except Exception as e:
     db.rollback()
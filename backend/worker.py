@@ -0,0 +1,52 @@
+"""Run background job workers outside the API process.
+
+Claims jobs from the same `jobs` table as the API's in-process workers; run
+the API with JOB_WORKERS=0 to leave all the work to this process. Several
+worker processes may run side by side. --once runs the jobs that are due
+now and exits, e.g. from cron.
+
+Run from the backend directory:
+    python worker.py --concurrency 4
+    python worker.py --once
+"""
+import argparse
+import asyncio
+import models
+import job_queue
+from database import create_shard_tables, engine
+from logs import get_logger
+# Modules that register job handlers
+import auth_utils, business_deletion, rollups  # noqa: F401
+
+logger = get_logger("worker")
+
+async def run(concurrency: int, once: bool) -> None:
+    await business_deletion.resume_unfinished()
+    if once:
+        print(f"Ran {await job_queue.run_until_idle()} jobs")
+        return
+    workers = job_queue.job_workers
+    workers.concurrency = concurrency
+    workers.start()
+    logger.info("worker_started", concurrency=concurrency, handlers=sorted(job_queue.HANDLERS))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await workers.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=max(job_queue.JOB_WORKERS, 1))
+    parser.add_argument("--once", action="store_true", help="Run the jobs due now, then exit")
+    args = parser.parse_args()
+
+    # Make sure the schema exists on databases the API has not started against yet
+    models.Base.metadata.create_all(bind=engine)
+    create_shard_tables()
+    try:
+        asyncio.run(run(args.concurrency, args.once))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
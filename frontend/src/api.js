@@ -5,3 +5,25 @@ const api = axios.create({
 });
 
 export default api;
+
+// Fetch one page of a keyset-paginated listing; pass the returned nextCursor to get the next one
+export const fetchPage = async (url, token, cursor = null, pageSize = 50) => {
+  const params = new URLSearchParams({ limit: pageSize });
+  if (cursor) {
+    params.set('cursor', cursor);
+  }
+  const separator = url.includes('?') ? '&' : '?';
+  const response = await fetch(`${url}${separator}${params}`, {
+    headers: {
+      'Authorization': `Bearer ${token}`
+    }
+  });
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({}));
+    throw new Error(errorData.detail || `Request failed with status ${response.status}`);
+  }
+  return {
+    items: await response.json(),
+    nextCursor: response.headers.get('X-Next-Cursor')
+  };
+};
@@ -33,6 +33,7 @@ import {
   HourglassEmpty as PendingIcon
 } from '@mui/icons-material';
 import { useAuth } from '../contexts/AuthContext';
+import { fetchPage } from '../api';
 import { useNavigate } from 'react-router-dom';
 
 const AdminDashboard = () => {
@@ -43,6 +44,10 @@ const AdminDashboard = () => {
   const [error, setError] = useState(null);
   const [businesses, setBusinesses] = useState([]);
   const [users, setUsers] = useState([]);
+  // X-Next-Cursor of the last page loaded; null once everything is shown
+  const [businessesCursor, setBusinessesCursor] = useState(null);
+  const [usersCursor, setUsersCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [tabValue, setTabValue] = useState(0);
   const [stats, setStats] = useState({
     businessCount: 0,
@@ -69,64 +74,58 @@ const AdminDashboard = () => {
       const token = localStorage.getItem('token') || sessionStorage.getItem('token');
       console.log("Fetching admin data with token:", token ? "Token exists" : "No token found");
       
-      // Fetch businesses
-      console.log("Fetching all businesses from: http://localhost:8000/businesses/");
-      const businessesResponse = await fetch('http://localhost:8000/businesses/', {
+      // Fetch platform totals, counted server-side
+      const statsResponse = await fetch('http://localhost:8000/admin/stats', {
         headers: {
           'Authorization': `Bearer ${token}`
         }
       });
       
-      if (businessesResponse.ok) {
-        const businessesData = await businessesResponse.json();
+      if (statsResponse.ok) {
+        const statsData = await statsResponse.json();
+        setStats({
+          businessCount: statsData.businesses,
+          userCount: statsData.users,
+          pendingBusinessCount: statsData.pending_businesses,
+          rewardCount: statsData.rewards
+        });
+      } else {
+        console.error("Failed to fetch stats:", await statsResponse.text());
+      }
+      
+      // Fetch businesses
+      console.log("Fetching the first page of businesses from: http://localhost:8000/businesses/");
+      let businessesData = null;
+      try {
+        const page = await fetchPage('http://localhost:8000/businesses/', token);
+        businessesData = page.items;
+        setBusinessesCursor(page.nextCursor);
+      } catch (err) {
+        console.error("Failed to fetch businesses:", err.message);
+      }
+      
+      if (businessesData) {
         console.log("Businesses data received:", businessesData);
         setBusinesses(businessesData);
-        
-        const pendingBusinesses = businessesData.filter(business => !business.is_approved);
-        console.log("Pending businesses count:", pendingBusinesses.length);
-        
-        setStats(prev => ({ 
-          ...prev, 
-          businessCount: businessesData.length,
-          pendingBusinessCount: pendingBusinesses.length 
-        }));
-        
-        // Count rewards
-        let totalRewards = 0;
-        for (const business of businessesData) {
-          const rewardsResponse = await fetch(`http://localhost:8000/businesses/${business.id}/rewards/`, {
-            headers: {
-              'Authorization': `Bearer ${token}`
-            }
-          });
-          
-          if (rewardsResponse.ok) {
-            const rewardsData = await rewardsResponse.json();
-            totalRewards += rewardsData.length;
-          }
-        }
-        
-        setStats(prev => ({ ...prev, rewardCount: totalRewards }));
       } else {
-        console.error("Failed to fetch businesses:", await businessesResponse.text());
         setError("Failed to load businesses. Make sure you have admin privileges.");
       }
       
       // Fetch users
-      console.log("Fetching all users from: http://localhost:8000/users/all");
-      const usersResponse = await fetch('http://localhost:8000/users/all', {
-        headers: {
-          'Authorization': `Bearer ${token}`
-        }
-      });
+      console.log("Fetching the first page of users from: http://localhost:8000/users/all");
+      let usersData = null;
+      try {
+        const page = await fetchPage('http://localhost:8000/users/all', token);
+        usersData = page.items;
+        setUsersCursor(page.nextCursor);
+      } catch (err) {
+        console.error("Failed to fetch users:", err.message);
+      }
       
-      if (usersResponse.ok) {
-        const usersData = await usersResponse.json();
+      if (usersData) {
         console.log("Users data received:", usersData);
         setUsers(usersData);
-        setStats(prev => ({ ...prev, userCount: usersData.length }));
       } else {
-        console.error("Failed to fetch users:", await usersResponse.text());
         // Fallback to dummy data if endpoint doesn't exist
         console.warn('Users endpoint not available - using dummy data');
         setUsers([
@@ -143,6 +142,34 @@ const AdminDashboard = () => {
     }
   };
 
+  // Append the next page of businesses or users
+  const loadMore = async (url, cursor, setItems, setCursor) => {
+    setLoadingMore(true);
+    
+    try {
+      const token = localStorage.getItem('token') || sessionStorage.getItem('token');
+      const page = await fetchPage(url, token, cursor);
+      setItems(prev => [...prev, ...page.items]);
+      setCursor(page.nextCursor);
+    } catch (err) {
+      console.error('Error loading more:', err);
+      alert(err.message || 'An error occurred while loading more');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const loadMoreBusinesses = () => loadMore('http://localhost:8000/businesses/', businessesCursor, setBusinesses, setBusinessesCursor);
+  const loadMoreUsers = () => loadMore('http://localhost:8000/users/all', usersCursor, setUsers, setUsersCursor);
+
+  const renderLoadMore = (cursor, onLoadMore) => cursor && (
+    <Box sx={{ display: 'flex', justifyContent: 'center', p: 2 }}>
+      <Button variant="outlined" onClick={onLoadMore} disabled={loadingMore}>
+        {loadingMore ? <CircularProgress size={24} /> : 'Load more'}
+      </Button>
+    </Box>
+  );
+
   const handleTabChange = (event, newValue) => {
     setTabValue(newValue);
   };
@@ -477,6 +504,7 @@ const AdminDashboard = () => {
                 )}
               </TableBody>
             </Table>
+            {renderLoadMore(businessesCursor, loadMoreBusinesses)}
           </TableContainer>
         )}
         
@@ -561,6 +589,7 @@ const AdminDashboard = () => {
                 )}
               </TableBody>
             </Table>
+            {renderLoadMore(usersCursor, loadMoreUsers)}
           </TableContainer>
         )}
         
@@ -624,6 +653,7 @@ const AdminDashboard = () => {
                 )}
               </TableBody>
             </Table>
+            {renderLoadMore(businessesCursor, loadMoreBusinesses)}
           </TableContainer>
         )}
       </Paper>
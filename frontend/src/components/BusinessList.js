@@ -19,10 +19,13 @@ import {
 } from '@mui/material';
 import { CheckCircle, Cancel, HourglassEmpty } from '@mui/icons-material';
 import { useAuth } from '../contexts/AuthContext';
+import { fetchPage } from '../api';
 
 const BusinessList = () => {
   const [businesses, setBusinesses] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
   const [tabValue, setTabValue] = useState(0);
   const { user } = useAuth();
@@ -38,29 +41,36 @@ const BusinessList = () => {
     try {
       const token = localStorage.getItem('token') || sessionStorage.getItem('token');
       
-      const response = await fetch('http://localhost:8000/businesses/', {
-        headers: {
-          'Authorization': `Bearer ${token}`
-        }
-      });
-
-      if (response.ok) {
-        const data = await response.json();
-        setBusinesses(data);
-        console.log('Fetched businesses:', data);
-      } else {
-        const errorData = await response.json();
-        console.error('Failed to fetch businesses:', errorData);
-        setError(errorData.detail || 'Failed to fetch businesses');
-      }
+      const { items, nextCursor } = await fetchPage('http://localhost:8000/businesses/', token);
+      setBusinesses(items);
+      setNextCursor(nextCursor);
+      console.log('Fetched businesses:', items);
     } catch (err) {
       console.error('Error fetching businesses:', err);
-      setError('An error occurred while fetching businesses');
+      setError(err.message || 'An error occurred while fetching businesses');
     } finally {
       setLoading(false);
     }
   };
 
+  // Append the next page, following the cursor from the previous one
+  const loadMoreBusinesses = async () => {
+    setLoadingMore(true);
+
+    try {
+      const token = localStorage.getItem('token') || sessionStorage.getItem('token');
+
+      const { items, nextCursor: cursor } = await fetchPage('http://localhost:8000/businesses/', token, nextCursor);
+      setBusinesses(prev => [...prev, ...items]);
+      setNextCursor(cursor);
+    } catch (err) {
+      console.error('Error fetching more businesses:', err);
+      alert(err.message || 'An error occurred while fetching more businesses');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleApproveBusiness = async (businessId) => {
     try {
       const token = localStorage.getItem('token') || sessionStorage.getItem('token');
@@ -292,6 +302,14 @@ const BusinessList = () => {
           ))}
         </Grid>
       )}
+
+      {nextCursor && (
+        <Box sx={{ display: 'flex', justifyContent: 'center', mt: 3 }}>
+          <Button variant="outlined" onClick={loadMoreBusinesses} disabled={loadingMore}>
+            {loadingMore ? <CircularProgress size={24} /> : 'Load more'}
+          </Button>
+        </Box>
+      )}
     </Box>
   );
 };
@@ -31,7 +31,9 @@ const MyBusiness = () => {
   const [error, setError] = useState(null);
   const [business, setBusiness] = useState(null);
   const [rewards, setRewards] = useState([]);
+  const [analytics, setAnalytics] = useState(null);
   const [tabValue, setTabValue] = useState(0);
+  const [redemptions, setRedemptions] = useState([]);
   
   const [dialogOpen, setDialogOpen] = useState(false);
   const [newReward, setNewReward] = useState({
@@ -81,6 +83,19 @@ const MyBusiness = () => {
           const rewardsData = await rewardsResponse.json();
           setRewards(rewardsData);
         }
+        
+        // Fetch daily redemption counts for the last 30 days
+        const start = new Date(Date.now() - 30 * 24 * 60 * 60 * 1000).toISOString();
+        const analyticsResponse = await fetch(`http://localhost:8000/businesses/${businessData.id}/analytics?granularity=day&start=${encodeURIComponent(start)}`, {
+          headers: {
+            'Authorization': `Bearer ${token}`
+          }
+        });
+        
+        if (analyticsResponse.ok) {
+          const analyticsData = await analyticsResponse.json();
+          setAnalytics(analyticsData);
+        }
       } catch (err) {
         console.error('Error fetching business data:', err);
         setError('Failed to load business data');
@@ -92,6 +107,71 @@ const MyBusiness = () => {
     fetchUserBusiness();
   }, [user]);
 
+  // Live redemptions over Server-Sent Events. EventSource cannot send headers, so each stream is
+  // opened with a short-lived stream token; EventSource reconnects and resumes by itself while
+  // that token is valid, and after that a new stream resumes from the last event seen
+  useEffect(() => {
+    if (!business) {
+      return undefined;
+    }
+    let source = null;
+    let retry = null;
+    let closed = false;
+    let lastEventId = null;
+
+    const reopen = () => {
+      if (!closed) {
+        retry = setTimeout(open, 5000);
+      }
+    };
+
+    const open = async () => {
+      try {
+        const token = localStorage.getItem('token') || sessionStorage.getItem('token');
+        const response = await fetch(`http://localhost:8000/businesses/${business.id}/redemptions/stream-token`, {
+          method: 'POST',
+          headers: {
+            'Authorization': `Bearer ${token}`
+          }
+        });
+        if (!response.ok) {
+          throw new Error(`Stream token request failed with status ${response.status}`);
+        }
+        const { token: streamToken } = await response.json();
+        if (closed) {
+          return;
+        }
+        const params = new URLSearchParams({ token: streamToken });
+        if (lastEventId) {
+          params.set('last_event_id', lastEventId);
+        }
+        source = new EventSource(`http://localhost:8000/businesses/${business.id}/redemptions/stream?${params}`);
+        source.addEventListener('redemption', (event) => {
+          lastEventId = event.lastEventId;
+          const redemption = JSON.parse(event.data);
+          setRedemptions(prev => [redemption, ...prev].slice(0, 50));
+        });
+        source.onerror = () => {
+          if (source.readyState === EventSource.CLOSED) {
+            reopen();
+          }
+        };
+      } catch (err) {
+        console.error('Error opening the redemption stream:', err);
+        reopen();
+      }
+    };
+
+    open();
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      if (source) {
+        source.close();
+      }
+    };
+  }, [business]);
+
   const handleTabChange = (event, newValue) => {
     setTabValue(newValue);
   };
@@ -307,7 +387,7 @@ const MyBusiness = () => {
                     Transactions
                   </Typography>
                   <Typography variant="h3" align="center" sx={{ mt: 2 }}>
-                    0
+                    {analytics ? analytics.total : 0}
                   </Typography>
                 </CardContent>
                 <CardActions>
@@ -330,9 +410,24 @@ const MyBusiness = () => {
                     </Typography>
                     <BarChart sx={{ color: 'primary.main' }} />
                   </Box>
-                  <Alert severity="info">
-                    Analytics features will be available soon.
-                  </Alert>
+                  {analytics && analytics.total > 0 ? (
+                    Object.entries(
+                      analytics.series.reduce((days, row) => {
+                        const day = row.bucket_start.slice(0, 10);
+                        days[day] = (days[day] || 0) + row.redemptions;
+                        return days;
+                      }, {})
+                    ).map(([day, count]) => (
+                      <Box key={day} sx={{ display: 'flex', justifyContent: 'space-between' }}>
+                        <Typography variant="body2">{day}</Typography>
+                        <Typography variant="body2">{count} redemptions</Typography>
+                      </Box>
+                    ))
+                  ) : (
+                    <Alert severity="info">
+                      No redemptions in the last 30 days.
+                    </Alert>
+                  )}
                 </CardContent>
               </Card>
             </Grid>
@@ -395,9 +490,23 @@ const MyBusiness = () => {
             <Typography variant="h5" gutterBottom>
               Recent Transactions
             </Typography>
-            <Alert severity="info">
-              No transactions found. Transactions will appear here when customers redeem rewards.
-            </Alert>
+            {redemptions.length === 0 ? (
+              <Alert severity="info">
+                No transactions found. Transactions will appear here when customers redeem rewards.
+              </Alert>
+            ) : (
+              redemptions.map(redemption => (
+                <Box key={redemption.transaction_id} sx={{ py: 1 }}>
+                  <Typography variant="subtitle1">
+                    {redemption.reward_name} ({redemption.points_spent} points)
+                  </Typography>
+                  <Typography variant="body2" color="text.secondary">
+                    Customer #{redemption.user_id} at {new Date(redemption.redeemed_at).toLocaleString()}
+                  </Typography>
+                  <Divider sx={{ mt: 1 }} />
+                </Box>
+              ))
+            )}
           </Box>
         )}
       </Paper>
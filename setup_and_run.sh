@@ -10,7 +10,7 @@ source venv/bin/activate
 
 # Install required packages
 echo "Installing backend dependencies..."
-pip install fastapi sqlalchemy uvicorn python-jose[cryptography] passlib[bcrypt] python-multipart
+pip install fastapi "sqlalchemy[asyncio]" aiosqlite uvicorn python-jose[cryptography] passlib[bcrypt] python-multipart
 
 # Create the database tables and a test user
 echo "Initializing database..."